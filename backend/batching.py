@@ -0,0 +1,162 @@
+"""
+AgriShield - Micro-batching Module
+Collects concurrent inference requests into small batches so the models run
+once per batch instead of once per request
+"""
+
+import asyncio
+import time
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Sequence
+
+
+# ============================================================================
+# MICRO-BATCHER
+# ============================================================================
+
+class MicroBatcher:
+    """
+    Gather concurrent submissions into batches and run them together
+
+    A background task waits for the first queued item, then keeps collecting
+    until either `max_batch_size` items are queued or `max_wait_ms` has passed
+    since that first item. The whole batch is handed to `batch_fn`, which must
+    return one result per item in the same order. Each caller gets back only
+    its own result (or the exception raised for the batch).
+
+    If `executor` is given, `batch_fn` runs there so the event loop stays free
+    while a batch is being computed.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        name: str = "batcher",
+        executor: Optional[Executor] = None
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must not be negative")
+
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self.executor = executor
+
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+        # Stats for tuning the window against p99 latency
+        self._batch_sizes = Counter()
+        self._items_processed = 0
+        self._batches_run = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._total_wait_ms = 0.0
+
+    # ------------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------------
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        self._ensure_worker()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return await future
+
+    def stats(self) -> dict:
+        """Return queue depth and batch-size statistics"""
+        avg_batch = self._items_processed / self._batches_run if self._batches_run else 0.0
+        avg_wait = self._total_wait_ms / self._items_processed if self._items_processed else 0.0
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self._max_queue_depth,
+            "batches_run": self._batches_run,
+            "items_processed": self._items_processed,
+            "errors": self._errors,
+            "avg_batch_size": round(avg_batch, 2),
+            "avg_queue_wait_ms": round(avg_wait, 2),
+            "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())}
+        }
+
+    # ------------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------------
+
+    def _ensure_worker(self):
+        """Start the background worker on the running loop if needed"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queues are bound to the loop they were first used on
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def _collect(self) -> list:
+        """Wait for one item, then fill the batch until full or the window closes"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Anything already queued rides along for free
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _, _ in batch]
+
+            started = time.perf_counter()
+            for _, _, queued_at in batch:
+                self._total_wait_ms += (started - queued_at) * 1000.0
+
+            try:
+                results = await self._execute(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name}: batch_fn returned {len(results)} results for {len(items)} items"
+                    )
+            except Exception as e:
+                self._errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+
+            self._batches_run += 1
+            self._items_processed += len(items)
+            self._batch_sizes[len(items)] += 1
+
+    async def _execute(self, items: list) -> Sequence[Any]:
+        """Run the batch function, on the executor if one was given"""
+        if self.executor is None:
+            return self.batch_fn(items)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.batch_fn, items)
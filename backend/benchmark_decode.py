@@ -0,0 +1,140 @@
+"""
+AgriShield - Decode & Preprocessing Benchmark
+Compares the original full-resolution decode path with the reduced-resolution
+JPEG decode + single-pass preprocessing across image sizes
+
+Each (size, path) combination runs in its own child process so peak RSS is
+measured in isolation.
+
+Usage (from backend/):
+    python benchmark_decode.py [--sizes 1 4 12 24] [--repeat 10] [--output decode.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from preprocessing import decode_image, prepare_image
+
+SOURCE_IMAGE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "images", "tomato-late-blight.jpg"
+)
+
+
+# ============================================================================
+# PATHS UNDER TEST
+# ============================================================================
+
+def legacy_path(data: bytes):
+    """Original disease.py: full decode, two resizes, green ratio at full resolution"""
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    filter_pixels = np.array(image.resize((224, 224)))
+    arr_rgb = np.array(image)
+    ratio = np.mean((arr_rgb[:,:,1] > arr_rgb[:,:,0]) & (arr_rgb[:,:,1] > arr_rgb[:,:,2]))
+    classifier_pixels = np.array(image.resize((160, 160))) / 255.0
+    return filter_pixels, classifier_pixels, ratio
+
+
+def reduced_path(data: bytes):
+    """DCT-scaled decode, one resize, green ratio on the 224x224 array"""
+    return prepare_image(decode_image(data))
+
+
+PATHS = {"legacy": legacy_path, "reduced": reduced_path}
+
+
+# ============================================================================
+# CHILD PROCESS
+# ============================================================================
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_child(path_name: str, file_path: str, repeat: int):
+    with open(file_path, "rb") as f:
+        data = f.read()
+    fn = PATHS[path_name]
+
+    baseline = max_rss_mb()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        "path": path_name,
+        "mean_ms": float(np.mean(latencies)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "peak_rss_delta_mb": max_rss_mb() - baseline
+    }))
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def make_test_image(megapixels: float, directory: str) -> str:
+    """Upscale the sample leaf photo to roughly `megapixels` and save as JPEG"""
+    source = Image.open(SOURCE_IMAGE).convert("RGB")
+    aspect = 4 / 3
+    height = int((megapixels * 1e6 / aspect) ** 0.5)
+    width = int(height * aspect)
+    path = os.path.join(directory, f"leaf_{megapixels:g}mp.jpg")
+    source.resize((width, height), Image.BICUBIC).save(path, "JPEG", quality=90)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode latency and peak RSS across image sizes")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 12, 24], help="Megapixels")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    parser.add_argument("--child", choices=list(PATHS), default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--file", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.file, args.repeat)
+        return
+
+    print("\n" + "="*80)
+    print(" "*25 + "DECODE & PREPROCESSING BENCHMARK")
+    print("="*80)
+    print(f"{'size':>8s} {'path':10s} {'mean ms':>10s} {'p95 ms':>10s} {'peak RSS +MB':>14s}")
+    print("-"*80)
+
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for megapixels in args.sizes:
+            file_path = make_test_image(megapixels, tmp)
+            for path_name in PATHS:
+                cmd = [sys.executable, __file__, "--child", path_name, "--file", file_path,
+                       "--repeat", str(args.repeat)]
+                output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                result["megapixels"] = megapixels
+                report.append(result)
+                print(f"{megapixels:7g}M {path_name:10s} {result['mean_ms']:10.2f} {result['p95_ms']:10.2f} "
+                      f"{result['peak_rss_delta_mb']:14.1f}")
+
+    print("="*80 + "\n")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
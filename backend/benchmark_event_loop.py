@@ -0,0 +1,150 @@
+"""
+AgriShield - Event Loop Responsiveness Benchmark
+Measures /api/health latency while /api/detect-disease is saturated, with
+inference on the dedicated executor versus inline on the event loop
+
+Usage (from backend/):
+    python benchmark_event_loop.py                      # compare both modes
+    python benchmark_event_loop.py --mode executor      # single mode
+    python benchmark_event_loop.py --image ../data/images/tomato.jpeg --concurrency 16 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_IMAGE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "images", "tomato-late-blight.jpg"
+)
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    arr = np.array(values)
+    return {
+        "count": len(values),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "max_ms": float(arr.max())
+    }
+
+
+async def saturate(client, image_bytes, stop, completed):
+    """Keep one disease request in flight until told to stop"""
+    while not stop.is_set():
+        response = await client.post(
+            "/api/detect-disease",
+            files={"file": ("leaf.jpg", image_bytes, "image/jpeg")}
+        )
+        response.raise_for_status()
+        completed.append(time.perf_counter())
+
+
+async def probe_health(client, duration, interval):
+    """Hit /api/health at a fixed interval and record each latency in ms"""
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/api/health")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run_mode(args):
+    import httpx
+    from main import app
+
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm up models and the health route
+        await client.post("/api/detect-disease", files={"file": ("leaf.jpg", image_bytes, "image/jpeg")})
+        idle = await probe_health(client, duration=2, interval=args.interval)
+
+        stop = asyncio.Event()
+        completed = []
+        workers = [
+            asyncio.create_task(saturate(client, image_bytes, stop, completed))
+            for _ in range(args.concurrency)
+        ]
+        started = time.perf_counter()
+        loaded = await probe_health(client, duration=args.duration, interval=args.interval)
+        stop.set()
+        await asyncio.gather(*workers)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "mode": args.mode,
+        "concurrency": args.concurrency,
+        "health_idle": percentiles(idle),
+        "health_under_load": percentiles(loaded),
+        "disease_requests_per_sec": len(completed) / elapsed
+    }
+
+
+def print_report(reports):
+    print("\n" + "="*80)
+    print(" "*22 + "HEALTH LATENCY WHILE INFERENCE IS SATURATED")
+    print("="*80)
+    print(f"{'mode':10s} {'state':12s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'max ms':>9s} {'disease rps':>12s}")
+    print("-"*80)
+    for report in reports:
+        for state in ("health_idle", "health_under_load"):
+            stats = report[state]
+            rps = f"{report['disease_requests_per_sec']:.2f}" if state == "health_under_load" else ""
+            print(f"{report['mode']:10s} {state[7:]:12s} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} "
+                  f"{stats['p99_ms']:9.2f} {stats['max_ms']:9.2f} {rps:>12s}")
+    print("="*80 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Health-check latency under saturated disease inference")
+    parser.add_argument("--mode", choices=["executor", "inline"], default=None,
+                        help="Run a single mode in this process (default: compare both)")
+    parser.add_argument("--image", default=DEFAULT_IMAGE)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON only")
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    if args.mode is not None:
+        if args.mode == "inline":
+            os.environ["AGRISHIELD_INFERENCE_THREADS"] = "0"
+        reports = [asyncio.run(run_mode(args))]
+    else:
+        # Each mode runs in a fresh interpreter so the executor config is read at import
+        reports = []
+        for mode in ("inline", "executor"):
+            cmd = [sys.executable, __file__, "--mode", mode, "--json",
+                   "--image", args.image, "--concurrency", str(args.concurrency),
+                   "--duration", str(args.duration), "--interval", str(args.interval)]
+            output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            reports.append(json.loads(output.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(reports[0] if len(reports) == 1 else reports))
+    else:
+        print_report(reports)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+AgriShield - Risk Inference Benchmark
+Single-row latency of score_crop_failure (uncached) with the sklearn path and the
+compiled path (fast_risk.py), a bit-for-bit comparison of their outputs, and
+the cost and additivity of the per-feature path contributions
+
+Usage (from backend/):
+    python benchmark_risk.py [--rows 2000] [--repeat 3] [--output risk.json]
+"""
+
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+import predict
+
+SEASONS = ["Kharif", "Rabi", "Summer", "Whole Year", "Zaid", "Autumn", "Winter"]
+
+
+def random_scenarios(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [{
+        "crop": rng.choice(predict.crop_list),
+        "state": rng.choice(predict.state_list),
+        "district": rng.choice(predict.district_list),
+        "season": rng.choice(SEASONS),
+        "temperature": rng.uniform(-10, 50),
+        "rainfall": rng.uniform(0, 5000),
+        "humidity": rng.uniform(0, 100),
+        "disaster_occurred": rng.choice([0, 1])
+    } for _ in range(count)]
+
+
+def with_engine(compiled):
+    """Point predict.py at one engine (None = sklearn)"""
+    predict.active = predict.active._replace(compiled_model=compiled)
+
+
+def time_calls(fn, items: list, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    latencies = np.array(latencies)
+    return {
+        "mean_us": float(latencies.mean()),
+        "p50_us": float(np.percentile(latencies, 50)),
+        "p99_us": float(np.percentile(latencies, 99))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled vs sklearn single-row risk inference")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    predict.risk_models.get()
+    compiled = predict.active.compiled_model
+    if compiled is None:
+        raise SystemExit("❌ No compiled model (AGRISHIELD_RISK_ENGINE=sklearn, or the model is not a binary forest)")
+
+    scenarios = random_scenarios(args.rows)
+    features, errors, _ = predict.build_feature_matrix(pd.DataFrame(scenarios))
+    features = features[[e is None for e in errors]]
+
+    # ------------------------------------------------------------------------
+    # Bit-for-bit comparison
+    # ------------------------------------------------------------------------
+    print(f"🔍 Comparing {len(features)} rows...")
+    expected = predict.active.model.predict_proba(predict.active.scaler.transform(features))[:, 1]
+    actual = np.array([compiled.failure_probability(row) for row in features])
+    probability_mismatches = int((expected.view(np.uint64) != actual.view(np.uint64)).sum())
+
+    with_engine(None)
+    sklearn_results = [predict.score_crop_failure(**s) for s in scenarios]
+    with_engine(compiled)
+    compiled_results = [predict.score_crop_failure(**s) for s in scenarios]
+    response_mismatches = sum(a != b for a, b in zip(sklearn_results, compiled_results))
+
+    # ------------------------------------------------------------------------
+    # Latency
+    # ------------------------------------------------------------------------
+    report = {"rows": len(scenarios), "probability_mismatches": probability_mismatches,
+              "response_mismatches": response_mismatches, "latency": {}}
+
+    def model_only_sklearn(row):
+        predict.active.model.predict_proba(predict.active.scaler.transform(row[np.newaxis]))[0][1]
+
+    for name, compiled_engine in (("sklearn", None), ("compiled", compiled)):
+        print(f"⏱️  {name}...")
+        with_engine(compiled_engine)
+        report["latency"][name] = {
+            "score_crop_failure": time_calls(lambda s: predict.score_crop_failure(**s), scenarios, args.repeat),
+            "model_only": time_calls(compiled.failure_probability if compiled_engine else model_only_sklearn,
+                                     list(features), args.repeat)
+        }
+    with_engine(compiled)
+
+    # ------------------------------------------------------------------------
+    # Path contributions
+    # ------------------------------------------------------------------------
+    print("⏱️  path contributions...")
+    report["latency"]["path_contributions"] = {
+        "path_contributions_1_row": time_calls(compiled.path_contributions, list(features), args.repeat)
+    }
+    start = time.perf_counter()
+    base, contributions = compiled.path_contributions(features)
+    batch_seconds = time.perf_counter() - start
+    report["path_contributions"] = {
+        "batch_rows": len(features),
+        "batch_us_per_row": batch_seconds / len(features) * 1e6,
+        # base + contributions must reproduce predict_proba
+        "max_additivity_error": float(np.abs(base + contributions.sum(axis=1) - expected).max())
+    }
+
+    print("\n" + "="*80)
+    print(" "*25 + "RISK INFERENCE BENCHMARK")
+    print("="*80)
+    print(f"{'engine':12s} {'stage':22s} {'mean us':>10s} {'p50 us':>10s} {'p99 us':>10s}")
+    print("-"*80)
+    for name, stages in report["latency"].items():
+        for stage, stats in stages.items():
+            print(f"{name:12s} {stage:22s} {stats['mean_us']:10.1f} {stats['p50_us']:10.1f} {stats['p99_us']:10.1f}")
+    print("-"*80)
+    speedup = (report["latency"]["sklearn"]["score_crop_failure"]["mean_us"]
+               / report["latency"]["compiled"]["score_crop_failure"]["mean_us"])
+    print(f"Speed-up (score_crop_failure): {speedup:.1f}x")
+    print(f"Probability mismatches (bitwise): {probability_mismatches} / {len(features)}")
+    print(f"Response mismatches:              {response_mismatches} / {len(scenarios)}")
+    print(f"Path contributions (batch):      {report['path_contributions']['batch_us_per_row']:.1f} us/row, "
+          f"max additivity error {report['path_contributions']['max_additivity_error']:.1e}")
+    print("="*80 + "\n")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+AgriShield - Startup Benchmark
+Cold-start time, time to readiness and first-request latency for each
+startup mode, against the original behaviour (eager loading, no warm-up)
+
+Each scenario runs in a fresh interpreter so imports and graph tracing are
+really cold.
+
+Usage (from backend/):
+    python benchmark_startup.py [--image ../data/images/tomato.jpeg] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_IMAGE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "images", "tomato-late-blight.jpg"
+)
+
+# name -> (AGRISHIELD_STARTUP, AGRISHIELD_WARMUP)
+SCENARIOS = {
+    "before (eager, no warm-up)": ("eager", "off"),
+    "eager + warm-up": ("eager", "on"),
+    "background + warm-up": ("background", "on"),
+    "lazy + warm-up": ("lazy", "on")
+}
+
+RISK_REQUEST = {
+    "crop": "Rice", "state": "Punjab", "district": "Punjab", "season": "Kharif",
+    "temperature": 28.0, "rainfall": 1200.0, "humidity": 75.0, "disaster_occurred": 0
+}
+CROP_REQUEST = {"N": 90, "P": 42, "K": 43, "temperature": 21.0, "humidity": 82.0, "ph": 6.5, "rainfall": 203.0}
+
+
+# ============================================================================
+# CHILD PROCESS (one scenario)
+# ============================================================================
+
+def run_child(image_path: str, ready_timeout: float):
+    process_start = time.perf_counter()
+    from fastapi.testclient import TestClient
+    import main
+    import subsystems
+    import_seconds = time.perf_counter() - process_start
+
+    # Poll readiness off the request path so it does not delay the probes below
+    ready_at = {}
+
+    def watch():
+        deadline = time.perf_counter() + ready_timeout
+        while time.perf_counter() < deadline:
+            status = subsystems.readiness()
+            states = [s["state"] for s in status["subsystems"].values()]
+            if all(state in ("ready", "failed") for state in states):
+                ready_at["seconds"] = time.perf_counter() - process_start
+                return
+            time.sleep(0.05)
+
+    client = TestClient(main.app)
+    client.__enter__()
+    startup_seconds = time.perf_counter() - process_start
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+
+    with open(image_path, "rb") as f:
+        image = f.read()
+
+    def timed(method, path, **kwargs):
+        start = time.perf_counter()
+        response = client.request(method, path, **kwargs)
+        return {"status": response.status_code, "ms": (time.perf_counter() - start) * 1000}
+
+    def probes(salt):
+        # A unique suffix per call keeps the disease result cache out of the measurement
+        return {
+            "health": timed("GET", "/api/health"),
+            "detect_disease": timed("POST", "/api/detect-disease",
+                                    files={"file": (f"leaf{salt}.jpg", image + salt.encode(), "image/jpeg")}),
+            "predict_risk": timed("POST", "/api/predict-risk", json=RISK_REQUEST),
+            "recommend_crop": timed("POST", "/api/recommend-crop", json=CROP_REQUEST)
+        }
+
+    first = probes("first")
+    watcher.join()
+    steady = probes("steady")
+
+    print(json.dumps({
+        "import_seconds": import_seconds,
+        "startup_seconds": startup_seconds,
+        "all_loaded_seconds": ready_at.get("seconds"),
+        "first_request": first,
+        "steady_request": steady,
+        "subsystems": subsystems.readiness()["subsystems"]
+    }))
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start and first-request latency per startup mode")
+    parser.add_argument("--image", default=DEFAULT_IMAGE)
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.image, args.ready_timeout)
+        return
+
+    report = {}
+    for name, (mode, warmup) in SCENARIOS.items():
+        print(f"⏱️  {name}...")
+        env = dict(os.environ, AGRISHIELD_STARTUP=mode, AGRISHIELD_WARMUP=warmup)
+        cmd = [sys.executable, __file__, "--child", "--image", args.image, "--ready-timeout", str(args.ready_timeout)]
+        output = subprocess.run(cmd, check=True, capture_output=True, text=True, env=env).stdout
+        report[name] = json.loads(output.strip().splitlines()[-1])
+
+    endpoints = ["detect_disease", "predict_risk", "recommend_crop"]
+    print("\n" + "="*110)
+    print(" "*42 + "STARTUP BENCHMARK")
+    print("="*110)
+    print(f"{'scenario':28s} {'import s':>9s} {'startup s':>10s} {'loaded s':>9s}   "
+          + "  ".join(f"{e + ' 1st/2nd ms':>26s}" for e in endpoints))
+    print("-"*110)
+    for name, r in report.items():
+        loaded = r["all_loaded_seconds"]
+        cells = "  ".join(
+            f"{r['first_request'][e]['ms']:>12.1f} / {r['steady_request'][e]['ms']:<11.1f}" for e in endpoints
+        )
+        print(f"{name:28s} {r['import_seconds']:9.2f} {r['startup_seconds']:10.2f} "
+              f"{loaded if loaded is not None else float('nan'):9.2f}   {cells}")
+    print("="*110)
+    print("startup = until the app accepts requests; loaded = until every subsystem is ready or failed\n")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
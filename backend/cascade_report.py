@@ -0,0 +1,117 @@
+"""
+AgriShield - Plant Validator Cascade Report
+Measures how often the cheap colour/texture cascade skips the CNN plant
+validator and how its decisions differ from running the CNN on every image
+
+Positives are the PlantVillage test split (all leaves); negatives are an
+optional folder of non-plant images (people, documents, screens, ...).
+
+Usage (from backend/):
+    python cascade_report.py [--limit-per-class N] [--negatives DIR] [--output cascade.json]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+import disease
+from plantvillage import IMAGE_EXTENSIONS, list_split
+from preprocessing import prepare_image
+
+
+def list_negatives(directory: str):
+    files = []
+    for root, _, names in os.walk(directory):
+        files.extend(os.path.join(root, n) for n in names if n.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(files)
+
+
+def evaluate(paths, expected_plant: bool, batch_size: int) -> dict:
+    """Run the CNN-only validator and the cascade over the same images"""
+    cnn_flags, cascade_flags, decisions = [], [], []
+    cnn_seconds = 0.0
+
+    for i in range(0, len(paths), batch_size):
+        prepared = [prepare_image(Image.open(p)) for p in paths[i:i + batch_size]]
+
+        start = time.perf_counter()
+        flags = disease.plant_flags_from_predictions(prepared, disease.imagenet_predictions(prepared))
+        cnn_seconds += time.perf_counter() - start
+
+        batch_decisions = [disease.cheap_plant_decision(p) for p in prepared]
+        cnn_flags.extend(flags)
+        decisions.extend(batch_decisions)
+        cascade_flags.extend(flag if decision is None else decision
+                             for flag, decision in zip(flags, batch_decisions))
+
+    cnn_flags = np.array(cnn_flags)
+    cascade_flags = np.array(cascade_flags)
+    skipped = np.array([d is not None for d in decisions])
+    total = max(len(paths), 1)
+
+    return {
+        "images": len(paths),
+        "expected": "plant" if expected_plant else "not_plant",
+        "accepted_cheap": int(sum(d is True for d in decisions)),
+        "rejected_cheap": int(sum(d is False for d in decisions)),
+        "cnn_skip_fraction": float(skipped.sum() / total),
+        "agreement_with_cnn": float(np.mean(cascade_flags == cnn_flags)) if len(paths) else 0.0,
+        "cnn_accuracy": float(np.mean(cnn_flags == expected_plant)) if len(paths) else 0.0,
+        "cascade_accuracy": float(np.mean(cascade_flags == expected_plant)) if len(paths) else 0.0,
+        "cnn_ms_per_image": cnn_seconds * 1000 / total,
+        "est_validator_ms_saved_per_image": cnn_seconds * 1000 / total * float(skipped.sum() / total)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CNN skip rate and accuracy impact of the plant cascade")
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--limit-per-class", type=int, default=None)
+    parser.add_argument("--negatives", default=None, help="Folder of non-plant images")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    if not disease.PLANT_CASCADE:
+        print("⚠️  AGRISHIELD_PLANT_CASCADE is off; every image would go to the CNN")
+
+    report = {
+        "thresholds": {
+            "accept_green": disease.CASCADE_ACCEPT_GREEN,
+            "reject_plant_colour": disease.CASCADE_REJECT_PLANT_COLOUR,
+            "reject_saturation": disease.CASCADE_REJECT_SATURATION,
+            "reject_texture": disease.CASCADE_REJECT_TEXTURE
+        },
+        "sets": {}
+    }
+
+    print("📊 Evaluating PlantVillage positives...")
+    positives = [path for path, _ in list_split(args.split, limit_per_class=args.limit_per_class)]
+    report["sets"]["plantvillage_" + args.split] = evaluate(positives, True, args.batch_size)
+
+    if args.negatives:
+        print("📊 Evaluating non-plant negatives...")
+        report["sets"]["negatives"] = evaluate(list_negatives(args.negatives), False, args.batch_size)
+
+    print("\n" + "="*90)
+    print(" "*30 + "PLANT VALIDATOR CASCADE REPORT")
+    print("="*90)
+    print(f"{'set':22s} {'images':>7s} {'skip CNN':>9s} {'agree':>7s} {'CNN acc':>8s} {'cascade acc':>12s} {'ms saved':>9s}")
+    print("-"*90)
+    for name, r in report["sets"].items():
+        print(f"{name:22s} {r['images']:7d} {r['cnn_skip_fraction']:9.2%} {r['agreement_with_cnn']:7.4f} "
+              f"{r['cnn_accuracy']:8.4f} {r['cascade_accuracy']:12.4f} {r['est_validator_ms_saved_per_image']:9.2f}")
+    print("="*90 + "\n")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
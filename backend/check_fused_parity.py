@@ -0,0 +1,200 @@
+"""
+AgriShield - Fused Backbone Parity Check
+Compares the fused single-backbone disease path against the original
+two-model path (ImageNet MobileNetV2 + best_cpu_model.keras) on the
+PlantVillage test split and, optionally, a folder of non-plant images
+
+The fused ImageNet head reads features computed from 160x160 inputs scaled
+to [0, 1], not the 224x224 [-1, 1] inputs it was trained on, so besides the
+final plant decision the report compares the ImageNet top-1/top-5 classes of
+the two paths directly. PlantVillage is almost all green leaves, where the
+green-ratio fallback hides head errors; the non-plant set is what shows them.
+
+Usage (from backend/):
+    python check_fused_parity.py [--limit-per-class N] [--negatives DIR] [--batch-size 32] [--output parity.json]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+# Load the original two-model path; the fused graph is built from it below
+os.environ["AGRISHIELD_DISEASE_BACKBONE"] = "separate"
+
+import disease
+from cascade_report import list_negatives
+from fused_model import build_fused_model
+from plantvillage import list_split
+from preprocessing import prepare_image
+
+
+def run_separate(prepared):
+    """Original path: 224x224 ImageNet filter, then 160x160 disease classifier"""
+    imagenet_preds = disease.active.plant_filter.predict(disease.filter_batch(prepared), verbose=0)
+    disease_preds = disease.active.model.predict(disease.classifier_batch(prepared), verbose=0)
+    return imagenet_preds, disease_preds
+
+
+def run_fused(fused_model, prepared):
+    """Fused path: one 160x160 backbone pass, two heads"""
+    imagenet_preds, disease_preds = fused_model.predict(disease.classifier_batch(prepared), verbose=0)
+    return imagenet_preds, disease_preds
+
+
+def final_label(is_plant, probs):
+    """Same decision the endpoint returns: invalid or the predicted class"""
+    if not is_plant:
+        return "invalid"
+    return disease.build_disease_result(probs)["disease"]
+
+
+def imagenet_agreement(sep_imagenet: np.ndarray, fus_imagenet: np.ndarray):
+    """Per image: same top-1 class, and the fraction of the separate top-5 also in the fused top-5"""
+    sep_top5 = np.argsort(sep_imagenet, axis=1)[:, -5:]
+    fus_top5 = np.argsort(fus_imagenet, axis=1)[:, -5:]
+    top1 = sep_top5[:, -1] == fus_top5[:, -1]
+    top5 = np.array([len(set(a) & set(b)) / 5 for a, b in zip(sep_top5, fus_top5)])
+    return top1, top5
+
+
+def compare(fused_model, samples, batch_size: int, label: str) -> dict:
+    """
+    Run both paths over (path, class name or None) samples; class None marks
+    a non-plant image, whose correct response is "invalid"
+    """
+    counts = {
+        "images": 0,
+        "imagenet_top1_agree": 0,
+        "imagenet_top5_overlap": 0.0,
+        "plant_agree": 0,
+        "separate_plant": 0,
+        "fused_plant": 0,
+        "top1_agree": 0,
+        "final_agree": 0,
+        "separate_correct": 0,
+        "fused_correct": 0
+    }
+    max_prob_diff = 0.0
+    separate_seconds = 0.0
+    fused_seconds = 0.0
+
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        prepared = [prepare_image(Image.open(path)) for path, _ in chunk]
+
+        t0 = time.perf_counter()
+        sep_imagenet, sep_disease = run_separate(prepared)
+        t1 = time.perf_counter()
+        fus_imagenet, fus_disease = run_fused(fused_model, prepared)
+        t2 = time.perf_counter()
+        separate_seconds += t1 - t0
+        fused_seconds += t2 - t1
+
+        sep_plant = disease.plant_flags_from_predictions(prepared, sep_imagenet)
+        fus_plant = disease.plant_flags_from_predictions(prepared, fus_imagenet)
+        max_prob_diff = max(max_prob_diff, float(np.max(np.abs(sep_disease - fus_disease))))
+        top1, top5 = imagenet_agreement(sep_imagenet, fus_imagenet)
+        counts["imagenet_top1_agree"] += int(top1.sum())
+        counts["imagenet_top5_overlap"] += float(top5.sum())
+
+        for i, (_, class_name) in enumerate(chunk):
+            sep_label = final_label(sep_plant[i], sep_disease[i])
+            fus_label = final_label(fus_plant[i], fus_disease[i])
+            expected = class_name or "invalid"
+            counts["images"] += 1
+            counts["plant_agree"] += int(sep_plant[i] == fus_plant[i])
+            counts["separate_plant"] += int(sep_plant[i])
+            counts["fused_plant"] += int(fus_plant[i])
+            counts["top1_agree"] += int(np.argmax(sep_disease[i]) == np.argmax(fus_disease[i]))
+            counts["final_agree"] += int(sep_label == fus_label)
+            counts["separate_correct"] += int(sep_label == expected)
+            counts["fused_correct"] += int(fus_label == expected)
+
+        print(f"   {label}: processed {counts['images']}/{len(samples)}", end="\r")
+    print()
+
+    n = max(counts["images"], 1)
+    return {
+        "images": counts["images"],
+        "imagenet_top1_agreement": counts["imagenet_top1_agree"] / n,
+        "imagenet_top5_overlap": counts["imagenet_top5_overlap"] / n,
+        "plant_decision_agreement": counts["plant_agree"] / n,
+        "separate_plant_rate": counts["separate_plant"] / n,
+        "fused_plant_rate": counts["fused_plant"] / n,
+        "disease_top1_agreement": counts["top1_agree"] / n,
+        "final_response_agreement": counts["final_agree"] / n,
+        "max_disease_prob_abs_diff": max_prob_diff,
+        "separate_accuracy": counts["separate_correct"] / n,
+        "fused_accuracy": counts["fused_correct"] / n,
+        "separate_ms_per_image": separate_seconds * 1000 / n,
+        "fused_ms_per_image": fused_seconds * 1000 / n
+    }
+
+
+def print_section(title: str, section: dict):
+    print(f"\n📊 {title}")
+    print("-"*80)
+    for key, value in section.items():
+        print(f"   {key:28s}: {value:.4f}" if isinstance(value, float) else f"   {key:28s}: {value}")
+
+
+def main():
+    disease.disease_models.get()
+    parser = argparse.ArgumentParser(description="Fused vs two-model parity on the PlantVillage test split")
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--limit-per-class", type=int, default=None)
+    parser.add_argument("--negatives", default=None, help="Folder of non-plant images")
+    parser.add_argument("--limit-negatives", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print(" "*25 + "FUSED BACKBONE PARITY CHECK")
+    print("="*80 + "\n")
+
+    fused_model = build_fused_model(disease.active.model, disease.active.plant_filter)
+    samples = list_split(args.split, limit_per_class=args.limit_per_class)
+    print(f"📥 {len(samples)} images from split '{args.split}'")
+
+    # Warm up both graphs so tracing is not counted
+    warm = [prepare_image(Image.open(path)) for path, _ in samples[:2]]
+    sep_imagenet, _ = run_separate(warm)
+    run_fused(fused_model, warm)
+    if np.allclose(sep_imagenet, sep_imagenet.mean()):
+        print("⚠️  The ImageNet filter gives uniform probabilities (placeholder weights?); "
+              "agreement figures below are meaningless")
+
+    report = {
+        "plants": compare(fused_model, samples, args.batch_size, "plants"),
+        "non_plants": None,
+        "separate_params": disease.active.model.count_params() + disease.active.plant_filter.count_params(),
+        "fused_params": fused_model.count_params()
+    }
+    if args.negatives:
+        negatives = list_negatives(args.negatives)[:args.limit_negatives]
+        print(f"📥 {len(negatives)} non-plant images from {args.negatives}")
+        report["non_plants"] = compare(fused_model, [(path, None) for path in negatives], args.batch_size,
+                                       "non-plants")
+
+    print_section("PARITY RESULTS: PLANTVILLAGE", report["plants"])
+    if report["non_plants"] is not None:
+        print_section("PARITY RESULTS: NON-PLANTS", report["non_plants"])
+    else:
+        print("\n⚠️  No --negatives folder: head errors on non-plant images are not measured")
+    print(f"\n   separate_params: {report['separate_params']}, fused_params: {report['fused_params']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Report saved: {args.output}")
+
+    print("\n" + "="*80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
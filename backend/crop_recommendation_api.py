@@ -4,10 +4,12 @@ FastAPI router for crop recommendation based on soil and climate conditions
 """
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
-import joblib
+from typing import List, Dict, Any, NamedTuple, Optional
 import numpy as np
-import os
+from executors import run_in_executor
+from model_bundle import open_bundle
+from model_registry import ModelSlot, add_slot
+from subsystems import Subsystem, register
 
 # ============================================================================
 # ROUTER SETUP
@@ -21,26 +23,50 @@ router = APIRouter(
 # ============================================================================
 # LOAD MODELS
 # ============================================================================
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-# Navigate up to project root, then into models directory
-PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)  # Go up from backend to project root
-MODEL_PATH = os.path.join(PROJECT_ROOT, "models", "crop_recommendation_model.pkl")
-SCALER_PATH = os.path.join(PROJECT_ROOT, "models", "scaler2.pkl")
-
-try:
-    model = joblib.load(MODEL_PATH)
-    scaler = joblib.load(SCALER_PATH)
-    print("✅ Crop recommendation model loaded successfully")
-    print(f"📁 Model path: {MODEL_PATH}")
-    print(f"📁 Scaler path: {SCALER_PATH}")
+# The "crop-recommendation" model bundle (model_bundle.py), or the loose files in models/
+CROP_BUNDLE = open_bundle("crop-recommendation")
+MODEL_PATH = CROP_BUNDLE.path("model")
+SCALER_PATH = CROP_BUNDLE.path("scaler")
+
+
+class CropModels(NamedTuple):
+    """The classifier and its scaler, swapped together on reload"""
+    bundle: object
+    model: object
+    scaler: object
+
+
+# Set by load_models() when the "crop-recommendation" subsystem loads, and
+# replaced by model_registry.py when a new bundle is installed (which also
+# brings the endpoint up if the model was missing at startup)
+active: Optional[CropModels] = None
+MODEL_LOADED = False
+
+
+def read_crop_models(bundle) -> CropModels:
+    return CropModels(bundle, bundle.load("model"), bundle.load("scaler"))
+
+
+def install(models: CropModels):
+    global active, CROP_BUNDLE, MODEL_PATH, SCALER_PATH, MODEL_LOADED
+    CROP_BUNDLE = models.bundle
+    MODEL_PATH = CROP_BUNDLE.path("model")
+    SCALER_PATH = CROP_BUNDLE.path("scaler")
+    active = models
     MODEL_LOADED = True
-except Exception as e:
-    print(f"⚠️ Warning: Could not load crop recommendation model - {e}")
-    print(f"❌ Attempted model path: {MODEL_PATH}")
-    print(f"❌ Attempted scaler path: {SCALER_PATH}")
-    model = None
-    scaler = None
-    MODEL_LOADED = False
+
+
+def load_models():
+    """Load the recommendation model and scaler; a missing model leaves MODEL_LOADED False"""
+    try:
+        install(read_crop_models(CROP_BUNDLE))
+        print("✅ Crop recommendation model loaded successfully")
+        print(f"📁 Model path: {MODEL_PATH}")
+        print(f"📁 Scaler path: {SCALER_PATH}")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not load crop recommendation model - {e}")
+        print(f"❌ Attempted model path: {MODEL_PATH}")
+        print(f"❌ Attempted scaler path: {SCALER_PATH}")
     
 # ============================================================================
 # CROP INFORMATION DATABASE
@@ -203,6 +229,49 @@ class CropRecommendationResponse(BaseModel):
     message: str
 
 
+# ============================================================================
+# INFERENCE
+# ============================================================================
+
+def predict_crop_probabilities(features: np.ndarray, models: Optional[CropModels] = None):
+    """
+    Scale features and run the classifier (`models`, by default the active ones)
+
+    Kept at module level so it can be pickled to a process pool worker,
+    which loads its own copy of the model when it imports this module.
+
+    Returns:
+        tuple: (prediction, probabilities, the classes they refer to)
+    """
+    if models is None:
+        crop_models.get()
+        models = active
+    features_scaled = models.scaler.transform(features)
+    prediction = models.model.predict(features_scaled)[0]
+    probabilities = models.model.predict_proba(features_scaled)[0]
+    return prediction, probabilities, models.model.classes_
+
+
+def warm_up():
+    if MODEL_LOADED:
+        predict_crop_probabilities(np.array([[90, 42, 43, 21.0, 82.0, 6.5, 203.0]]))
+
+
+# Bound before registering: the eager-mode warm-up goes through crop_models
+crop_models = Subsystem("crop-recommendation", load_models, warm_up)
+register(crop_models)
+
+# Hot reload (model_registry.py); a candidate agrees when it recommends the same crop
+crop_slot = add_slot(ModelSlot(
+    "crop-recommendation", crop_models,
+    read=read_crop_models,
+    install=install,
+    current_bundle=lambda: CROP_BUNDLE,
+    score=lambda models, features: predict_crop_probabilities(features, models),
+    agree=lambda live, shadow: (int(live[0] == shadow[0]), 1)
+))
+
+
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
@@ -234,6 +303,7 @@ async def recommend_crop(request: CropRecommendationRequest):
     - Soil analysis
     - Alternative crop suggestions
     """
+    await crop_models.get_async()
     
     if not MODEL_LOADED:
         raise HTTPException(
@@ -253,19 +323,15 @@ async def recommend_crop(request: CropRecommendationRequest):
             request.rainfall
         ]])
         
-        # Scale features
-        features_scaled = scaler.transform(features)
-        
-        # Make prediction
-        prediction = model.predict(features_scaled)[0]
-        
-        # Get prediction probabilities for confidence and alternatives
-        probabilities = model.predict_proba(features_scaled)[0]
+        # Scale + predict on the sklearn pool so the event loop stays free
+        result = await run_in_executor("sklearn", predict_crop_probabilities, features)
+        crop_slot.maybe_shadow(features, result)
+        prediction, probabilities, classes = result
         confidence = float(np.max(probabilities))
         
         # Get top 3 alternative crops
         top_indices = np.argsort(probabilities)[-4:-1][::-1]  # Top 3 excluding the best
-        alternative_crops = [model.classes_[i] for i in top_indices]
+        alternative_crops = [classes[i] for i in top_indices]
         
         # Get crop details
         crop_key = prediction.lower()
@@ -371,6 +437,7 @@ async def get_model_status():
     - Model loaded status
     - Model information if available
     """
+    await crop_models.get_async()
     
     if MODEL_LOADED:
         return {
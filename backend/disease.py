@@ -1,24 +1,143 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, UploadFile, HTTPException, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from PIL import Image
 import numpy as np
-import tensorflow as tf
-import io
+import asyncio
 import json
-from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2, preprocess_input, decode_predictions
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from typing import AsyncIterator, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from batching import MicroBatcher
+from cache import LRUCache
+from executors import get_executor, run_in_executor
+from frame_stream import FrameScanSession, stream_counts
+from image_hash import dhash
+from model_bundle import MODELS_DIR, open_bundle
+from model_registry import ModelSlot, add_slot
+from preprocessing import ImageTooLarge, PreparedImage, decode_image, decode_upload, prepare_image
+from similarity import load_index
+from subsystems import Subsystem, register
+from tiling import Tile, crop_tiles, decode_for_tiling
+from uploads import (
+    MAX_UPLOAD_BYTES, UploadTooLarge, form_upload, read_capped, read_upload_form, spool_upload, upload_metrics,
+    upload_openapi
+)
 
 router = APIRouter(
     prefix="/api",
     tags=["Disease Detection"]
 )
 
-# Load models
-model = tf.keras.models.load_model("../models/best_cpu_model.keras")
-plant_filter = MobileNetV2(weights="imagenet")
+# "separate" runs the ImageNet MobileNetV2 (224x224, [-1, 1] inputs) for the
+# plant check and the disease classifier on its own input. "fused" runs one
+# backbone pass for both heads, but the ImageNet head then reads features of
+# the classifier's 160x160 [0, 1] inputs, which it was not trained on; it
+# stays opt-in until check_fused_parity.py (ImageNet top-k agreement and
+# non-plant results) has been run against the real weights.
+DISEASE_BACKBONE = os.getenv("AGRISHIELD_DISEASE_BACKBONE", "separate")
+if DISEASE_BACKBONE not in ("fused", "separate"):
+    raise ValueError(f"Unknown AGRISHIELD_DISEASE_BACKBONE: {DISEASE_BACKBONE}")
+
+# "keras" serves the loaded Keras graph; "tflite-fp16" / "tflite-int8" serve a
+# post-training quantized copy of the same graph through tf.lite.Interpreter
+DISEASE_ENGINE = os.getenv("AGRISHIELD_DISEASE_ENGINE", "keras")
+
+# The "disease" model bundle (model_bundle.py), or the loose files in models/
+DISEASE_BUNDLE = open_bundle("disease")
+MODEL_PATH = DISEASE_BUNDLE.path("model")
+CLASS_INDICES_PATH = DISEASE_BUNDLE.path("class_indices")
+
+# Nearest labelled training leaves returned with a diagnosis (0 disables);
+# requests choose how many of these to receive with ?similar=N
+SIMILAR_CASES_K = int(os.getenv("AGRISHIELD_SIMILAR_CASES_K", "5"))
+SIMILAR_INDEX_PREFIX = os.path.join(MODELS_DIR, "similar_cases")
+
+class DiseaseModels(NamedTuple):
+    """The graphs and labels of one disease bundle, swapped as a unit on reload"""
+    bundle: object                      # ModelBundle or LooseFiles it came from
+    model: object                       # Keras classifier (None when a fused TFLite graph replaces it)
+    fused_model: object                 # fused mode: one backbone, ImageNet + disease heads
+    plant_filter: object                # separate mode: the ImageNet MobileNetV2
+    classifier_with_embedding: object   # separate mode: the classifier with its pooled features as a second output
+    similar_index: object               # similarity.SimilarIndex, or None
+    class_names: Dict[int, str]
+    healthy_classes: List[int]
+
+# Set by load_models() and replaced by model_registry.py when a new bundle is
+# installed; read it once per batch. TensorFlow is only imported when loading.
+active: Optional[DiseaseModels] = None
+
+def read_disease_models(bundle) -> DiseaseModels:
+    """Import TensorFlow and load the disease graph(s) of a bundle"""
+    import tensorflow as tf
+    from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2
+    from fused_model import build_fused_model, find_pooling_layer
+    from tflite_engine import ENGINES, load_or_convert
+
+    if DISEASE_ENGINE not in ENGINES:
+        raise ValueError(f"Unknown AGRISHIELD_DISEASE_ENGINE: {DISEASE_ENGINE}")
+
+    model_path = bundle.path("model")
+    similar_index = load_index(SIMILAR_INDEX_PREFIX, model_path) if SIMILAR_CASES_K > 0 else None
+    fused_model = plant_filter = classifier_with_embedding = None
+
+    # Load models
+    model = tf.keras.models.load_model(bundle.load("model"))
+    embedding_dim = find_pooling_layer(model).output_shape[-1]
+    if DISEASE_BACKBONE == "fused":
+        # Only the ImageNet Dense head is kept; its backbone is released
+        fused_model = build_fused_model(model, MobileNetV2(weights="imagenet"),
+                                        include_embedding=similar_index is not None)
+    else:
+        plant_filter = MobileNetV2(weights="imagenet")
+        if similar_index is not None:
+            classifier_with_embedding = tf.keras.Model(model.input, [model.output, find_pooling_layer(model).output])
+
+    if DISEASE_ENGINE != "keras":
+        quant_mode = DISEASE_ENGINE.split("-", 1)[1]
+        if fused_model is not None:
+            num_classes = model.output_shape[-1]
+            if similar_index is not None:
+                fused_model = load_or_convert(fused_model, model_path, "fused-embedding", quant_mode,
+                                              output_dims=[1000, num_classes, embedding_dim])
+            else:
+                fused_model = load_or_convert(fused_model, model_path, "fused", quant_mode,
+                                              output_dims=[1000, num_classes])
+            # The quantized graph carries both heads; drop the Keras copy
+            model = None
+        else:
+            model = load_or_convert(model, model_path, "classifier", quant_mode)
+            if similar_index is not None:
+                print("⚠️ Similar cases need the fused backbone with a TFLite engine; disabled")
+                similar_index = classifier_with_embedding = None
+
+    class_names = read_class_names(bundle)
+    return DiseaseModels(bundle, model, fused_model, plant_filter, classifier_with_embedding, similar_index,
+                         class_names, healthy_classes(class_names))
+
+def install(models: DiseaseModels):
+    """Make `models` the ones new batches run on"""
+    global active, DISEASE_BUNDLE, MODEL_PATH, CLASS_INDICES_PATH, CLASS_NAMES, HEALTHY_CLASSES
+    DISEASE_BUNDLE = models.bundle
+    MODEL_PATH = DISEASE_BUNDLE.path("model")
+    CLASS_INDICES_PATH = DISEASE_BUNDLE.path("class_indices")
+    CLASS_NAMES, HEALTHY_CLASSES = models.class_names, models.healthy_classes
+    active = models
+
+def load_models():
+    install(read_disease_models(DISEASE_BUNDLE))
+
+def read_class_names(bundle) -> Dict[int, str]:
+    return {v: k for k, v in bundle.load("class_indices").items()}
 
-# Load class indices
-with open("../models/class_indices.json", "r") as f:
-    class_indices = json.load(f)
-CLASS_NAMES = {v: k for k, v in class_indices.items()}
+def healthy_classes(class_names: Dict[int, str]) -> List[int]:
+    return [idx for idx, name in class_names.items() if name.endswith("healthy")]
+
+# Load class indices (available before the models, for reports and the API)
+CLASS_NAMES = read_class_names(DISEASE_BUNDLE)
 
 # Disease information dictionary (DISEASE_INFO) remains same as your code
 # Comprehensive disease information with descriptions and treatments
@@ -92,70 +211,644 @@ PLANT_KEYWORDS = [
 ]
 
 def preprocess_image(image):
-    image = image.resize((160, 160))
-    image = np.array(image) / 255.0
-    image = np.expand_dims(image, axis=0)
-    return image
+    return np.expand_dims(prepare_image(image).classifier_pixels, axis=0)
 
-def is_plant_image(image: Image.Image) -> bool:
-    # Resize for MobileNetV2
-    img = image.resize((224, 224))
-    arr = np.array(img)
-    arr = np.expand_dims(arr, axis=0)
-    arr = preprocess_input(arr)
-
-    preds = plant_filter.predict(arr)
-    decoded = decode_predictions(preds, top=10)[0]
-
-    # Step 1: keyword match
-    for _, label, _ in decoded:
-        if any(keyword in label.lower() for keyword in PLANT_KEYWORDS):
-            return True
-
-    # Step 2: green pixel ratio fallback
-    arr_rgb = np.array(image)
-    green_ratio = np.mean((arr_rgb[:,:,1] > arr_rgb[:,:,0]) & (arr_rgb[:,:,1] > arr_rgb[:,:,2]))
-    if green_ratio > 0.25:
+def classifier_batch(prepared: List[PreparedImage]) -> np.ndarray:
+    return np.stack([p.classifier_pixels for p in prepared])
+
+def filter_batch(prepared: List[PreparedImage]) -> np.ndarray:
+    # Input for the standalone ImageNet MobileNetV2
+    from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
+    return preprocess_input(np.stack([p.filter_pixels for p in prepared]).astype(np.float32))
+
+def plant_flags_from_predictions(prepared: List[PreparedImage], preds: np.ndarray) -> List[bool]:
+    """Turn ImageNet predictions into plant/not-plant decisions"""
+    from tensorflow.keras.applications.mobilenet_v2 import decode_predictions
+    results = []
+    for p, decoded in zip(prepared, decode_predictions(preds, top=10)):
+        # Step 1: keyword match
+        if any(any(keyword in label.lower() for keyword in PLANT_KEYWORDS) for _, label, _ in decoded):
+            results.append(True)
+            continue
+
+        # Step 2: green pixel ratio fallback (precomputed on the 224x224 array)
+        # Step 3: otherwise invalid
+        results.append(p.green_ratio > GREEN_RATIO_THRESHOLD)
+
+    return results
+
+def imagenet_predictions(prepared: List[PreparedImage], models: Optional[DiseaseModels] = None) -> np.ndarray:
+    if models is None:
+        disease_models.get()
+        models = active
+    if models.fused_model is not None:
+        return models.fused_model.predict(classifier_batch(prepared))[0]
+    return models.plant_filter.predict(filter_batch(prepared))
+
+# ============================================================================
+# PLANT VALIDATOR CASCADE
+# ============================================================================
+
+# Cheap colour/texture statistics settle clear-cut images and the CNN
+# validator only runs in the ambiguous band. With the default accept
+# threshold the accept step is exact: the validator above accepts any image
+# with green_ratio > 0.25 whatever the CNN says. The reject step is a
+# heuristic for grey, flat or non-plant-coloured images.
+GREEN_RATIO_THRESHOLD = 0.25
+PLANT_CASCADE = os.getenv("AGRISHIELD_PLANT_CASCADE", "on") == "on"
+CASCADE_ACCEPT_GREEN = float(os.getenv("AGRISHIELD_CASCADE_ACCEPT_GREEN", str(GREEN_RATIO_THRESHOLD)))
+CASCADE_REJECT_PLANT_COLOUR = float(os.getenv("AGRISHIELD_CASCADE_REJECT_PLANT_COLOUR", "0.03"))
+CASCADE_REJECT_SATURATION = float(os.getenv("AGRISHIELD_CASCADE_REJECT_SATURATION", "0.05"))
+CASCADE_REJECT_TEXTURE = float(os.getenv("AGRISHIELD_CASCADE_REJECT_TEXTURE", "0.004"))
+
+cascade_counts = Counter()
+
+def cheap_plant_decision(p: PreparedImage) -> Optional[bool]:
+    """True/False for clear-cut images, None when the CNN validator must decide"""
+    if not PLANT_CASCADE:
+        return None
+    if p.green_ratio > CASCADE_ACCEPT_GREEN:
         return True
+    if (p.plant_colour_ratio < CASCADE_REJECT_PLANT_COLOUR
+            or p.saturation < CASCADE_REJECT_SATURATION
+            or p.texture < CASCADE_REJECT_TEXTURE):
+        return False
+    return None
+
+def cheap_plant_decisions(prepared: List[PreparedImage]) -> List[Optional[bool]]:
+    decisions = [cheap_plant_decision(p) for p in prepared]
+    for decision in decisions:
+        cascade_counts["cnn" if decision is None else "accepted_cheap" if decision else "rejected_cheap"] += 1
+    return decisions
+
+def cascade_stats() -> dict:
+    total = sum(cascade_counts.values())
+    skipped = cascade_counts["accepted_cheap"] + cascade_counts["rejected_cheap"]
+    return {
+        "enabled": PLANT_CASCADE,
+        "accepted_cheap": cascade_counts["accepted_cheap"],
+        "rejected_cheap": cascade_counts["rejected_cheap"],
+        "cnn": cascade_counts["cnn"],
+        "cnn_skip_fraction": round(skipped / total, 4) if total else 0.0
+    }
+
+def is_plant_image(image: Image.Image) -> bool:
+    return is_plant_images([prepare_image(image)])[0]
+
+def is_plant_images(prepared: List[PreparedImage], models: Optional[DiseaseModels] = None) -> List[bool]:
+    flags = cheap_plant_decisions(prepared)
+    ambiguous = [i for i, flag in enumerate(flags) if flag is None]
+    if ambiguous:
+        subset = [prepared[i] for i in ambiguous]
+        for i, flag in zip(ambiguous, plant_flags_from_predictions(subset, imagenet_predictions(subset, models))):
+            flags[i] = flag
+    return flags
+
+def build_disease_result(probs: np.ndarray, class_names: Optional[Dict[int, str]] = None) -> dict:
+    idx = int(np.argmax(probs))
+    confidence = float(np.max(probs))  # between 0-1
+
+    # ✅ Confidence threshold check
+    if confidence < 0.5:
+        return {"disease": "invalid", "reason": "Model confidence too low (<50%)"}
+
+    return describe_disease(idx, confidence, class_names)
+
+def describe_disease(idx: int, confidence: float, class_names: Optional[Dict[int, str]] = None) -> dict:
+    # Return disease info (class_names of the models that produced idx)
+    disease_name = (class_names or CLASS_NAMES)[idx]
+    disease_data = DISEASE_INFO.get(disease_name, {
+        "description": "Plant disease detected. Consult a plant specialist.",
+        "treatment": "Follow general plant care practices."
+    })
+
+    return {
+        "disease": disease_name,
+        "confidence": f"{confidence*100:.2f}%",
+        "description": disease_data["description"],
+        "treatment": disease_data["treatment"]
+    }
+
+def attach_similar_cases(results: List[dict], embeddings: np.ndarray, similar_index):
+    """One vectorized top-k search for every diagnosed image in the batch"""
+    diagnosed = [j for j, result in enumerate(results) if result["disease"] != "invalid"]
+    if diagnosed:
+        for j, cases in zip(diagnosed, similar_index.cases(embeddings[diagnosed], SIMILAR_CASES_K)):
+            results[j]["similar_cases"] = cases
+
+def with_similar_cases(result: dict, similar: int) -> dict:
+    """Trim the stored neighbours to what the request asked for (cached results are shared)"""
+    if "similar_cases" not in result:
+        return result
+    shaped = {key: value for key, value in result.items() if key != "similar_cases"}
+    if similar > 0:
+        shaped["similar_cases"] = result["similar_cases"][:similar]
+    return shaped
+
+def detect_diseases(images: List[Image.Image]) -> List[dict]:
+    """Run the full validation + classification pipeline on a batch of images"""
+    prepared = [prepare_image(image) for image in images]
+    results = detect_prepared(prepared)
+    # Only images that reached the classifier are compared against a candidate model
+    passed = [(p, result) for p, result in zip(prepared, results)
+              if result.get("reason") != "Not a plant or leaf image"]
+    if passed:
+        disease_slot.maybe_shadow([p for p, _ in passed], [result for _, result in passed])
+    return results
+
+def detect_prepared(prepared: List[PreparedImage], models: Optional[DiseaseModels] = None) -> List[dict]:
+    """Validation + classification on already preprocessed images"""
+    if models is None:
+        disease_models.get()
+        models = active
+    fused_model, class_names = models.fused_model, models.class_names
+    results = [None] * len(prepared)
+
+    if fused_model is not None:
+        # ✅ Step A0: cheap cascade; clear non-plants never reach the backbone
+        decisions = cheap_plant_decisions(prepared)
+        candidates = [i for i, decision in enumerate(decisions) if decision is not False]
+        for i, decision in enumerate(decisions):
+            if decision is False:
+                results[i] = {"disease": "invalid", "reason": "Not a plant or leaf image"}
+        if not candidates:
+            return results
+
+        # ✅ Steps A+B: one backbone pass gives both heads for the remaining images;
+        # the ImageNet head is only consulted for the ambiguous ones
+        outputs = fused_model.predict(classifier_batch([prepared[i] for i in candidates]))
+        imagenet_preds, disease_preds = outputs[0], outputs[1]
+        ambiguous = [j for j, i in enumerate(candidates) if decisions[i] is None]
+        if ambiguous:
+            flags = plant_flags_from_predictions([prepared[candidates[j]] for j in ambiguous], imagenet_preds[ambiguous])
+            for j, flag in zip(ambiguous, flags):
+                decisions[candidates[j]] = flag
+
+        for j, i in enumerate(candidates):
+            if decisions[i]:
+                results[i] = build_disease_result(disease_preds[j], class_names)
+            else:
+                results[i] = {"disease": "invalid", "reason": "Not a plant or leaf image"}
+
+        if models.similar_index is not None:
+            attach_similar_cases([results[i] for i in candidates], outputs[2], models.similar_index)
+        return results
+
+    # ✅ Step A: Plant/Leaf validator (one filter pass for the whole batch)
+    plant_flags = is_plant_images(prepared, models)
+    plant_idx = []
+    for i, is_plant in enumerate(plant_flags):
+        if is_plant:
+            plant_idx.append(i)
+        else:
+            results[i] = {"disease": "invalid", "reason": "Not a plant or leaf image"}
+
+    # ✅ Step B: Predict disease (one classifier pass for the valid images)
+    if plant_idx:
+        batch = classifier_batch([prepared[i] for i in plant_idx])
+        if models.classifier_with_embedding is not None:
+            preds, embeddings = models.classifier_with_embedding.predict(batch)
+        else:
+            preds, embeddings = models.model.predict(batch), None
+        for i, probs in zip(plant_idx, preds):
+            results[i] = build_disease_result(probs, class_names)
+
+        if embeddings is not None:
+            attach_similar_cases([results[i] for i in plant_idx], embeddings, models.similar_index)
+
+    return results
+
+def warm_up(models: Optional[DiseaseModels] = None):
+    """One dummy pass per graph at each batch shape the batcher produces"""
+    models = models or active
+    for size in sorted({1, BATCH_MAX_SIZE}):
+        prepared = [prepare_image(Image.new("RGB", (256, 256), (60, 140, 50)))] * size
+        if models.fused_model is not None:
+            models.fused_model.predict(classifier_batch(prepared), verbose=0)
+        else:
+            models.plant_filter.predict(filter_batch(prepared), verbose=0)
+            (models.classifier_with_embedding or models.model).predict(classifier_batch(prepared), verbose=0)
+    # The ImageNet label decode is left to the first request: Keras downloads
+    # its class index on first use, and warm-up must not need the network
+    similar_index = models.similar_index
+    if similar_index is not None:
+        similar_index.search(np.ones((1, similar_index.embedding_dim), dtype=np.float32), SIMILAR_CASES_K)
+    return models
+
+def shadow_detect(models: DiseaseModels, prepared: List[PreparedImage]) -> List[dict]:
+    """
+    A candidate's disease head on images the live pipeline already validated;
+    plant validation is not repeated (and stays out of the cascade counts)
+    """
+    return [build_disease_result(probs, models.class_names) for probs in disease_probabilities(prepared, models)]
+
+# ============================================================================
+# MICRO-BATCHING
+# ============================================================================
+
+# Concurrent uploads are gathered for up to BATCH_MAX_WAIT_MS (or until
+# BATCH_MAX_SIZE images are waiting) and run through both models together
+BATCH_MAX_SIZE = int(os.getenv("AGRISHIELD_BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("AGRISHIELD_BATCH_MAX_WAIT_MS", "10"))
+
+disease_models = register(Subsystem("disease", load_models, warm_up))
+
+# Hot reload (model_registry.py): a new bundle is loaded and warmed up beside
+# the serving graphs (briefly doubling their memory) before it is swapped in
+disease_slot = add_slot(ModelSlot(
+    "disease", disease_models,
+    read=lambda bundle: warm_up(read_disease_models(bundle)),
+    install=install,
+    current_bundle=lambda: DISEASE_BUNDLE,
+    score=shadow_detect,
+    agree=lambda live, shadow: (sum(a["disease"] == b["disease"] for a, b in zip(live, shadow)), len(live))
+))
+
+disease_batcher = MicroBatcher(
+    detect_diseases,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    name="detect-disease",
+    executor=get_executor("inference")
+)
 
-    # Step 3: otherwise invalid
-    return False
+# ============================================================================
+# TILED DETECTION
+# ============================================================================
 
-@router.post("/detect-disease")
-async def detect_disease(file: UploadFile = File(...)):
-    if not file.content_type.startswith("image/"):
+# Wide shots are cut into overlapping tiles (tiling.py) so small lesions are
+# not lost in the 160x160 squash. Tiles that fail the green-ratio plant
+# heuristic are skipped as background; the remaining tiles of every image in
+# a batch go through the classifier together. Tiled requests are batched
+# separately, up to TILE_BATCH_IMAGES photos (at most ~25 tiles each) at a time.
+TILE_MIN_GREEN = float(os.getenv("AGRISHIELD_TILE_MIN_GREEN", str(GREEN_RATIO_THRESHOLD)))
+TILE_BATCH_IMAGES = int(os.getenv("AGRISHIELD_TILE_BATCH_IMAGES", "2"))
+
+HEALTHY_CLASSES = healthy_classes(CLASS_NAMES)
+
+def disease_probabilities(prepared: List[PreparedImage], models: Optional[DiseaseModels] = None) -> np.ndarray:
+    """Disease head only, for inputs that need no plant validation"""
+    if models is None:
+        disease_models.get()
+        models = active
+    batch = classifier_batch(prepared)
+    if models.fused_model is not None:
+        return models.fused_model.predict(batch)[1]
+    if models.classifier_with_embedding is not None:
+        return models.classifier_with_embedding.predict(batch)[0]
+    return models.model.predict(batch)
+
+def tiled_result(tiles: List[Tile], kept: List[int], probs: np.ndarray, models: DiseaseModels) -> dict:
+    """
+    Per-tile results, an aggregated diagnosis and a disease-probability heatmap
+
+    The diagnosis is the disease with the largest summed confidence over
+    confidently classified tiles; the photo is only called healthy when no
+    tile is confidently diseased.
+    """
+    class_names, healthy = models.class_names, models.healthy_classes
+    heatmap = [[None] * (tiles[-1].col + 1) for _ in range(tiles[-1].row + 1)]
+    tile_rows = [{"row": t.row, "col": t.col, "box": list(t.box), "disease": "background"} for t in tiles]
+    votes = np.zeros(len(class_names))
+    affected = 0
+
+    for j, i in enumerate(kept):
+        idx = int(np.argmax(probs[j]))
+        confidence = float(probs[j, idx])
+        tile = tiles[i]
+        heatmap[tile.row][tile.col] = round(1.0 - float(probs[j, healthy].sum()), 3)
+        tile_rows[i]["disease"] = class_names[idx] if confidence >= 0.5 else "invalid"
+        tile_rows[i]["confidence"] = f"{confidence*100:.2f}%"
+        if confidence >= 0.5:
+            votes[idx] += confidence
+            affected += idx not in healthy
+
+    diseased_votes = votes.copy()
+    diseased_votes[healthy] = 0
+    if not kept:
+        result = {"disease": "invalid", "reason": "Not a plant or leaf image"}
+    elif not votes.any():
+        result = {"disease": "invalid", "reason": "Model confidence too low (<50%)"}
+    else:
+        idx = int(np.argmax(diseased_votes if diseased_votes.any() else votes))
+        result = describe_disease(idx, float(probs[:, idx].max()), class_names)
+
+    result.update({
+        "mode": "tiled",
+        "tiles_analysed": len(kept),
+        "tiles_background": len(tiles) - len(kept),
+        "tiles_affected": affected,
+        "tiles": tile_rows,
+        "heatmap": heatmap
+    })
+    return result
+
+def detect_tiled_images(images: List[Image.Image]) -> List[dict]:
+    """Tile every image, drop background tiles, classify all remaining tiles in one pass"""
+    layouts = []
+    batch = []
+    for image in images:
+        tiles, crops = crop_tiles(image)
+        prepared = [prepare_image(crop) for crop in crops]
+        kept = [i for i, p in enumerate(prepared) if p.green_ratio > TILE_MIN_GREEN]
+        layouts.append((tiles, kept, len(batch)))
+        batch.extend(prepared[i] for i in kept)
+
+    disease_models.get()
+    models = active
+    probs = disease_probabilities(batch, models) if batch else np.empty((0, len(models.class_names)), dtype=np.float32)
+    return [tiled_result(tiles, kept, probs[offset:offset + len(kept)], models) for tiles, kept, offset in layouts]
+
+tiled_batcher = MicroBatcher(
+    detect_tiled_images,
+    max_batch_size=TILE_BATCH_IMAGES,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    name="detect-disease-tiled",
+    executor=get_executor("inference")
+)
+
+# ============================================================================
+# RESULT CACHE
+# ============================================================================
+
+# "exact" keys results by a SHA-256 of the uploaded bytes; "perceptual" also
+# matches re-compressed/resized copies by their dHash; "off" disables caching
+CACHE_MODE = os.getenv("AGRISHIELD_DISEASE_CACHE", "exact")
+if CACHE_MODE not in ("exact", "perceptual", "off"):
+    raise ValueError(f"Unknown AGRISHIELD_DISEASE_CACHE: {CACHE_MODE}")
+
+result_cache = LRUCache(
+    max_entries=int(os.getenv("AGRISHIELD_DISEASE_CACHE_ENTRIES", "4096")),
+    max_bytes=int(float(os.getenv("AGRISHIELD_DISEASE_CACHE_MB", "16")) * 1024 * 1024),
+    ttl_seconds=float(os.getenv("AGRISHIELD_DISEASE_CACHE_TTL", "3600")),
+    sizer=lambda result: len(json.dumps(result)),
+    name="detect-disease"
+)
+
+# Results are keyed by image only, so a new model starts with an empty cache
+disease_slot.on_swap(lambda models: result_cache.invalidate())
+
+def content_key(sha256_hex: str) -> str:
+    return "sha256:" + sha256_hex
+
+def perceptual_key(image: Image.Image) -> str:
+    return f"dhash:{dhash(image):016x}"
+
+@router.post("/detect-disease", openapi_extra=upload_openapi("file"))
+async def detect_disease(request: Request, similar: int = 0, tiled: bool = False):
+    """
+    Diagnose one leaf photo
+
+    `similar=N` (up to AGRISHIELD_SIMILAR_CASES_K) adds the N most similar
+    labelled training leaves as `similar_cases` when the index is available.
+
+    `tiled=true` is for wide shots with many leaves: the photo is analysed in
+    overlapping tiles and the result adds `tiles` (per-tile diagnoses, boxes
+    in the scaled image) and `heatmap` (disease probability per tile, null
+    for background) to an aggregated diagnosis.
+    """
+    form = await read_upload_form(request)
+    try:
+        return await diagnose_upload(form_upload(form, "file"), similar, tiled)
+    finally:
+        await form.close()
+
+async def diagnose_upload(file: UploadFile, similar: int, tiled: bool):
+    """/detect-disease for the parsed upload"""
+    if not (file.content_type or "").startswith("image/"):
         raise HTTPException(status_code=400, detail="Invalid image file")
 
     try:
-        image = Image.open(io.BytesIO(await file.read())).convert("RGB")
-
-        # ✅ Step A: Plant/Leaf validator
-        if not is_plant_image(image):
-            return {"disease": "invalid", "reason": "Not a plant or leaf image"}
-
-        # ✅ Step B: Predict disease
-        img = preprocess_image(image)
-        preds = model.predict(img)
-        idx = int(np.argmax(preds))
-        confidence = float(np.max(preds))  # between 0-1
-
-        # ✅ Step C: Confidence threshold check
-        if confidence < 0.5:
-            return {"disease": "invalid", "reason": "Model confidence too low (<50%)"}
-
-        # Step D: Return disease info
-        disease_name = CLASS_NAMES[idx]
-        disease_data = DISEASE_INFO.get(disease_name, {
-            "description": "Plant disease detected. Consult a plant specialist.",
-            "treatment": "Follow general plant care practices."
-        })
-
-        return {
-            "disease": disease_name,
-            "confidence": f"{confidence*100:.2f}%",
-            "description": disease_data["description"],
-            "treatment": disease_data["treatment"]
-        }
+        # Streamed and hashed in chunks from the parser's spooled temp file;
+        # the upload is never copied into one bytes object
+        upload = await spool_upload(file)
+
+        # Repeat uploads skip decode and both CNN passes entirely
+        keys = []
+        if CACHE_MODE != "off":
+            keys.append(content_key(upload.sha256) + (":tiled" if tiled else ""))
+            cached = result_cache.get(keys[0])
+            if cached is not None:
+                upload_metrics.record(upload.in_memory)
+                return with_similar_cases(cached, similar)
+
+        if tiled:
+            image = await run_in_executor("inference", decode_for_tiling, upload.file)
+            upload_metrics.record(upload.in_memory + image.width * image.height * 3)
+            result = await tiled_batcher.submit(image)
+            for key in keys:
+                result_cache.put(key, result)
+            return result
+
+        # Decode on the inference pool; PIL holds the CPU for large photos.
+        # The pixel count is checked from the header before decoding.
+        image, decoded_bytes, downscaled = await run_in_executor("inference", decode_upload, upload.file)
+        upload_metrics.record(upload.in_memory + decoded_bytes, downscaled)
 
+        if CACHE_MODE == "perceptual":
+            keys.append(perceptual_key(image))
+            cached = result_cache.get(keys[1])
+            if cached is not None:
+                result_cache.put(keys[0], cached)
+                return with_similar_cases(cached, similar)
+
+        result = await disease_batcher.submit(image)
+        for key in keys:
+            result_cache.put(key, result)
+        return with_similar_cases(result, similar)
+
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImageTooLarge as e:
+        upload_metrics.reject("image_pixels")
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+@router.get("/detect-disease/stats")
+async def detect_disease_stats():
+    """Batching and result-cache statistics for tuning against p99 latency"""
+    similar_index = active.similar_index if active is not None else None
+    return {
+        "backbone": DISEASE_BACKBONE,
+        "engine": DISEASE_ENGINE,
+        "batching": disease_batcher.stats(),
+        "tiled_batching": tiled_batcher.stats(),
+        "plant_cascade": cascade_stats(),
+        "similar_cases": similar_index.stats() if similar_index is not None else None,
+        "cache": {"mode": CACHE_MODE, **result_cache.stats()},
+        "uploads": upload_metrics.stats(),
+        "stream": dict(stream_counts)
+    }
+
+# ============================================================================
+# VIDEO FRAME STREAM
+# ============================================================================
+
+# Frames buffered per connection before the oldest is dropped, frames taken
+# per worker step, and the dHash distance (of 64 bits) under which a frame
+# counts as a repeat of the last analysed one
+STREAM_QUEUE_FRAMES = int(os.getenv("AGRISHIELD_STREAM_QUEUE_FRAMES", "4"))
+STREAM_BATCH_FRAMES = int(os.getenv("AGRISHIELD_STREAM_BATCH_FRAMES", "4"))
+STREAM_DEDUP_BITS = int(os.getenv("AGRISHIELD_STREAM_DEDUP_BITS", "6"))
+
+@router.websocket("/detect-disease/stream")
+async def detect_disease_stream(websocket: WebSocket):
+    """
+    Scan a walk along a row from a phone camera
+
+    Send each JPEG frame as a binary message and the text message "end" when
+    done. Every analysed frame gets back `{"type": "diagnosis", "frame",
+    "disease", "confidence", "stats"}` (description and treatment the first
+    time a disease shows up); near-duplicates of the last analysed frame and
+    frames dropped while the server is busy are only counted in `stats`.
+    "end" is answered with `{"type": "summary"}` before the socket closes.
+    """
+    await websocket.accept()
+    session = FrameScanSession(
+        websocket,
+        decode=decode_image,
+        diagnose=disease_batcher.submit,
+        queue_frames=STREAM_QUEUE_FRAMES,
+        batch_frames=STREAM_BATCH_FRAMES,
+        dedup_bits=STREAM_DEDUP_BITS,
+        max_frame_bytes=MAX_UPLOAD_BYTES
+    )
+    await session.run()
+
+# ============================================================================
+# BULK DETECTION
+# ============================================================================
+
+# Images are pulled from the upload in chunks of BULK_CHUNK_SIZE, decoded on
+# BULK_DECODE_WORKERS threads and classified through disease_batcher (on the
+# inference pool, like single uploads), so only a single chunk of encoded
+# bytes and decoded pixels is in memory at any time
+BULK_CHUNK_SIZE = int(os.getenv("AGRISHIELD_BULK_CHUNK_SIZE", str(BATCH_MAX_SIZE)))
+BULK_DECODE_WORKERS = int(os.getenv("AGRISHIELD_BULK_DECODE_WORKERS", "4"))
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+def is_zip_upload(file: UploadFile) -> bool:
+    return file.content_type in ZIP_CONTENT_TYPES or (file.filename or "").lower().endswith(".zip")
+
+def iter_bulk_images(files: List[UploadFile]) -> Iterator[Tuple[str, Callable[[], bytes]]]:
+    """Yield (filename, read_bytes) for every image in the upload without reading them yet"""
+    for file in files:
+        if is_zip_upload(file):
+            # Uploads are spooled to disk by the multipart parser, so the
+            # archive is read entry by entry straight from the temp file
+            with zipfile.ZipFile(file.file) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    yield info.filename, (lambda info=info: _read_zip_entry(archive, info))
+        else:
+            yield file.filename, (lambda file=file: read_capped(file.file, file.filename))
+
+def _read_zip_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    # Capped while decompressing: the declared size in the header may lie
+    with archive.open(info) as f:
+        return read_capped(f, info.filename)
+
+def _safe_read(read_bytes: Callable[[], bytes]):
+    # A failure is kept as the entry's data and reported on its own line
+    try:
+        return read_bytes()
+    except Exception as e:
+        return e
+
+def _safe_decode(data):
+    if isinstance(data, Exception):
+        return None, str(data)
+    try:
+        return decode_image(data), None
+    except ImageTooLarge as e:
+        upload_metrics.reject("image_pixels")
+        return None, str(e)
+    except Exception as e:
+        return None, str(e)
+
+def _read_chunk(images: Iterator[Tuple[str, Callable[[], bytes]]], first_index: int) -> List[Tuple[int, str, bytes]]:
+    """The next BULK_CHUNK_SIZE entries of the upload, read (runs off the event loop)"""
+    chunk = []
+    for name, read_bytes in images:
+        chunk.append((first_index + len(chunk), name, _safe_read(read_bytes)))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            break
+    return chunk
+
+async def detect_disease_chunk(chunk: List[Tuple[int, str, bytes]], pool: ThreadPoolExecutor) -> List[dict]:
+    """Decode one chunk in parallel, classify the decodable images through the micro-batcher"""
+    loop = asyncio.get_running_loop()
+    decoded = await asyncio.gather(*(loop.run_in_executor(pool, _safe_decode, data) for _, _, data in chunk))
+
+    rows = [{"index": index, "filename": name} for index, name, _ in chunk]
+    valid = [i for i, (image, _) in enumerate(decoded) if image is not None]
+    for i, (_, error) in enumerate(decoded):
+        if error is not None:
+            rows[i]["error"] = f"Error processing image: {error}"
+
+    # A failed batch (model not loaded, inference error) fails only its own
+    # images; the rest of the upload is still processed
+    results = await asyncio.gather(*(disease_batcher.submit(decoded[i][0]) for i in valid), return_exceptions=True)
+    for i, result in zip(valid, results):
+        if isinstance(result, Exception):
+            rows[i]["error"] = f"Error processing image: {result}"
+        else:
+            rows[i].update(with_similar_cases(result, 0))
+
+    return rows
+
+async def stream_bulk_results(files: List[UploadFile]) -> AsyncIterator[str]:
+    """Yield one NDJSON line per image as each chunk finishes"""
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=BULK_DECODE_WORKERS) as pool:
+        images = iter_bulk_images(files)
+        index = 0
+        while True:
+            try:
+                chunk = await loop.run_in_executor(pool, _read_chunk, images, index)
+            except zipfile.BadZipFile as e:
+                yield json.dumps({"error": f"Invalid zip archive: {str(e)}"}) + "\n"
+                return
+            if not chunk:
+                return
+            index += len(chunk)
+
+            try:
+                rows = await detect_disease_chunk(chunk, pool)
+            except Exception as e:
+                rows = [{"index": i, "filename": name, "error": f"Error processing image: {e}"}
+                        for i, name, _ in chunk]
+            for row in rows:
+                yield json.dumps(row) + "\n"
+
+@router.post("/detect-disease/batch", openapi_extra=upload_openapi("files", many=True))
+async def detect_disease_batch(request: Request):
+    """
+    Detect diseases in many images at once
+
+    Accepts several image files and/or zip archives of images in one multipart
+    request (field `files`). Results are streamed back as NDJSON, one line per
+    image, in upload order: `{"index", "filename", "disease", ...}` or
+    `{"index", "filename", "error"}`.
+    """
+    form = await read_upload_form(request)
+    files = [f for f in form.getlist("files") if not isinstance(f, str)]
+    try:
+        if not files:
+            raise HTTPException(status_code=400, detail="Upload the images as the multipart field 'files'")
+        for file in files:
+            if not (is_zip_upload(file) or (file.content_type or "").startswith("image/")):
+                raise HTTPException(status_code=400, detail=f"Invalid file: {file.filename}")
+    except HTTPException:
+        await form.close()
+        raise
+
+    # Reading and decoding run on the bulk pool, inference on the inference
+    # pool through disease_batcher; the event loop only awaits them. The
+    # uploads are closed once the last line has been sent.
+    return StreamingResponse(stream_bulk_results(files), media_type="application/x-ndjson",
+                             background=BackgroundTask(form.close))
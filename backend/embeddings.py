@@ -0,0 +1,231 @@
+"""
+AgriShield - Frozen-Backbone Embedding Store
+Computes the pooled MobileNetV2 features of every PlantVillage image once and
+stores them as memory-mapped .npy arrays, so the Dense head of the disease
+classifier can be retrained in seconds
+
+The backbone is frozen during phase-1 training, so the pooled features of an
+(unaugmented) image never change between epochs; only the head learns.
+
+Usage (from backend/):
+    python embeddings.py extract [--splits train val test] [--augment-copies 0]
+    python embeddings.py train-head [--epochs 100] [--model-path best_cpu_model.head.keras]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+from numpy.lib.format import open_memmap
+
+from cache import file_fingerprint
+from fused_model import find_pooling_layer
+from plantvillage import DATASET_DIR, PROJECT_ROOT, load_class_indices
+from train_disease import EpochTimer, IMG_SIZE, augment_batch, build_shards, make_dataset, manifest_path
+
+MODEL_PATH = os.path.join(PROJECT_ROOT, "models", "best_cpu_model.keras")
+EMBEDDING_DIR = os.path.join(os.path.dirname(DATASET_DIR), f"embeddings_{IMG_SIZE[0]}")
+SPLITS = ("train", "val", "test")
+
+
+# ============================================================================
+# BACKBONE
+# ============================================================================
+
+def load_feature_model(model_path: str = MODEL_PATH) -> tf.keras.Model:
+    """
+    Input -> pooled features, taken from the served classifier
+
+    Using the classifier's own backbone (rather than a fresh ImageNet
+    MobileNetV2) guarantees the head trained on these features plugs back
+    onto exactly the backbone it was fitted against.
+    """
+    classifier = tf.keras.models.load_model(model_path)
+    return tf.keras.Model(classifier.input, find_pooling_layer(classifier).output, name="feature_extractor")
+
+
+def attach_head(feature_model: tf.keras.Model, head: tf.keras.Model) -> tf.keras.Model:
+    """Rebuild a flat, drop-in classifier: backbone -> pooled -> head layers"""
+    x = feature_model.output
+    for layer in head.layers[1:]:
+        x = layer(x)
+    return tf.keras.Model(feature_model.input, x)
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+def store_paths(split: str) -> dict:
+    return {
+        "embeddings": os.path.join(EMBEDDING_DIR, f"{split}.embeddings.npy"),
+        "labels": os.path.join(EMBEDDING_DIR, f"{split}.labels.npy"),
+        "manifest": os.path.join(EMBEDDING_DIR, f"{split}.manifest.json")
+    }
+
+
+def store_identity(split: str, model_path: str, augment_copies: int) -> dict:
+    """What the stored embeddings were computed from; any change means recompute"""
+    build_shards(split)
+    with open(manifest_path(split), "r") as f:
+        shards = json.load(f)
+    return {
+        "split": split,
+        "image_size": list(IMG_SIZE),
+        "images": shards["images"],
+        "source": shards["source"],
+        "backbone": [list(entry) for entry in file_fingerprint([model_path])],
+        "augment_copies": augment_copies if split == "train" else 0
+    }
+
+
+def is_current(split: str, identity: dict) -> bool:
+    paths = store_paths(split)
+    if not all(os.path.exists(p) for p in paths.values()):
+        return False
+    with open(paths["manifest"], "r") as f:
+        return json.load(f)["identity"] == identity
+
+
+def extract_split(feature_model: tf.keras.Model, split: str, identity: dict, batch_size: int) -> dict:
+    """
+    Write one split's embeddings straight into a memory-mapped .npy
+
+    Train can additionally store `augment_copies` randomly augmented passes,
+    which stand in for the per-epoch augmentation of end-to-end training.
+    """
+    paths = store_paths(split)
+    base = make_dataset(split, batch_size, cache="none")
+    images = identity["images"]
+    passes = 1 + identity["augment_copies"]
+    dim = feature_model.output_shape[-1]
+
+    os.makedirs(EMBEDDING_DIR, exist_ok=True)
+    tmp_embeddings = paths["embeddings"] + ".tmp"
+    embeddings = open_memmap(tmp_embeddings, mode="w+", dtype=np.float32, shape=(images * passes, dim))
+    labels = np.empty(images * passes, dtype=np.int16)
+
+    start = time.perf_counter()
+    row = 0
+    for copy in range(passes):
+        dataset = base if copy == 0 else base.map(lambda x, y: (augment_batch(x), y))
+        for batch, onehot in dataset:
+            n = int(batch.shape[0])
+            embeddings[row:row + n] = feature_model.predict_on_batch(batch)
+            labels[row:row + n] = np.argmax(onehot.numpy(), axis=1)
+            row += n
+    embeddings.flush()
+    del embeddings
+    elapsed = time.perf_counter() - start
+
+    os.replace(tmp_embeddings, paths["embeddings"])
+    np.save(paths["labels"], labels)
+    with open(paths["manifest"], "w") as f:
+        json.dump({"identity": identity, "rows": images * passes, "dim": dim,
+                   "extract_seconds": elapsed}, f, indent=2)
+
+    print(f"✅ {split}: {images * passes} x {dim} embeddings in {elapsed:.1f}s")
+    return {"rows": images * passes, "seconds": elapsed}
+
+
+def load_embeddings(split: str):
+    """
+    Returns:
+        tuple: (embeddings memmap (N, dim) float32, labels (N,) int16)
+    """
+    paths = store_paths(split)
+    return np.load(paths["embeddings"], mmap_mode="r"), np.load(paths["labels"])
+
+
+# ============================================================================
+# HEAD TRAINING
+# ============================================================================
+
+def build_head(dim: int, num_classes: int) -> tf.keras.Model:
+    """The DiseaseDetection.ipynb head on top of pooled features"""
+    inputs = tf.keras.Input(shape=(dim,))
+    x = tf.keras.layers.Dense(256, activation="relu")(inputs)
+    x = tf.keras.layers.Dropout(0.5)(x)
+    x = tf.keras.layers.Dense(128, activation="relu")(x)
+    x = tf.keras.layers.Dropout(0.3)(x)
+    outputs = tf.keras.layers.Dense(num_classes, activation="softmax")(x)
+
+    model = tf.keras.Model(inputs, outputs, name="disease_head")
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=1e-3),
+                  loss="sparse_categorical_crossentropy", metrics=["accuracy"])
+    return model
+
+
+def train_head(args):
+    x_train, y_train = load_embeddings("train")
+    x_val, y_val = load_embeddings("val")
+    x_test, y_test = load_embeddings("test")
+    num_classes = len(load_class_indices())
+
+    head = build_head(x_train.shape[1], num_classes)
+    timer = EpochTimer()
+    callbacks = [
+        tf.keras.callbacks.EarlyStopping(monitor="val_accuracy", patience=7, restore_best_weights=True, verbose=1),
+        tf.keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=0.5, patience=3, min_lr=1e-7, verbose=1),
+        timer
+    ]
+
+    print("\n" + "="*80)
+    print(" "*25 + "HEAD TRAINING (from embeddings)")
+    print("="*80)
+    start = time.perf_counter()
+    head.fit(x_train, y_train, epochs=args.epochs, batch_size=args.batch_size, shuffle=True,
+             validation_data=(x_val, y_val), callbacks=callbacks, verbose=2)
+    train_seconds = time.perf_counter() - start
+
+    test_loss, test_acc = head.evaluate(x_test, y_test, batch_size=1024, verbose=0)
+    print(f"\nTest Accuracy: {test_acc * 100:.2f}%")
+    print(f"Test Loss:     {test_loss:.4f}")
+    print(f"Training time: {train_seconds:.1f}s ({np.mean(timer.epoch_seconds):.2f}s / epoch)")
+
+    # Graft the head back onto the backbone so the result is a drop-in best_cpu_model.keras
+    classifier = attach_head(load_feature_model(args.backbone), head)
+    classifier.save(args.model_path)
+    print(f"✅ Classifier saved: {args.model_path}")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Frozen-backbone embedding store and fast head training")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    extract = sub.add_parser("extract", help="Compute and store pooled embeddings")
+    extract.add_argument("--splits", nargs="+", choices=SPLITS, default=list(SPLITS))
+    extract.add_argument("--backbone", default=MODEL_PATH, help="Classifier whose backbone is used")
+    extract.add_argument("--augment-copies", type=int, default=0, help="Extra augmented passes over train")
+    extract.add_argument("--batch-size", type=int, default=64)
+    extract.add_argument("--force", action="store_true")
+
+    train = sub.add_parser("train-head", help="Train the Dense head from stored embeddings")
+    train.add_argument("--backbone", default=MODEL_PATH, help="Backbone the head is grafted onto")
+    train.add_argument("--epochs", type=int, default=100)
+    train.add_argument("--batch-size", type=int, default=256)
+    train.add_argument("--model-path", default="best_cpu_model.head.keras")
+
+    args = parser.parse_args()
+
+    if args.command == "extract":
+        feature_model = load_feature_model(args.backbone)
+        for split in args.splits:
+            identity = store_identity(split, args.backbone, args.augment_copies)
+            if not args.force and is_current(split, identity):
+                print(f"✅ {split}: embeddings up to date")
+                continue
+            extract_split(feature_model, split, identity, args.batch_size)
+    else:
+        train_head(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+AgriShield - Disease Detection Evaluation & Throughput Benchmark
+Runs the serving path of disease.py (decode, single-pass preprocessing, plant
+validation, classification) over the PlantVillage test split
+
+Decoding and preprocessing run on a thread pool that stays `--prefetch`
+images ahead of inference, the same split the API makes between its decode
+and inference work.
+
+Usage (from backend/):
+    python evaluate_disease.py [--limit-per-class N] [--batch-size 16] [--workers 4] [--output eval.json]
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import disease
+from plantvillage import list_split
+from preprocessing import decode_image, prepare_image
+
+INVALID_LABEL = "invalid"
+
+
+# ============================================================================
+# INPUT PIPELINE
+# ============================================================================
+
+def load_one(path: str):
+    """Read, decode and preprocess one file, timing each stage in ms"""
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        data = f.read()
+    t1 = time.perf_counter()
+    image = decode_image(data)
+    t2 = time.perf_counter()
+    prepared = prepare_image(image)
+    t3 = time.perf_counter()
+    return prepared, {"read": (t1 - t0) * 1000, "decode": (t2 - t1) * 1000, "preprocess": (t3 - t2) * 1000}
+
+
+def prefetch(paths, pool: ThreadPoolExecutor, depth: int):
+    """Yield load_one results in order while keeping `depth` files in flight"""
+    pending = deque()
+    remaining = iter(paths)
+
+    def refill():
+        while len(pending) < depth:
+            path = next(remaining, None)
+            if path is None:
+                return
+            pending.append(pool.submit(load_one, path))
+
+    refill()
+    while pending:
+        result = pending.popleft().result()
+        refill()
+        yield result
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {}
+    arr = np.asarray(values)
+    return {
+        "mean": float(arr.mean()),
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+        "max": float(arr.max())
+    }
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+def evaluate(samples, batch_size: int, workers: int, prefetch_depth: int):
+    stage_ms = {"read": [], "decode": [], "preprocess": [], "inference_batch": [], "inference_per_image": []}
+    input_wait_ms = 0.0
+    predictions = []
+
+    # Warm-up so graph tracing is not timed
+    warm, _ = load_one(samples[0][0])
+    disease.detect_prepared([warm])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="eval-decode") as pool:
+        stream = prefetch([path for path, _ in samples], pool, prefetch_depth)
+        batch = []
+        while True:
+            t0 = time.perf_counter()
+            item = next(stream, None)
+            input_wait_ms += (time.perf_counter() - t0) * 1000
+
+            if item is not None:
+                prepared, timings = item
+                batch.append(prepared)
+                for stage, ms in timings.items():
+                    stage_ms[stage].append(ms)
+
+            if batch and (item is None or len(batch) == batch_size):
+                t0 = time.perf_counter()
+                results = disease.detect_prepared(batch)
+                elapsed = (time.perf_counter() - t0) * 1000
+                stage_ms["inference_batch"].append(elapsed)
+                stage_ms["inference_per_image"].append(elapsed / len(batch))
+                predictions.extend(r["disease"] for r in results)
+                batch = []
+
+            if item is None:
+                break
+    wall_seconds = time.perf_counter() - start
+
+    return predictions, stage_ms, input_wait_ms, wall_seconds
+
+
+def confusion_report(labels, predictions, class_names):
+    """Confusion matrix over the known classes plus an `invalid` column"""
+    columns = class_names + [INVALID_LABEL]
+    index = {name: i for i, name in enumerate(columns)}
+    matrix = np.zeros((len(class_names), len(columns)), dtype=np.int64)
+    for truth, pred in zip(labels, predictions):
+        matrix[index[truth], index.get(pred, index[INVALID_LABEL])] += 1
+
+    per_class = {}
+    for i, name in enumerate(class_names):
+        support = int(matrix[i].sum())
+        if support:
+            per_class[name] = {
+                "support": support,
+                "accuracy": float(matrix[i, i] / support),
+                "invalid_rate": float(matrix[i, -1] / support)
+            }
+    return matrix, columns, per_class
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and throughput of the served disease detection path")
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--limit-per-class", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=disease.BATCH_MAX_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Decode/preprocess threads")
+    parser.add_argument("--prefetch", type=int, default=None, help="Images in flight (default: 4 batches)")
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    samples = list_split(args.split, limit_per_class=args.limit_per_class)
+    labels = [class_name for _, class_name in samples]
+    class_names = [disease.CLASS_NAMES[i] for i in sorted(disease.CLASS_NAMES)]
+    prefetch_depth = args.prefetch or args.batch_size * 4
+
+    print(f"📥 {len(samples)} images from '{args.split}', backbone={disease.DISEASE_BACKBONE}, "
+          f"engine={disease.DISEASE_ENGINE}, cascade={'on' if disease.PLANT_CASCADE else 'off'}")
+
+    predictions, stage_ms, input_wait_ms, wall_seconds = evaluate(
+        samples, args.batch_size, args.workers, prefetch_depth
+    )
+    matrix, columns, per_class = confusion_report(labels, predictions, class_names)
+    accuracy = float(np.mean([p == t for p, t in zip(predictions, labels)]))
+    invalid_rate = float(np.mean([p == INVALID_LABEL for p in predictions]))
+
+    print("\n" + "="*80)
+    print(" "*22 + "DISEASE DETECTION EVALUATION")
+    print("="*80)
+    print(f"Images:        {len(samples)}")
+    print(f"Throughput:    {len(samples) / wall_seconds:.1f} images/sec ({wall_seconds:.1f}s wall)")
+    print(f"Input stall:   {input_wait_ms / 1000:.2f}s waiting on decode")
+    print(f"Accuracy:      {accuracy:.4f}")
+    print(f"Invalid rate:  {invalid_rate:.4f}")
+    print("-"*80)
+    print(f"{'stage':22s} {'mean':>9s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}  (ms)")
+    for stage, values in stage_ms.items():
+        p = percentiles(values)
+        if p:
+            print(f"{stage:22s} {p['mean']:9.2f} {p['p50']:9.2f} {p['p95']:9.2f} {p['p99']:9.2f} {p['max']:9.2f}")
+    print("-"*80)
+    print(f"{'class':45s} {'support':>8s} {'accuracy':>9s} {'invalid':>8s}")
+    for name, r in per_class.items():
+        print(f"{name:45s} {r['support']:8d} {r['accuracy']:9.4f} {r['invalid_rate']:8.4f}")
+    print("="*80 + "\n")
+
+    if args.output:
+        report = {
+            "split": args.split,
+            "images": len(samples),
+            "config": {
+                "backbone": disease.DISEASE_BACKBONE,
+                "engine": disease.DISEASE_ENGINE,
+                "plant_cascade": disease.PLANT_CASCADE,
+                "batch_size": args.batch_size,
+                "workers": args.workers,
+                "prefetch": prefetch_depth
+            },
+            "images_per_sec": len(samples) / wall_seconds,
+            "wall_seconds": wall_seconds,
+            "input_wait_seconds": input_wait_ms / 1000,
+            "accuracy": accuracy,
+            "invalid_rate": invalid_rate,
+            "stage_latency_ms": {stage: percentiles(values) for stage, values in stage_ms.items()},
+            "plant_cascade": disease.cascade_stats(),
+            "per_class": per_class,
+            "confusion_matrix": {"rows": class_names, "columns": columns, "counts": matrix.tolist()}
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+AgriShield - Inference Executors
+Dedicated worker pools that keep CPU-bound model calls off the asyncio event loop
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# TensorFlow and PIL release the GIL, so a thread pool is enough for them.
+# 0 threads runs inference inline on the event loop (the old behaviour).
+INFERENCE_THREADS = int(os.getenv("AGRISHIELD_INFERENCE_THREADS", "2"))
+
+# sklearn predict_proba holds the GIL for much of its work; "process" moves
+# it to separate interpreters at the cost of pickling inputs and outputs
+# (each worker keeps its own models, kept on the version served here by
+# model_registry.call_with_models)
+SKLEARN_EXECUTOR = os.getenv("AGRISHIELD_SKLEARN_EXECUTOR", "thread")
+SKLEARN_WORKERS = int(os.getenv("AGRISHIELD_SKLEARN_WORKERS", "2"))
+
+if SKLEARN_EXECUTOR not in ("thread", "process"):
+    raise ValueError(f"Unknown AGRISHIELD_SKLEARN_EXECUTOR: {SKLEARN_EXECUTOR}")
+
+_executors = {}
+_lock = threading.Lock()
+
+
+# ============================================================================
+# EXECUTOR ACCESS
+# ============================================================================
+
+def _create_executor(name: str) -> Optional[Executor]:
+    if name == "inference":
+        if INFERENCE_THREADS <= 0:
+            return None
+        return ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix="tf-inference")
+
+    if name == "sklearn":
+        if SKLEARN_EXECUTOR == "process":
+            # spawn, not fork: forking a process with TensorFlow threads running is unsafe
+            return ProcessPoolExecutor(
+                max_workers=SKLEARN_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return ThreadPoolExecutor(max_workers=SKLEARN_WORKERS, thread_name_prefix="sklearn")
+
+    if name == "shadow":
+        # One thread for scoring candidate models against live traffic
+        # (model_registry.py); it never competes with requests for more
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+
+    raise ValueError(f"Unknown executor: {name}")
+
+
+def get_executor(name: str) -> Optional[Executor]:
+    """Return the named pool ("inference", "sklearn" or "shadow"), creating it on first use"""
+    with _lock:
+        if name not in _executors:
+            _executors[name] = _create_executor(name)
+        return _executors[name]
+
+
+async def run_in_executor(name: str, fn: Callable[..., Any], *args) -> Any:
+    """Run fn(*args) on the named pool and await the result"""
+    executor = get_executor(name)
+    if executor is None:
+        return fn(*args)
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor):
+        # Worker processes hold their own copies of the models; the task
+        # carries the versions served here so hot reloads reach them too
+        from model_registry import call_with_models, served_fingerprints
+        return await loop.run_in_executor(executor, call_with_models, served_fingerprints(), fn, *args)
+    return await loop.run_in_executor(executor, fn, *args)
+
+
+def shutdown_executors():
+    """Stop all pools (called on application shutdown)"""
+    with _lock:
+        for executor in _executors.values():
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        _executors.clear()
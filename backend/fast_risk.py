@@ -0,0 +1,182 @@
+"""
+AgriShield - Compiled Risk Model
+Single-row crop failure scoring without sklearn's per-call input validation:
+dict lookups for the label encoders, the scaler's mean/scale as plain arrays
+and the random forest flattened into NumPy node arrays walked for all trees
+at once
+
+Every step repeats sklearn's arithmetic in the same order and precision
+(float64 scaling, float32 features compared against float64 thresholds,
+per-tree probabilities summed in estimator order, then divided by the number
+of trees), so the scores are bit-for-bit identical to the sklearn path.
+
+The same node arrays give decision-path (Saabas) contributions: along each
+row's path every split moves the tree's estimate from the parent's positive
+fraction to the child's, and that change is credited to the split feature.
+Averaged over trees, the root mean plus the credits equals the predicted
+probability exactly, but the split between features is not: a feature's
+credit depends on how deep in each tree it is split, so these are a cheap
+heuristic, not the Shapley values TreeSHAP would give.
+"""
+
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+
+# Before 1.4 tree_.value held weighted class counts and predict_proba
+# normalised them per leaf; since 1.4 it holds the fractions directly
+_NORMALISES_LEAVES = tuple(int(part) for part in sklearn.__version__.split(".")[:2]) < (1, 4)
+
+
+# Rows walked together when computing path contributions; bounds the (rows, trees)
+# node arrays to a few MB
+CONTRIBUTION_BLOCK_ROWS = 2048
+
+
+def is_binary_forest(model) -> bool:
+    return isinstance(model, RandomForestClassifier) and model.n_outputs_ == 1 and model.n_classes_ == 2
+
+
+class CompiledRiskModel:
+    """
+    Args:
+        model (RandomForestClassifier): Fitted binary forest
+        scaler (StandardScaler): Fitted on the 11 model features
+        crop_encoder (LabelEncoder): Crop names
+        state_encoder (LabelEncoder): State names
+    """
+
+    def __init__(self, model, scaler, crop_encoder, state_encoder):
+        self.crop_codes = {label: code for code, label in enumerate(crop_encoder.classes_)}
+        self.state_codes = {label: code for code, label in enumerate(state_encoder.classes_)}
+
+        # StandardScaler.transform is (x - mean_) / scale_ in float64
+        n_features = scaler.n_features_in_
+        self.mean = np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(n_features), dtype=np.float64)
+        self.scale = np.asarray(scaler.scale_ if scaler.with_std else np.ones(n_features), dtype=np.float64)
+
+        self.n_estimators = len(model.estimators_)
+        self._flatten(model)
+
+    def _flatten(self, model):
+        """
+        Concatenate every tree's nodes; leaves point to themselves, so all
+        trees can be stepped together for max_depth steps
+        """
+        roots, feature, threshold, left, right, positive = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            own = np.arange(tree.node_count) + offset
+
+            proba = tree.value[:, 0, :2].astype(np.float64)
+            if _NORMALISES_LEAVES:
+                normalizer = proba.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                proba = proba / normalizer
+
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, own, tree.children_left + offset))
+            right.append(np.where(is_leaf, own, tree.children_right + offset))
+            positive.append(proba[:, 1])
+            offset += tree.node_count
+
+        self.roots = np.array(roots, dtype=np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.positive = np.concatenate(positive)
+        self.max_depth = max(estimator.tree_.max_depth for estimator in model.estimators_)
+
+    # Everything failure_probability and path_contributions read, as plain arrays
+    ARRAYS = ("mean", "scale", "roots", "feature", "threshold", "left", "right", "positive")
+
+    def to_arrays(self) -> tuple:
+        """(arrays, meta) for storing in a model bundle; see from_arrays"""
+        meta = {"n_estimators": self.n_estimators, "max_depth": int(self.max_depth)}
+        return {name: getattr(self, name) for name in self.ARRAYS}, meta
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, meta: dict, crop_encoder, state_encoder) -> "CompiledRiskModel":
+        """
+        Rebuild from to_arrays() output without the forest; the arrays may be
+        read-only memory maps shared between worker processes
+        """
+        compiled = cls.__new__(cls)
+        compiled.crop_codes = {label: code for code, label in enumerate(crop_encoder.classes_)}
+        compiled.state_codes = {label: code for code, label in enumerate(state_encoder.classes_)}
+        for name in cls.ARRAYS:
+            setattr(compiled, name, arrays[name])
+        compiled.n_estimators = meta["n_estimators"]
+        compiled.max_depth = meta["max_depth"]
+        return compiled
+
+    def failure_probability(self, features: np.ndarray) -> np.float64:
+        """predict_proba(scaler.transform(features))[0][1] for one unscaled 11-feature row"""
+        x = ((features - self.mean) / self.scale).astype(np.float32)
+
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            nodes = np.where(x[self.feature[nodes]] <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+
+        # cumsum adds left to right like the forest's per-tree accumulation
+        # (np.sum would use pairwise summation and can differ in the last bit)
+        return np.cumsum(self.positive[nodes])[-1] / self.n_estimators
+
+    def path_contributions(self, features: np.ndarray):
+        """
+        Per-feature decision-path contributions to the failure probability
+        for unscaled rows (see the module docstring; not Shapley values)
+
+        Args:
+            features: (N, 11) or (11,) unscaled feature rows
+
+        Returns:
+            tuple: (base probability (mean root fraction), (N, 11) contributions);
+            base + contributions.sum(axis=1) is each row's failure probability
+        """
+        features = np.atleast_2d(features)
+        n_features = len(self.mean)
+        contributions = np.empty(features.shape, dtype=np.float64)
+        for start in range(0, len(features), CONTRIBUTION_BLOCK_ROWS):
+            x = ((features[start:start + CONTRIBUTION_BLOCK_ROWS] - self.mean) / self.scale).astype(np.float32)
+            rows = np.arange(len(x))[:, np.newaxis]
+            nodes = np.broadcast_to(self.roots, (len(x), self.n_estimators))
+            totals = np.zeros(len(x) * n_features)
+            for _ in range(self.max_depth):
+                split = self.feature[nodes]
+                children = np.where(x[rows, split] <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+                # Leaves loop to themselves, so they add zero
+                totals += np.bincount((rows * n_features + split).ravel(),
+                                      weights=(self.positive[children] - self.positive[nodes]).ravel(),
+                                      minlength=totals.size)
+                nodes = children
+            contributions[start:start + len(x)] = totals.reshape(len(x), n_features)
+        base = self.positive[self.roots].sum() / self.n_estimators
+        return base, contributions / self.n_estimators
+
+
+def compile_risk_model(model, scaler, crop_encoder, state_encoder, probe_rows: int = 256):
+    """
+    Build the compiled model, or return None when the model is not a binary
+    random forest or the compiled scores do not match sklearn's exactly
+    """
+    if not is_binary_forest(model):
+        return None
+
+    compiled = CompiledRiskModel(model, scaler, crop_encoder, state_encoder)
+
+    # Self-check on rows spread around the training distribution
+    rng = np.random.default_rng(0)
+    probe = compiled.mean + rng.standard_normal((probe_rows, len(compiled.mean))) * compiled.scale * 1.5
+    expected = model.predict_proba(scaler.transform(probe))[:, 1]
+    actual = np.array([compiled.failure_probability(row) for row in probe])
+    if not np.array_equal(expected, actual):
+        print(f"⚠️ Compiled risk model differs from sklearn on {int((expected != actual).sum())} of "
+              f"{probe_rows} probe rows; using sklearn")
+        return None
+    return compiled
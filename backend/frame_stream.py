@@ -0,0 +1,234 @@
+"""
+AgriShield - Video Frame Scanning
+Per-connection state for streaming camera frames over a WebSocket: a bounded
+drop-oldest frame queue, near-duplicate suppression by dHash and incremental
+diagnosis messages
+"""
+
+import asyncio
+from collections import Counter, deque
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+from PIL import Image
+
+from executors import run_in_executor
+from image_hash import dhash, hamming_distance
+
+# Totals over every stream since startup, for the stats endpoint
+stream_counts = Counter()
+
+
+class FrameQueue:
+    """
+    Bounded FIFO that drops its oldest frame instead of blocking the producer
+
+    A scout's camera produces frames faster than a CPU can classify them; the
+    newest frames are the ones worth analysing, so when the consumer falls
+    behind the stalest frame is discarded and counted.
+    """
+
+    def __init__(self, max_frames: int):
+        self.frames = deque()
+        self.max_frames = max_frames
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def put(self, frame) -> bool:
+        """Queue a frame; returns False when an older frame was dropped for it"""
+        dropped = len(self.frames) >= self.max_frames
+        if dropped:
+            self.frames.popleft()
+        self.frames.append(frame)
+        self._ready.set()
+        return not dropped
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def get_batch(self, max_items: int) -> Optional[list]:
+        """Wait for at least one frame and take up to max_items; None once closed and drained"""
+        while not self.frames:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return [self.frames.popleft() for _ in range(min(max_items, len(self.frames)))]
+
+
+def decode_frames(frames: List[bytes], decode: Callable[[bytes], Image.Image]) -> List[Tuple]:
+    """(image, dHash, None) per decodable frame, (None, None, error) otherwise"""
+    decoded = []
+    for data in frames:
+        try:
+            image = decode(data)
+            decoded.append((image, dhash(image), None))
+        except Exception as e:
+            decoded.append((None, None, str(e)))
+    return decoded
+
+
+class FrameScanSession:
+    """
+    One WebSocket connection: the receive loop feeds a FrameQueue, a worker
+    drains it in batches, drops frames that look like the last analysed one
+    and sends back one message per analysed frame
+
+    Outgoing messages are awaited one at a time, so a slow client slows the
+    worker, the queue fills and old frames are dropped; nothing grows without
+    bound on either side.
+
+    Args:
+        websocket (WebSocket): Accepted connection
+        decode (callable): bytes -> RGB image (runs on the inference pool)
+        diagnose (callable): image -> awaitable result dict
+        queue_frames (int): Frames buffered before the oldest is dropped
+        batch_frames (int): Frames taken from the queue per worker step
+        dedup_bits (int): dHash distance at or below which a frame is a duplicate
+        max_frame_bytes (int): Larger frames are rejected with an error message
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        decode: Callable[[bytes], Image.Image],
+        diagnose: Callable[[Image.Image], Awaitable[dict]],
+        queue_frames: int,
+        batch_frames: int,
+        dedup_bits: int,
+        max_frame_bytes: int
+    ):
+        self.websocket = websocket
+        self.decode = decode
+        self.diagnose = diagnose
+        self.batch_frames = batch_frames
+        self.dedup_bits = dedup_bits
+        self.max_frame_bytes = max_frame_bytes
+
+        self.queue = FrameQueue(queue_frames)
+        self.counts = Counter()
+        self.diseases = Counter()
+        self.last_hash = None
+        self.last_frame = None
+
+    def count(self, key: str, n: int = 1):
+        self.counts[key] += n
+        stream_counts[key] += n
+
+    def stats(self) -> dict:
+        return {
+            "received": self.counts["received"],
+            "analysed": self.counts["analysed"],
+            "duplicates": self.counts["duplicates"],
+            "dropped": self.counts["dropped"],
+            "errors": self.counts["errors"],
+            "queued": len(self.queue.frames)
+        }
+
+    def summary(self) -> dict:
+        diagnosed = Counter({name: n for name, n in self.diseases.items() if name != "invalid"})
+        return {
+            "type": "summary",
+            "diagnosis": diagnosed.most_common(1)[0][0] if diagnosed else "invalid",
+            "frames_per_disease": dict(self.diseases),
+            "stats": self.stats()
+        }
+
+    # ------------------------------------------------------------------------
+    # Loops
+    # ------------------------------------------------------------------------
+
+    async def run(self):
+        stream_counts["sessions"] += 1
+        worker = asyncio.create_task(self._work())
+        try:
+            await self._receive()
+            # Client said "end": finish what is queued, then report
+            self.queue.close()
+            await worker
+            await self.websocket.send_json(self.summary())
+            await self.websocket.close()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            worker.cancel()
+
+    async def _receive(self):
+        """Queue binary frames until the client sends the text message "end" """
+        seq = 0
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("text") == "end":
+                return
+            data = message.get("bytes")
+            if data is None:
+                continue
+
+            self.count("received")
+            if len(data) > self.max_frame_bytes:
+                self.count("errors")
+                await self.websocket.send_json({"type": "error", "frame": seq,
+                                                "error": f"Frame is larger than {self.max_frame_bytes} bytes"})
+            elif not self.queue.put((seq, data)):
+                self.count("dropped")
+            seq += 1
+
+    async def _work(self):
+        while True:
+            batch = await self.queue.get_batch(self.batch_frames)
+            if batch is None:
+                return
+            # A failure (model not loaded, inference error) is reported for the
+            # frames it affects; the loop keeps serving the rest of the stream
+            try:
+                decoded = await run_in_executor("inference", decode_frames, [data for _, data in batch], self.decode)
+            except Exception as e:
+                for seq, _ in batch:
+                    await self.send_error(seq, e)
+                continue
+
+            # Frames that look like the last analysed frame are skipped
+            fresh = []
+            for (seq, _), (image, frame_hash, error) in zip(batch, decoded):
+                if error is not None:
+                    await self.send_error(seq, error)
+                elif self.last_hash is not None and hamming_distance(frame_hash, self.last_hash) <= self.dedup_bits:
+                    self.count("duplicates")
+                else:
+                    fresh.append((seq, image))
+                    self.last_hash, self.last_frame = frame_hash, seq
+
+            # Submitted together so the micro-batcher classifies them in one pass
+            results = await asyncio.gather(*(self.diagnose(image) for _, image in fresh), return_exceptions=True)
+            for (seq, _), result in zip(fresh, results):
+                if isinstance(result, Exception):
+                    if self.last_frame == seq:
+                        # Never analysed, so the next look-alike is not a duplicate
+                        self.last_hash = self.last_frame = None
+                    await self.send_error(seq, result)
+                    continue
+                self.count("analysed")
+                await self.websocket.send_json(self.diagnosis_message(seq, result))
+
+    async def send_error(self, seq: int, error):
+        self.count("errors")
+        await self.websocket.send_json({"type": "error", "frame": seq, "error": f"Error processing image: {error}"})
+
+    def diagnosis_message(self, seq: int, result: dict) -> dict:
+        """Compact per-frame result; description and treatment only the first time a disease appears"""
+        name = result["disease"]
+        first_seen = name not in self.diseases
+        self.diseases[name] += 1
+
+        message = {"type": "diagnosis", "frame": seq, "disease": name}
+        for key in ("confidence", "reason"):
+            if key in result:
+                message[key] = result[key]
+        if first_seen and name != "invalid":
+            message["description"] = result.get("description")
+            message["treatment"] = result.get("treatment")
+        message["stats"] = self.stats()
+        return message
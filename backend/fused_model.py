@@ -0,0 +1,68 @@
+"""
+AgriShield - Fused Disease Model
+Builds a single inference graph where one MobileNetV2 backbone pass feeds both
+the ImageNet "is it a plant" head and the PlantVillage disease head
+"""
+
+import tensorflow as tf
+
+
+# ============================================================================
+# GRAPH SURGERY
+# ============================================================================
+
+def find_pooling_layer(classifier: tf.keras.Model) -> tf.keras.layers.Layer:
+    """Return the GlobalAveragePooling2D layer that ends the classifier's backbone"""
+    for layer in classifier.layers:
+        if isinstance(layer, tf.keras.layers.GlobalAveragePooling2D):
+            return layer
+    raise ValueError("Classifier has no GlobalAveragePooling2D layer to branch from")
+
+
+def build_fused_model(
+    classifier: tf.keras.Model,
+    plant_filter: tf.keras.Model,
+    include_embedding: bool = False
+) -> tf.keras.Model:
+    """
+    Attach the ImageNet classification head to the disease classifier's backbone
+
+    The disease classifier was trained on a frozen ImageNet MobileNetV2, so its
+    backbone weights are the ImageNet ones. Only the final Dense(1000) layer of
+    `plant_filter` is copied; its own backbone can be dropped afterwards.
+
+    The weights match but the inputs do not: the classifier sees 160x160
+    images scaled to [0, 1], the ImageNet head was trained on 224x224 inputs
+    in [-1, 1], so the fused ImageNet probabilities are an approximation of
+    the separate filter's (measured by check_fused_parity.py).
+
+    Args:
+        classifier: Loaded best_cpu_model.keras (160x160 input, 0-1 scaled)
+        plant_filter: ImageNet MobileNetV2 with its top
+        include_embedding: Also output the pooled backbone features, used
+            for similar-case retrieval
+
+    Returns:
+        Model with outputs [imagenet_probs (N, 1000), disease_probs (N, classes)]
+        (+ [embedding (N, 1280)] when include_embedding)
+    """
+    pooled = find_pooling_layer(classifier).output
+
+    imagenet_top = plant_filter.get_layer("predictions")
+    imagenet_head = tf.keras.layers.Dense(
+        imagenet_top.units,
+        activation="softmax",
+        name="imagenet_predictions"
+    )
+    imagenet_probs = imagenet_head(pooled)
+    imagenet_head.set_weights(imagenet_top.get_weights())
+
+    outputs = [imagenet_probs, classifier.output]
+    if include_embedding:
+        outputs.append(pooled)
+
+    return tf.keras.Model(
+        inputs=classifier.input,
+        outputs=outputs,
+        name="fused_disease_model"
+    )
@@ -0,0 +1,25 @@
+"""
+AgriShield - Perceptual Image Hashing
+Difference hash (dHash) that stays stable across re-compression and resizing
+"""
+
+import numpy as np
+from PIL import Image
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Compute a difference hash of `hash_size * hash_size` bits
+
+    The image is shrunk to (hash_size + 1) x hash_size grayscale pixels and
+    each bit records whether a pixel is brighter than its right neighbour.
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BOX)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count("1")
@@ -3,17 +3,32 @@ AgriShield FastAPI Backend
 Crop Failure Risk Prediction API
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional, Union
+import asyncio
+import os
+import threading
+import io
 import pickle
+import numpy as np
+import pandas as pd
 from disease import router as disease_router
 from crop_recommendation_api import router as crop_recommendation_router    
+from executors import run_in_executor, shutdown_executors
+from model_registry import SLOTS, registry_status, start_model_watcher, stop_model_watcher
+from subsystems import STARTUP_MODE, readiness, start_background_loading
+from uploads import RequestSizeLimitMiddleware, form_upload, read_upload_form
+from risk_matrix import build as build_risk_matrix, load_matrix
 
 
 # Import prediction function from predict.py
-from predict import predict_crop_failure, crop_list, state_list, district_list
+from predict import (
+    predict_crop_failure, predict_crop_failure_batch, predict_risk_surface, predict_risk_distribution, NUMERIC_RANGES,
+    risk_level_for, risk_cache, RISK_CACHE, CACHE_STEPS, crop_list, state_list, district_list, risk_slot
+)
 
 # ============================================================================
 # FASTAPI APP INITIALIZATION
@@ -27,6 +42,10 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Oversized request bodies get a 413 before they are fully received.
+# Registered first so CORSMiddleware wraps it and the 413 carries CORS headers
+app.add_middleware(RequestSizeLimitMiddleware)
+
 # ============================================================================
 # CORS MIDDLEWARE
 # ============================================================================
@@ -42,6 +61,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
 app.include_router(disease_router)
 app.include_router(crop_recommendation_router)
 # ============================================================================
@@ -74,6 +94,63 @@ class RiskPredictionRequest(BaseModel):
         }
 
 
+# Upper bound on Monte Carlo samples per distribution request
+DISTRIBUTION_MAX_SAMPLES = int(os.getenv("AGRISHIELD_MC_MAX_SAMPLES", "50000"))
+
+
+class RiskDistributionRequest(RiskPredictionRequest):
+    """Request model for the weather-uncertainty risk distribution"""
+    samples: int = Field(10000, description="Number of weather samples", ge=100, le=DISTRIBUTION_MAX_SAMPLES)
+    rainfall_spread: Optional[float] = Field(
+        None, description="Rainfall standard deviation in mm (default: fitted from the district's monthly rainfall)",
+        ge=0
+    )
+    temperature_spread: Optional[float] = Field(None, description="Temperature standard deviation in Celsius", ge=0)
+    humidity_spread: Optional[float] = Field(None, description="Humidity standard deviation in percent", ge=0)
+    seed: Optional[int] = Field(None, description="Random seed for reproducible samples")
+
+
+class GridAxis(BaseModel):
+    """An evenly spaced range (start, stop, steps) or an explicit list of values"""
+    start: Optional[float] = Field(None, description="First value of an evenly spaced range")
+    stop: Optional[float] = Field(None, description="Last value of the range (inclusive)")
+    steps: Optional[int] = Field(None, description="Number of values in the range", ge=1, le=1000)
+    values: Optional[List[float]] = Field(None, description="Explicit grid values (instead of a range)")
+
+    def grid(self) -> np.ndarray:
+        if self.values is not None:
+            return np.asarray(self.values, dtype=np.float64)
+        if self.start is None or self.stop is None or self.steps is None:
+            raise ValueError("give either values or start, stop and steps")
+        return np.linspace(self.start, self.stop, self.steps)
+
+
+class RiskSurfaceRequest(BaseModel):
+    """Request model for the risk sensitivity surface; each weather field is a fixed value or a grid"""
+    crop: str = Field(..., description="Crop name (e.g., Rice, Wheat, Cotton)")
+    state: str = Field(..., description="State name")
+    district: str = Field(..., description="District name")
+    season: str = Field(..., description="Season (Kharif, Rabi, Summer, Whole Year)")
+    temperature: Union[float, GridAxis] = Field(..., description="Temperature in Celsius, or a grid of them")
+    rainfall: Union[float, GridAxis] = Field(..., description="Total rainfall in mm, or a grid of them")
+    humidity: Union[float, GridAxis] = Field(..., description="Humidity percentage, or a grid of them")
+    disaster_occurred: int = Field(0, description="Disaster occurrence (0=No, 1=Yes)", ge=0, le=1)
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "crop": "Rice",
+                "state": "Punjab",
+                "district": "Punjab",
+                "season": "Kharif",
+                "temperature": {"start": 24.0, "stop": 34.0, "steps": 21},
+                "rainfall": {"start": 600.0, "stop": 1600.0, "steps": 21},
+                "humidity": {"values": [60.0, 70.0, 80.0, 90.0]},
+                "disaster_occurred": 0
+            }
+        }
+
+
 class DistrictInfo(BaseModel):
     """District information model"""
     soil_type: str
@@ -82,12 +159,24 @@ class DistrictInfo(BaseModel):
     district: str
 
 
+class PathContribution(BaseModel):
+    """One model feature's decision-path share of the risk score (not a Shapley value)"""
+    feature: str = Field(..., description="Model feature name")
+    value: float = Field(..., description="Feature value used by the model")
+    contribution: float = Field(..., description="Risk points credited (+/-) to splits on this feature along the trees' paths")
+
+
 class RiskPredictionResponse(BaseModel):
     """Response model for crop failure risk prediction"""
     risk_score: float = Field(..., description="Risk score percentage (0-100)")
     risk_level: str = Field(..., description="Risk level (Low, Medium, High)")
     color: str = Field(..., description="Color code (green, orange, red)")
     explanation: str = Field(..., description="Detailed explanation of risk factors")
+    base_risk: Optional[float] = Field(None, description="Model's average risk before any input is considered")
+    path_contributions: Optional[List[PathContribution]] = Field(
+        None, description="Per-feature decision-path risk points, largest effect first; they sum to "
+                          "risk_score - base_risk, but the split between features is approximate"
+    )
     recommendations: list = Field(..., description="List of actionable recommendations")
     district_info: DistrictInfo = Field(..., description="District soil information")
 
@@ -106,7 +195,15 @@ def read_root():
         "status": "active",
         "endpoints": {
             "prediction": "POST /api/predict-risk",
+            "batch_prediction": "POST /api/predict-risk/batch",
+            "risk_surface": "POST /api/predict-risk/surface",
+            "risk_distribution": "POST /api/predict-risk/distribution",
+            "prediction_stats": "GET /api/predict-risk/stats",
+            "risk_matrix_lookup": "GET /api/risk-matrix/lookup",
+            "risk_matrix_map": "GET /api/risk-matrix/map",
+            "models": "GET /api/models",
             "health": "GET /api/health",
+            "ready": "GET /api/ready",
             "crops": "GET /api/crops",
             "states": "GET /api/states",
             "districts": "GET /api/districts",
@@ -126,6 +223,18 @@ def health_check():
     }
 
 
+@app.get("/api/ready", tags=["Health"])
+def readiness_check():
+    """
+    Readiness probe, separate from /api/health (liveness)
+
+    Returns 503 until every model subsystem has loaded and warmed up (in
+    lazy startup mode, until one fails), with per-subsystem load timings.
+    """
+    status = readiness()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
 @app.get("/api/crops", tags=["Data"])
 def get_crops():
     """Get list of available crops"""
@@ -178,7 +287,9 @@ def predict_risk(request: RiskPredictionRequest):
     **Returns:**
     - Risk score (0-100%)
     - Risk level (Low/Medium/High)
-    - Detailed explanation
+    - Detailed explanation, from the model's decision-path contributions
+    - Per-feature path contributions (`base_risk` plus the contributions is the
+      risk score; how it is split between features is approximate, not Shapley values)
     - Actionable recommendations
     - District soil information
     """
@@ -222,6 +333,352 @@ def predict_risk(request: RiskPredictionRequest):
         )
 
 
+@app.get("/api/predict-risk/stats", tags=["Prediction"])
+def predict_risk_stats():
+    """Result-cache hit rate and size for /api/predict-risk, and risk matrix usage"""
+    return {
+        "cache": {"mode": RISK_CACHE, "steps": CACHE_STEPS, **risk_cache.stats()},
+        "risk_matrix": national_risk.stats() if national_risk is not None else None
+    }
+
+
+# Rows serialised per chunk of the streamed batch response
+BATCH_STREAM_CHUNK = 10_000
+
+BATCH_TEXT_COLUMNS = {"crop": str, "state": str, "district": str, "season": str}
+
+
+def read_batch_csv(data) -> pd.DataFrame:
+    return pd.read_csv(data, dtype=BATCH_TEXT_COLUMNS)
+
+
+def stream_batch_results(result: pd.DataFrame, output: str):
+    """Serialise the scored frame a chunk at a time"""
+    for start in range(0, len(result), BATCH_STREAM_CHUNK):
+        chunk = result.iloc[start:start + BATCH_STREAM_CHUNK]
+        if output == "csv":
+            yield chunk.to_csv(index=False, header=start == 0)
+        else:
+            yield chunk.to_json(orient="records", lines=True)
+
+
+@app.post("/api/predict-risk/batch", tags=["Prediction"])
+async def predict_risk_batch(request: Request, output: str = "ndjson", explain: bool = False):
+    """
+    Score many crop failure scenarios in one call
+
+    Send either a JSON array of objects with the /api/predict-risk fields, or
+    a CSV file (multipart field `file`) with those fields as columns. All
+    rows are scored with a single scaler and model call.
+
+    **Returns** one row per input row, in order, with `risk_score`,
+    `risk_level`, `color`, `soil_type`, `soil_quality` and `error` (set, with
+    no score, for rows /api/predict-risk would reject):
+    - `output=ndjson` (default): streamed JSON lines
+    - `output=csv`: a CSV download
+
+    With `explain=true` each row also gets `base_risk` and a
+    `path_contribution_<feature>` column (risk points) per model feature.
+    """
+    if output not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="output must be 'ndjson' or 'csv'")
+
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            # Spooled to disk past UPLOAD_SPOOL_BYTES, like image uploads
+            form = await read_upload_form(request)
+            try:
+                rows = await asyncio.to_thread(read_batch_csv, form_upload(form, "file").file)
+            finally:
+                await form.close()
+        elif content_type.startswith("text/csv"):
+            rows = await asyncio.to_thread(read_batch_csv, io.BytesIO(await request.body()))
+        else:
+            records = await request.json()
+            if not isinstance(records, list):
+                raise HTTPException(status_code=400, detail="Expected a JSON array of scenarios")
+            rows = pd.DataFrame.from_records(records)
+
+        # Vectorised scoring on the sklearn pool so the event loop stays free
+        result = await run_in_executor("sklearn", predict_crop_failure_batch, rows, explain)
+
+    except HTTPException:
+        raise
+    except (ValueError, KeyError, pd.errors.ParserError) as e:
+        raise HTTPException(status_code=422, detail=f"Validation error: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    if output == "csv":
+        return StreamingResponse(stream_batch_results(result, "csv"), media_type="text/csv",
+                                 headers={"Content-Disposition": "attachment; filename=risk_scores.csv"})
+    return StreamingResponse(stream_batch_results(result, "ndjson"), media_type="application/x-ndjson")
+
+
+@app.post("/api/predict-risk/distribution", tags=["Prediction"])
+async def predict_risk_distribution_endpoint(request: RiskDistributionRequest):
+    """
+    Risk distribution under an uncertain season forecast
+
+    Draws `samples` rainfall/temperature/humidity scenarios around the given
+    values and scores them all in one model call. Rainfall varies month by
+    month with the district's climatology unless `rainfall_spread` is given;
+    temperature and humidity use the given spreads or server defaults.
+
+    **Returns:**
+    - `risk_score`: mean, std and p5/p25/p50/p75/p95 (0-100)
+    - `probability`: share of samples in each risk level (Low/Medium/High)
+    - `weather`: summaries of the sampled inputs, and `district_info`
+    """
+    try:
+        result = await run_in_executor(
+            "sklearn", predict_risk_distribution, request.crop, request.state, request.district, request.season,
+            request.temperature, request.rainfall, request.humidity, request.disaster_occurred, request.samples,
+            request.rainfall_spread, request.temperature_spread, request.humidity_spread, request.seed
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    if 'error' in result:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": result['error'],
+                "available_crops": result.get('available_crops', []),
+                "available_states": result.get('available_states', [])
+            }
+        )
+    return result
+
+
+# Upper bound on temperature x rainfall x humidity points per surface request
+SURFACE_MAX_POINTS = int(os.getenv("AGRISHIELD_SURFACE_MAX_POINTS", "250000"))
+
+
+@app.post("/api/predict-risk/surface", tags=["Prediction"])
+async def predict_risk_surface_endpoint(request: RiskSurfaceRequest):
+    """
+    Risk sensitivity surface: "how bad does it get if the monsoon is 30% short
+    and it's 2°C hotter?"
+
+    Each of temperature, rainfall and humidity is a fixed value or a grid
+    (`{"start", "stop", "steps"}` or `{"values": [...]}`). Every combination
+    is scored in one vectorized model call.
+
+    **Returns:**
+    - `axes`: the grid values of each axis
+    - `shape`: `[temperature, rainfall, humidity]` sizes
+    - `risk_score`: nested array indexed `[temperature][rainfall][humidity]` (0-100)
+    - `min`, `max`: extremes of the surface, and `district_info`
+    """
+    axes = {}
+    for name in ("temperature", "rainfall", "humidity"):
+        value = getattr(request, name)
+        try:
+            grid = value.grid() if isinstance(value, GridAxis) else np.array([value], dtype=np.float64)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Validation error: {name}: {str(e)}")
+        low, high = NUMERIC_RANGES[name]
+        if grid.size == 0 or not np.all((grid >= low) & (grid <= high)):
+            raise HTTPException(status_code=422, detail=f"Validation error: {name} values must be between {low} and {high}")
+        axes[name] = grid
+
+    points = int(np.prod([grid.size for grid in axes.values()]))
+    if points > SURFACE_MAX_POINTS:
+        raise HTTPException(status_code=422, detail=f"Validation error: {points} grid points (limit {SURFACE_MAX_POINTS})")
+
+    try:
+        # One scaler + predict_proba call over the whole grid, on the sklearn pool
+        result = await run_in_executor(
+            "sklearn", predict_risk_surface, request.crop, request.state, request.district, request.season,
+            axes["temperature"], axes["rainfall"], axes["humidity"], request.disaster_occurred
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    if 'error' in result:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": result['error'],
+                "available_crops": result.get('available_crops', []),
+                "available_states": result.get('available_states', [])
+            }
+        )
+
+    surface = result['risk_score']
+    return {
+        "axes": {name: grid.tolist() for name, grid in axes.items()},
+        "shape": list(surface.shape),
+        "risk_score": surface.tolist(),
+        "min": float(surface.min()),
+        "max": float(surface.max()),
+        "district_info": result['district_info']
+    }
+
+
+# ============================================================================
+# NATIONAL RISK MATRIX
+# ============================================================================
+
+# Precomputed crop x state x season scores (risk_matrix.py), memory-mapped
+# at startup; None until then or when missing/stale
+national_risk = None
+
+
+def require_risk_matrix():
+    if national_risk is None:
+        raise HTTPException(status_code=503, detail="Risk matrix not available; run python risk_matrix.py")
+    return national_risk
+
+
+@app.get("/api/risk-matrix/lookup", tags=["Risk Matrix"])
+def risk_matrix_lookup(crop: str, state: str, season: str):
+    """
+    Precomputed risk for one crop, state and season under that state's
+    climatological weather (no model call)
+
+    **Returns:** `risk_score`, `risk_level`, `color` and the `baseline`
+    weather and soil the score was computed with
+    """
+    matrix = require_risk_matrix()
+    risk_score = matrix.lookup(crop, state, season)
+    if risk_score is None:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": f"No precomputed risk for {crop} / {state} / {season}",
+                "available_crops": matrix.meta["crops"],
+                "available_states": matrix.meta["states"],
+                "available_seasons": matrix.meta["seasons"]
+            }
+        )
+    risk_level, color = risk_level_for(risk_score)
+    return {
+        "crop": crop,
+        "state": state,
+        "season": season,
+        "risk_score": risk_score,
+        "risk_level": risk_level,
+        "color": color,
+        "baseline": matrix.baseline(state, season),
+        "built_at": matrix.meta["built_at"],
+        "stale": matrix.stale
+    }
+
+
+@app.get("/api/risk-matrix/map", tags=["Risk Matrix"])
+def risk_matrix_map(crop: str, season: str):
+    """
+    Precomputed risk of one crop and season in every state, for a choropleth
+
+    **Returns:** `states`: state -> `{risk_score, risk_level, color}`
+    """
+    matrix = require_risk_matrix()
+    scores = matrix.state_map(crop, season)
+    if scores is None:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": f"No precomputed risk for {crop} / {season}",
+                "available_crops": matrix.meta["crops"],
+                "available_seasons": matrix.meta["seasons"]
+            }
+        )
+    states = {}
+    for state, risk_score in scores.items():
+        risk_level, color = risk_level_for(risk_score)
+        states[state] = {"risk_score": risk_score, "risk_level": risk_level, "color": color}
+    return {"crop": crop, "season": season, "states": states,
+            "built_at": matrix.meta["built_at"], "stale": matrix.stale}
+
+
+# The matrix was scored by one risk model. After a swap the old matrix keeps
+# serving, marked stale, while a background thread rebuilds it (reusing
+# whatever slices are still valid) for the new model; the rebuilt matrix
+# then replaces it. A swap during a rebuild queues one more rebuild.
+_matrix_lock = threading.Lock()
+_matrix_rebuilding = False
+_matrix_rebuild_again = False
+
+
+def rebuild_risk_matrix():
+    global national_risk, _matrix_rebuilding, _matrix_rebuild_again
+    while True:
+        try:
+            build_risk_matrix()
+            matrix = load_matrix()
+            if matrix is not None:
+                national_risk = matrix
+        except Exception as e:
+            print(f"❌ Risk matrix rebuild failed, still serving the stale matrix: {e}")
+        with _matrix_lock:
+            if not _matrix_rebuild_again:
+                _matrix_rebuilding = False
+                return
+            _matrix_rebuild_again = False
+
+
+def reload_risk_matrix(models):
+    global _matrix_rebuilding, _matrix_rebuild_again
+    if national_risk is None:
+        # Never built (or already unusable): nothing to keep fresh
+        return
+    national_risk.stale = True
+    with _matrix_lock:
+        if _matrix_rebuilding:
+            _matrix_rebuild_again = True
+            return
+        _matrix_rebuilding = True
+    print("🔄 Risk matrix: rebuilding for the new risk model (the old one serves, marked stale)")
+    threading.Thread(target=rebuild_risk_matrix, name="risk-matrix-rebuild", daemon=True).start()
+
+
+risk_slot.on_swap(reload_risk_matrix)
+
+
+# ============================================================================
+# MODEL REGISTRY (hot reload)
+# ============================================================================
+
+def require_slot(name: str):
+    if name not in SLOTS:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": f"Unknown model: {name}", "available_models": list(SLOTS)}
+        )
+    return SLOTS[name]
+
+
+@app.get("/api/models", tags=["Models"])
+def model_status():
+    """
+    Serving version of each model group, reload history and, while a new
+    version is being shadow-scored, its agreement with the live model and
+    its latency
+    """
+    return registry_status()
+
+
+@app.post("/api/models/{name}/promote", tags=["Models"])
+def promote_model(name: str):
+    """Swap in the shadow-scored candidate now, whatever its agreement"""
+    slot = require_slot(name)
+    if not slot.promote():
+        raise HTTPException(status_code=400, detail={"error": f"No candidate for {name}"})
+    return slot.status()
+
+
+@app.post("/api/models/{name}/discard", tags=["Models"])
+def discard_model(name: str):
+    """Drop the candidate and keep serving the current version"""
+    slot = require_slot(name)
+    if not slot.discard():
+        raise HTTPException(status_code=400, detail={"error": f"No candidate for {name}"})
+    return slot.status()
+
+
 @app.get("/api/info", tags=["Information"])
 def get_api_info():
     """Get detailed API information"""
@@ -268,7 +725,15 @@ async def not_found_handler(request, exc):
         "available_endpoints": [
             "/",
             "/api/health",
+            "/api/ready",
             "/api/predict-risk",
+            "/api/predict-risk/batch",
+            "/api/predict-risk/surface",
+            "/api/predict-risk/distribution",
+            "/api/predict-risk/stats",
+            "/api/risk-matrix/lookup",
+            "/api/risk-matrix/map",
+            "/api/models",
             "/api/crops",
             "/api/states",
             "/api/districts",
@@ -294,20 +759,35 @@ async def internal_error_handler(request, exc):
 @app.on_event("startup")
 async def startup_event():
     """Run on application startup"""
+    global national_risk
     print("\n" + "="*80)
     print(" "*25 + "AGRISHIELD API SERVER")
     print(" "*30 + "Starting...")
     print("="*80)
     print(f"\n✅ API Version: 1.0.0")
-    print(f"✅ Models loaded successfully")
+    if STARTUP_MODE == "eager":
+        print(f"✅ Models loaded successfully")
+    else:
+        print(f"⚙️  Model loading: {STARTUP_MODE} (see GET /api/ready)")
+        start_background_loading()
     print(f"✅ Supported Crops: {len(crop_list)}")
     print(f"✅ Supported States: {len(state_list)}")
     print(f"✅ Supported Districts: {len(district_list)}")
+    national_risk = load_matrix()
+    if start_model_watcher():
+        print(f"🔄 Watching models/ for new versions (GET /api/models)")
     print(f"\n📖 API Documentation: http://localhost:8000/docs")
     print(f"🔗 API Base URL: http://localhost:8000")
     print("\n" + "="*80 + "\n")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Run on application shutdown"""
+    stop_model_watcher()
+    shutdown_executors()
+
+
 # ============================================================================
 # MAIN (for running with uvicorn directly)
 # ============================================================================
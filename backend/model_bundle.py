@@ -0,0 +1,388 @@
+"""
+AgriShield - Model Bundles
+Versioned, checksummed artifact directories that every model subsystem
+loads from, independent of the working directory
+
+A bundle is models/bundles/<name>/<version>/ with a manifest.json listing
+each entry's file, kind and SHA-256; models/bundles/<name>/CURRENT names the
+version in use. Arrays are stored as .npy and objects with joblib
+(uncompressed), so both load as read-only memory maps: uvicorn workers
+share those pages through the page cache instead of each holding a copy.
+Without a bundle the loose files in models/ are used, as before.
+
+Usage (from any directory):
+    python backend/model_bundle.py build risk [--version 2024.1]
+    python backend/model_bundle.py verify risk
+    python backend/model_bundle.py list
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+
+from cache import file_fingerprint
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+MODELS_DIR = os.getenv("AGRISHIELD_MODELS_DIR", os.path.join(PROJECT_ROOT, "models"))
+BUNDLES_DIR = os.path.join(MODELS_DIR, "bundles")
+
+BUNDLE_FORMAT = 1
+
+# "sha256" checks every entry's checksum when it is first loaded, "size"
+# only its size, "off" nothing
+BUNDLE_VERIFY = os.getenv("AGRISHIELD_BUNDLE_VERIFY", "sha256")
+if BUNDLE_VERIFY not in ("sha256", "size", "off"):
+    raise ValueError(f"Unknown AGRISHIELD_BUNDLE_VERIFY: {BUNDLE_VERIFY}")
+
+# Entry -> loose file in models/ for each bundle, used when no bundle is
+# installed and as the source when building one
+LOOSE_FILES = {
+    "risk": {
+        "model": "crop_failure_model.pkl",
+        "scaler": "scaler.pkl",
+        "crop_encoder": "crop_encoder.pkl",
+        "state_encoder": "state_encoder.pkl",
+        "district_info": "district_info.pkl",
+        "crop_list": "crop_list.pkl",
+        "state_list": "state_list.pkl",
+        "district_list": "district_list.pkl"
+    },
+    "crop-recommendation": {
+        "model": "crop_recommendation_model.pkl",
+        "scaler": "scaler2.pkl"
+    },
+    "disease": {
+        "model": "best_cpu_model.keras",
+        "class_indices": "class_indices.json"
+    }
+}
+
+# How each kind is written and read
+EXTENSIONS = {"npy": ".npy", "json": ".json", "joblib": ".joblib"}
+
+
+class BundleError(Exception):
+    """A bundle is missing, malformed or fails its checksums"""
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def pointer_path(name: str) -> str:
+    return os.path.join(BUNDLES_DIR, name, "CURRENT")
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+class ModelBundle:
+    """
+    One installed bundle version
+
+    Args:
+        name (str): Bundle name (risk, crop-recommendation, disease)
+        root (str): The version directory
+        manifest (dict): Parsed manifest.json
+    """
+
+    def __init__(self, name: str, root: str, manifest: dict):
+        self.name = name
+        self.root = root
+        self.manifest = manifest
+        self.version = manifest["version"]
+        self.entries = manifest["entries"]
+        self._verified = set()
+        # Versions are immutable, so what was read is identified by the version
+        self.fingerprint = (self.version, None)
+
+    @classmethod
+    def open(cls, name: str, version: Optional[str] = None) -> "ModelBundle":
+        """The given version, or the one CURRENT points to"""
+        if version is None:
+            with open(pointer_path(name), "r") as f:
+                version = f.read().strip()
+        root = os.path.join(BUNDLES_DIR, name, version)
+        try:
+            with open(os.path.join(root, "manifest.json"), "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise BundleError(f"Bundle {name}/{version} has no readable manifest: {e}")
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise BundleError(f"Bundle {name}/{version} has format {manifest.get('format')}, "
+                              f"expected {BUNDLE_FORMAT}")
+        return cls(name, root, manifest)
+
+    def has(self, entry: str) -> bool:
+        return entry in self.entries
+
+    def path(self, entry: str) -> str:
+        """Absolute path of an entry's file (not verified)"""
+        return os.path.join(self.root, self.entries[entry]["file"])
+
+    def verify(self, entry: str, mode: str = BUNDLE_VERIFY):
+        """Check an entry's size/checksum against the manifest (once per process)"""
+        if mode == "off" or entry in self._verified:
+            return
+        spec, path = self.entries[entry], self.path(entry)
+        if os.path.getsize(path) != spec["bytes"]:
+            raise BundleError(f"{self.name}/{self.version}: {spec['file']} has the wrong size")
+        if mode == "sha256" and sha256_file(path) != spec["sha256"]:
+            raise BundleError(f"{self.name}/{self.version}: {spec['file']} fails its checksum")
+        self._verified.add(entry)
+
+    def load(self, entry: str):
+        """An entry's content; arrays come back as read-only memory maps, "file" entries as their path"""
+        if entry not in self.entries:
+            raise FileNotFoundError(f"Bundle {self.name}/{self.version} has no entry '{entry}'")
+        self.verify(entry)
+        kind, path = self.entries[entry]["kind"], self.path(entry)
+        if kind == "npy":
+            return np.load(path, mmap_mode="r")
+        if kind == "joblib":
+            return joblib.load(path, mmap_mode="r")
+        if kind == "json":
+            with open(path, "r") as f:
+                return json.load(f)
+        return path
+
+    def identity(self, entries: List[str]) -> dict:
+        """Content identity of some entries, for caches built on top of them"""
+        return {self.entries[e]["file"]: {"sha256": self.entries[e]["sha256"]} for e in entries}
+
+    def watch_paths(self) -> List[str]:
+        """Files whose change means a different model is installed"""
+        return [pointer_path(self.name)]
+
+    def describe(self) -> dict:
+        return {"name": self.name, "version": self.version, "source": "bundle", "root": self.root,
+                "created_at": self.manifest.get("created_at"), "entries": len(self.entries)}
+
+
+class LooseFiles:
+    """The ModelBundle interface over the loose files in models/"""
+
+    def __init__(self, name: str, files: Dict[str, str]):
+        self.name = name
+        self.files = files
+        self.version = "loose"
+        self.root = MODELS_DIR
+        # Taken when the first file is read, as source_fingerprint would
+        self.fingerprint = None
+
+    def has(self, entry: str) -> bool:
+        return entry in self.files
+
+    def path(self, entry: str) -> str:
+        if self.fingerprint is None:
+            self.fingerprint = ("loose", file_fingerprint(
+                os.path.join(MODELS_DIR, filename) for filename in self.files.values()))
+        return os.path.join(MODELS_DIR, self.files[entry])
+
+    def load(self, entry: str):
+        path = self.path(entry)
+        if path.endswith(".pkl"):
+            # joblib reads plain pickles as well as its own files
+            return joblib.load(path)
+        if path.endswith(".json"):
+            with open(path, "r") as f:
+                return json.load(f)
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        return path
+
+    def identity(self, entries: List[str]) -> dict:
+        identity = {}
+        for entry in entries:
+            try:
+                st = os.stat(self.path(entry))
+                identity[self.files[entry]] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            except OSError:
+                identity[self.files[entry]] = {"size": None, "mtime_ns": None}
+        return identity
+
+    def watch_paths(self) -> List[str]:
+        return [self.path(entry) for entry in self.files] + [pointer_path(self.name)]
+
+    def describe(self) -> dict:
+        return {"name": self.name, "version": self.version, "source": "loose", "root": self.root,
+                "entries": len(self.files)}
+
+
+def open_bundle(name: str):
+    """The installed bundle for `name`, or its loose files when none is installed"""
+    if os.path.exists(pointer_path(name)):
+        bundle = ModelBundle.open(name)
+        print(f"📦 {name} bundle {bundle.version}")
+        return bundle
+    return LooseFiles(name, LOOSE_FILES[name])
+
+
+def source_fingerprint(name: str) -> tuple:
+    """
+    (version, detail): changes whenever open_bundle(name) would load
+    something different. Bundle versions are immutable once written, so the
+    CURRENT pointer is enough; loose files are compared by size and mtime.
+    """
+    pointer = pointer_path(name)
+    try:
+        with open(pointer, "r") as f:
+            return f.read().strip(), None
+    except OSError:
+        files = LOOSE_FILES[name].values()
+        return "loose", file_fingerprint(os.path.join(MODELS_DIR, filename) for filename in files)
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def write_bundle(name: str, version: str, entries: Dict[str, tuple], activate: bool = True) -> ModelBundle:
+    """
+    Write a new bundle version; entries map name -> (kind, value), where kind
+    is "npy" (ndarray), "joblib" (any object), "json" or "file" (a path to copy)
+
+    The version directory is assembled under a temporary name and renamed
+    into place, and CURRENT is replaced atomically, so readers never see a
+    partial bundle.
+    """
+    final = os.path.join(BUNDLES_DIR, name, version)
+    if os.path.exists(final):
+        raise BundleError(f"Bundle {name}/{version} already exists")
+    staging = final + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    manifest = {"format": BUNDLE_FORMAT, "name": name, "version": version,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "entries": {}}
+    for entry, (kind, value) in entries.items():
+        if kind == "file":
+            filename = entry + os.path.splitext(value)[1]
+            # copy2 keeps the mtime, so caches keyed on it stay valid
+            shutil.copy2(value, os.path.join(staging, filename))
+        else:
+            filename = entry + EXTENSIONS[kind]
+            target = os.path.join(staging, filename)
+            if kind == "npy":
+                np.save(target, np.ascontiguousarray(value))
+            elif kind == "joblib":
+                joblib.dump(value, target)
+            else:
+                with open(target, "w") as f:
+                    json.dump(value, f, indent=2)
+        path = os.path.join(staging, filename)
+        manifest["entries"][entry] = {"file": filename, "kind": kind, "bytes": os.path.getsize(path),
+                                      "sha256": sha256_file(path)}
+
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(staging, final)
+    if activate:
+        activate_version(name, version)
+    return ModelBundle.open(name, version)
+
+
+def activate_version(name: str, version: str):
+    """Point CURRENT at an installed version"""
+    ModelBundle.open(name, version)
+    tmp = pointer_path(name) + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, pointer_path(name))
+
+
+def installed_versions(name: str) -> List[str]:
+    directory = os.path.join(BUNDLES_DIR, name)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(v for v in os.listdir(directory)
+                  if os.path.exists(os.path.join(directory, v, "manifest.json")))
+
+
+def build_entries(name: str) -> Dict[str, tuple]:
+    """Bundle entries from the loose files in models/"""
+    loose = LooseFiles(name, LOOSE_FILES[name])
+    entries = {}
+    for entry, filename in LOOSE_FILES[name].items():
+        if not os.path.exists(loose.path(entry)):
+            raise BundleError(f"Missing {loose.path(entry)}")
+        if filename.endswith(".pkl"):
+            entries[entry] = ("joblib", loose.load(entry))
+        elif filename.endswith(".json"):
+            entries[entry] = ("json", loose.load(entry))
+        else:
+            entries[entry] = ("file", loose.path(entry))
+
+    if name == "risk":
+        # The flattened forest serves single requests from shared pages
+        from fast_risk import compile_risk_model
+        compiled = compile_risk_model(entries["model"][1], entries["scaler"][1],
+                                      entries["crop_encoder"][1], entries["state_encoder"][1])
+        if compiled is not None:
+            arrays, meta = compiled.to_arrays()
+            entries["compiled_forest"] = ("json", meta)
+            for array_name, array in arrays.items():
+                entries[f"compiled_forest.{array_name}"] = ("npy", array)
+        else:
+            print("⚠️ Risk model could not be compiled; bundle has the sklearn model only")
+    return entries
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, verify and list model bundles")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Bundle the loose files in models/ and make it CURRENT")
+    build.add_argument("name", choices=list(LOOSE_FILES))
+    build.add_argument("--version", default=None, help="Version label (default: a timestamp)")
+    build.add_argument("--no-activate", action="store_true", help="Install without switching CURRENT")
+    verify = commands.add_parser("verify", help="Check every entry's checksum")
+    verify.add_argument("name", choices=list(LOOSE_FILES))
+    verify.add_argument("--version", default=None)
+    commands.add_parser("list", help="Installed versions of every bundle")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        version = args.version or time.strftime("%Y%m%d-%H%M%S")
+        try:
+            bundle = write_bundle(args.name, version, build_entries(args.name), activate=not args.no_activate)
+        except BundleError as e:
+            raise SystemExit(f"❌ {e}")
+        size = sum(spec["bytes"] for spec in bundle.entries.values())
+        print(f"✅ {args.name}/{version}: {len(bundle.entries)} entries, {size / 1e6:.1f} MB "
+              f"in {time.perf_counter() - start:.1f}s -> {bundle.root}")
+    elif args.command == "verify":
+        bundle = ModelBundle.open(args.name, args.version)
+        for entry in bundle.entries:
+            bundle.verify(entry, mode="sha256")
+        print(f"✅ {args.name}/{bundle.version}: {len(bundle.entries)} entries verified")
+    else:
+        for name in LOOSE_FILES:
+            current = None
+            if os.path.exists(pointer_path(name)):
+                with open(pointer_path(name), "r") as f:
+                    current = f.read().strip()
+            versions = installed_versions(name)
+            listed = ", ".join(f"{v} (current)" if v == current else v for v in versions)
+            print(f"{name:22s} {listed or 'no bundle (loose files in models/)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""
+AgriShield - Model Registry
+Hot reload for the risk, crop-recommendation and disease models: a watcher
+thread notices a new bundle (or changed loose files), loads it in the
+background and swaps it in atomically, optionally after shadow-scoring a
+sample of live traffic against it
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from executors import get_executor
+from model_bundle import LOOSE_FILES, LooseFiles, ModelBundle, open_bundle, source_fingerprint
+from subsystems import Subsystem
+
+# Seconds between checks of models/ (0 disables hot reload)
+WATCH_SECONDS = float(os.getenv("AGRISHIELD_MODEL_WATCH_SECONDS", "5"))
+
+# Fraction of live requests also scored by a newly loaded version. When > 0
+# the new version waits as a candidate instead of being swapped in at once,
+# and is promoted after PROMOTE_AFTER shadow comparisons if it agrees with
+# the live model at least PROMOTE_AGREEMENT of the time (or on request)
+SHADOW_RATE = float(os.getenv("AGRISHIELD_MODEL_SHADOW_RATE", "0"))
+PROMOTE_AFTER = int(os.getenv("AGRISHIELD_MODEL_PROMOTE_AFTER", "200"))
+PROMOTE_AGREEMENT = float(os.getenv("AGRISHIELD_MODEL_PROMOTE_AGREEMENT", "0.95"))
+
+# Shadow jobs waiting beyond this are dropped rather than queued
+SHADOW_MAX_PENDING = int(os.getenv("AGRISHIELD_MODEL_SHADOW_MAX_PENDING", "8"))
+
+
+class ModelSlot:
+    """
+    One hot-reloadable group of models
+
+    Args:
+        name (str): Bundle name (see model_bundle.LOOSE_FILES)
+        subsystem (Subsystem): Its loader; nothing is reloaded before it is ready
+        read (callable): (bundle) -> a new models object read from that bundle
+        install (callable): Makes a models object the one requests use
+        current_bundle (callable): () -> the bundle the subsystem's loader read (or tried to)
+        score (callable): (models, inputs) -> result, for shadow scoring
+        agree (callable): (live result, shadow result) -> (matches, compared)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        subsystem: Subsystem,
+        read: Callable[[Any], Any],
+        install: Callable[[Any], None],
+        current_bundle: Callable[[], Any],
+        score: Optional[Callable[[Any, Any], Any]] = None,
+        agree: Optional[Callable[[Any, Any], Tuple[int, int]]] = None
+    ):
+        self.name = name
+        self.subsystem = subsystem
+        self.read = read
+        self.install = install
+        self.current_bundle = current_bundle
+        self.score = score
+        self.agree = agree
+        self.listeners: List[Callable[[Any], None]] = []
+
+        # The source last acted on (served, failed or discarded) and the version
+        # serving. A bundle's fingerprint is taken as its files are read, so
+        # it is adopted once the subsystem's loader has run (see _adopt_loaded)
+        self.fingerprint = None
+        self.version = None
+        self._pending_fingerprint = None
+        self.candidate = None
+        self.candidate_fingerprint = None
+        self.swaps = 0
+        self.last_swap = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._reset_shadow()
+
+    def on_swap(self, listener: Callable[[Any], None]):
+        """Call listener(new models) after every swap"""
+        self.listeners.append(listener)
+
+    # ------------------------------------------------------------------------
+    # Reload
+    # ------------------------------------------------------------------------
+
+    def check(self):
+        """
+        One watcher step: a changed source is loaded once it has stayed the
+        same for two checks (so files still being copied are not read)
+        """
+        if self.subsystem.state != "ready":
+            return
+        self._adopt_loaded()
+        if self.fingerprint is None:
+            return
+        current = source_fingerprint(self.name)
+        if current in (self.fingerprint, self.candidate_fingerprint):
+            self._pending_fingerprint = None
+            return
+        if current != self._pending_fingerprint:
+            self._pending_fingerprint = current
+            return
+        self._pending_fingerprint = None
+        self.reload(current)
+
+    def _adopt_loaded(self):
+        """Take the fingerprint of what the subsystem's own loader read"""
+        if self.fingerprint is not None:
+            return
+        fingerprint = self.current_bundle().fingerprint
+        if fingerprint is not None:
+            self.fingerprint = fingerprint
+            self.version = fingerprint[0]
+
+    def reload(self, fingerprint=None):
+        fingerprint = fingerprint or source_fingerprint(self.name)
+        print(f"🔄 {self.name}: loading new models...")
+        start = time.perf_counter()
+        try:
+            models = self.read(open_bundle(self.name))
+            # What was actually read, should the source have moved on since
+            fingerprint = models.bundle.fingerprint or fingerprint
+        except Exception as e:
+            # Keep serving the old models; retry only when the files change again
+            self.fingerprint = fingerprint
+            self.last_error = f"{fingerprint[0]}: {type(e).__name__}: {e}"
+            print(f"❌ {self.name}: reload failed, keeping the current models ({self.last_error})")
+            return
+        self.last_error = None
+        print(f"✅ {self.name}: loaded in {time.perf_counter() - start:.2f}s")
+
+        if SHADOW_RATE > 0 and self.score is not None:
+            with self._lock:
+                self.candidate, self.candidate_fingerprint = models, fingerprint
+                self._reset_shadow()
+            print(f"🔍 {self.name}: shadow-scoring {SHADOW_RATE:.0%} of traffic before promotion")
+        else:
+            self._swap(models, fingerprint)
+
+    def _swap(self, models, fingerprint):
+        # A single reference assignment: requests already running keep the
+        # models they started with, new ones get the new version
+        self.install(models)
+        self.fingerprint = fingerprint
+        self.version = fingerprint[0]
+        self.swaps += 1
+        self.last_swap = time.strftime("%Y-%m-%dT%H:%M:%S")
+        for listener in self.listeners:
+            try:
+                listener(models)
+            except Exception as e:
+                print(f"⚠️ {self.name}: swap listener failed: {e}")
+        print(f"✅ {self.name}: new models serving")
+
+    def promote(self) -> bool:
+        with self._lock:
+            models, fingerprint = self.candidate, self.candidate_fingerprint
+            self.candidate = self.candidate_fingerprint = None
+        if models is None:
+            return False
+        self._swap(models, fingerprint)
+        return True
+
+    def discard(self) -> bool:
+        """Drop the candidate; it is not reloaded until the files change again"""
+        with self._lock:
+            if self.candidate is None:
+                return False
+            self.fingerprint = self.candidate_fingerprint
+            self.candidate = self.candidate_fingerprint = None
+        return True
+
+    # ------------------------------------------------------------------------
+    # Shadow scoring
+    # ------------------------------------------------------------------------
+
+    def _reset_shadow(self):
+        self.shadow_matches = 0
+        self.shadow_compared = 0
+        self.shadow_errors = 0
+        self.shadow_dropped = 0
+        self.shadow_pending = 0
+        self.shadow_latency_ms = deque(maxlen=1000)
+
+    def maybe_shadow(self, inputs, live_result):
+        """Called on the request path after the live result is ready; returns at once"""
+        candidate = self.candidate
+        if candidate is None or random.random() >= SHADOW_RATE:
+            return
+        with self._lock:
+            if self.shadow_pending >= SHADOW_MAX_PENDING:
+                self.shadow_dropped += 1
+                return
+            self.shadow_pending += 1
+        # The shadow pool runs off the request path; a response never waits on it
+        get_executor("shadow").submit(self._shadow, candidate, inputs, live_result)
+
+    def _shadow(self, candidate, inputs, live_result):
+        try:
+            start = time.perf_counter()
+            shadow_result = self.score(candidate, inputs)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            matches, compared = self.agree(live_result, shadow_result)
+        except Exception as e:
+            with self._lock:
+                self.shadow_errors += 1
+                self.shadow_pending -= 1
+            print(f"⚠️ {self.name}: shadow scoring failed: {e}")
+            return
+
+        with self._lock:
+            self.shadow_pending -= 1
+            if candidate is not self.candidate:
+                return
+            self.shadow_matches += matches
+            self.shadow_compared += compared
+            self.shadow_latency_ms.append(elapsed_ms)
+            ready = self.shadow_compared >= PROMOTE_AFTER
+            agreement = self.shadow_matches / self.shadow_compared if self.shadow_compared else 0.0
+        if ready and agreement >= PROMOTE_AGREEMENT:
+            print(f"✅ {self.name}: candidate agrees on {agreement:.1%} of {self.shadow_compared}; promoting")
+            self.promote()
+
+    # ------------------------------------------------------------------------
+    # Status
+    # ------------------------------------------------------------------------
+
+    def status(self) -> dict:
+        if self.subsystem.state == "ready":
+            self._adopt_loaded()
+        with self._lock:
+            latencies = np.array(self.shadow_latency_ms)
+            candidate = None
+            if self.candidate is not None:
+                candidate = {
+                    "version": self.candidate_fingerprint[0],
+                    "compared": self.shadow_compared,
+                    "agreement": round(self.shadow_matches / self.shadow_compared, 4)
+                    if self.shadow_compared else None,
+                    "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+                    "latency_p99_ms": round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+                    "errors": self.shadow_errors,
+                    "dropped": self.shadow_dropped,
+                    "pending": self.shadow_pending
+                }
+            return {
+                "state": self.subsystem.state,
+                "version": self.version,
+                "swaps": self.swaps,
+                "last_swap": self.last_swap,
+                "last_error": self.last_error,
+                "candidate": candidate
+            }
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+SLOTS: Dict[str, ModelSlot] = {}
+
+_watcher = None
+_stop = threading.Event()
+
+
+def add_slot(slot: ModelSlot) -> ModelSlot:
+    SLOTS[slot.name] = slot
+    return slot
+
+
+def _watch():
+    while not _stop.wait(WATCH_SECONDS):
+        for slot in list(SLOTS.values()):
+            try:
+                slot.check()
+            except Exception as e:
+                print(f"⚠️ {slot.name}: model watcher error: {e}")
+
+
+def start_model_watcher() -> Optional[threading.Thread]:
+    """Called from the app's startup event"""
+    global _watcher
+    if WATCH_SECONDS <= 0 or _watcher is not None:
+        return None
+    _stop.clear()
+    _watcher = threading.Thread(target=_watch, name="model-watcher", daemon=True)
+    _watcher.start()
+    return _watcher
+
+
+def stop_model_watcher():
+    global _watcher
+    _stop.set()
+    _watcher = None
+
+
+# ============================================================================
+# WORKER PROCESSES
+# ============================================================================
+
+def served_fingerprints() -> Dict[str, tuple]:
+    """name -> fingerprint of the bundle each slot serves in this process"""
+    served = {}
+    for name, slot in SLOTS.items():
+        fingerprint = slot.current_bundle().fingerprint
+        if fingerprint is not None:
+            served[name] = fingerprint
+    return served
+
+
+def call_with_models(fingerprints: Dict[str, tuple], fn: Callable[..., Any], *args) -> Any:
+    """
+    Run fn(*args) in a sklearn worker process (executors.py) on the models the
+    parent serves
+
+    A worker loads its models once, from whatever was installed when it
+    started, and never sees the parent's swaps. Each task carries the
+    parent's fingerprints; a slot whose bundle differs is re-read first.
+    Only slots whose module fn's import brought in are checked, so a risk
+    task never loads TensorFlow.
+    """
+    for name, fingerprint in fingerprints.items():
+        slot = SLOTS.get(name)
+        if slot is None:
+            continue
+        slot.subsystem.get()
+        if slot.current_bundle().fingerprint == fingerprint:
+            continue
+        version = fingerprint[0]
+        if version == "loose":
+            bundle = LooseFiles(name, LOOSE_FILES[name])
+        else:
+            bundle = ModelBundle.open(name, version)
+        slot.install(slot.read(bundle))
+        print(f"🔄 {name}: worker {os.getpid()} now serving {version}")
+    return fn(*args)
+
+
+def registry_status() -> dict:
+    return {
+        "watch_seconds": WATCH_SECONDS,
+        "shadow_rate": SHADOW_RATE,
+        "promote_after": PROMOTE_AFTER,
+        "promote_agreement": PROMOTE_AGREEMENT,
+        "models": {name: slot.status() for name, slot in SLOTS.items()}
+    }
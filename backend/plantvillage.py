@@ -0,0 +1,57 @@
+"""
+AgriShield - PlantVillage Dataset Helpers
+Locates the train/val/test split used to train best_cpu_model.keras
+"""
+
+import json
+import os
+from typing import List, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+DATASET_DIR = os.path.join(PROJECT_ROOT, "data", "processed", "PlantVillageDataset", "train_val_test")
+CLASS_INDICES_PATH = os.path.join(PROJECT_ROOT, "models", "class_indices.json")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def load_class_indices(path: str = CLASS_INDICES_PATH) -> dict:
+    """Class name -> index mapping saved at training time"""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def list_split(
+    split: str = "test",
+    dataset_dir: str = DATASET_DIR,
+    limit_per_class: Optional[int] = None
+) -> List[Tuple[str, str]]:
+    """
+    List the images of one split
+
+    Args:
+        split (str): "train", "val" or "test"
+        dataset_dir (str): Root containing the split folders
+        limit_per_class (int): Keep at most this many images per class
+
+    Returns:
+        list: (image_path, class_name) pairs in a stable order
+    """
+    split_dir = os.path.join(dataset_dir, split)
+    if not os.path.isdir(split_dir):
+        raise FileNotFoundError(f"Split folder not found: {split_dir}")
+
+    samples = []
+    for class_name in sorted(os.listdir(split_dir)):
+        class_dir = os.path.join(split_dir, class_name)
+        if not os.path.isdir(class_dir):
+            continue
+        files = sorted(
+            f for f in os.listdir(class_dir)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if limit_per_class is not None:
+            files = files[:limit_per_class]
+        samples.extend((os.path.join(class_dir, f), class_name) for f in files)
+
+    return samples
@@ -3,52 +3,223 @@ AgriShield - Prediction Module
 Contains the prediction logic for crop failure risk assessment
 """
 
-import pickle
 import numpy as np
 import pandas as pd
 import os
+from typing import NamedTuple, Optional
 
-print("Loading models and encoders...")
+from cache import LRUCache
+from fast_risk import CompiledRiskModel, compile_risk_model, is_binary_forest
+from model_bundle import open_bundle
+from model_registry import ModelSlot, add_slot
+from subsystems import Subsystem, register
+from weather import sample_rainfall
+
+# "compiled" scores single requests through fast_risk.CompiledRiskModel
+# (bit-identical, without sklearn's per-call validation); "sklearn" keeps
+# the encoder/scaler/predict_proba calls
+RISK_ENGINE = os.getenv("AGRISHIELD_RISK_ENGINE", "compiled")
+if RISK_ENGINE not in ("compiled", "sklearn"):
+    raise ValueError(f"Unknown AGRISHIELD_RISK_ENGINE: {RISK_ENGINE}")
 
 # ============================================================================
 # LOAD ALL MODELS AND DATA
 # ============================================================================
 
+# The "risk" model bundle (model_bundle.py), or the loose files in models/
+RISK_BUNDLE = open_bundle("risk")
+
+# Plain lists behind /api/crops, /api/states and /api/districts; cheap to
+# unpickle, so they are always loaded at import
 try:
-    with open('../models/crop_failure_model.pkl', 'rb') as f:
-        model = pickle.load(f)
-    
-    with open('../models/scaler.pkl', 'rb') as f:
-        scaler = pickle.load(f)
-    
-    with open('../models/crop_encoder.pkl', 'rb') as f:
-        crop_encoder = pickle.load(f)
-    
-    with open('../models/state_encoder.pkl', 'rb') as f:
-        state_encoder = pickle.load(f)
-    
-    with open('../models/district_info.pkl', 'rb') as f:
-        district_info = pickle.load(f)
-    
-    with open('../models/crop_list.pkl', 'rb') as f:
-        crop_list = pickle.load(f)
-    
-    with open('../models/state_list.pkl', 'rb') as f:
-        state_list = pickle.load(f)
-    
-    with open('../models/district_list.pkl', 'rb') as f:
-        district_list = pickle.load(f)
-    
-    print("✅ All models loaded successfully!")
+    crop_list = RISK_BUNDLE.load("crop_list")
+    state_list = RISK_BUNDLE.load("state_list")
+    district_list = RISK_BUNDLE.load("district_list")
 
 except FileNotFoundError as e:
-    print(f"❌ Error loading models: {e}")
+    print(f"❌ Error loading crop/state/district lists: {e}")
     print("Please run train_model.ipynb first!")
     # Create empty lists to prevent errors
     crop_list = []
     state_list = []
     district_list = []
 
+
+class RiskModels(NamedTuple):
+    """Everything scoring reads from one risk bundle, swapped as a unit on reload"""
+    bundle: object                                # ModelBundle or LooseFiles it came from
+    model: object                                 # RandomForestClassifier
+    scaler: object                                # StandardScaler
+    crop_encoder: object                          # LabelEncoder
+    state_encoder: object                         # LabelEncoder
+    district_info: dict                           # "District, State" -> soil_quality, soil_type
+    compiled_model: Optional[CompiledRiskModel]   # None with AGRISHIELD_RISK_ENGINE=sklearn
+    # Flattened forest used for path contributions (the compiled model when
+    # there is one); None for models that are not binary random forests
+    explainer: Optional[CompiledRiskModel]
+    lists: tuple                                  # (crop_list, state_list, district_list)
+    generation: int = 0                           # bumped on every install; part of the cache key
+
+
+# The models requests score with, set by the "risk" subsystem (see
+# subsystems.py) and replaced by model_registry.py when a new bundle is
+# installed. Read it once per call: a reload between two reads would mix
+# versions.
+active: Optional[RiskModels] = None
+
+
+def read_risk_models(bundle) -> RiskModels:
+    """Unpickle the risk model, scaler, encoders and district info from a bundle"""
+    print("Loading models and encoders...")
+    try:
+        model = bundle.load("model")
+        scaler = bundle.load("scaler")
+        crop_encoder = bundle.load("crop_encoder")
+        state_encoder = bundle.load("state_encoder")
+        district_info = bundle.load("district_info")
+        lists = (bundle.load("crop_list"), bundle.load("state_list"), bundle.load("district_list"))
+        
+        print("✅ All models loaded successfully!")
+
+        compiled_model = explainer = None
+        if RISK_ENGINE == "compiled":
+            if bundle.has("compiled_forest"):
+                # Checked against the forest when the bundle was built
+                arrays = {name: bundle.load(f"compiled_forest.{name}") for name in CompiledRiskModel.ARRAYS}
+                compiled_model = CompiledRiskModel.from_arrays(arrays, bundle.load("compiled_forest"),
+                                                               crop_encoder, state_encoder)
+            else:
+                compiled_model = compile_risk_model(model, scaler, crop_encoder, state_encoder)
+        if is_binary_forest(model):
+            explainer = compiled_model or CompiledRiskModel(model, scaler, crop_encoder, state_encoder)
+
+    except FileNotFoundError as e:
+        print(f"❌ Error loading models: {e}")
+        print("Please run train_model.ipynb first!")
+        raise
+
+    return RiskModels(bundle, model, scaler, crop_encoder, state_encoder, district_info, compiled_model,
+                      explainer, lists)
+
+
+def install(models: RiskModels):
+    """Make `models` the ones new requests score with"""
+    global active, RISK_BUNDLE
+    models = models._replace(generation=active.generation + 1 if active is not None else 0)
+    # The lists are updated in place: main.py imported these objects
+    for current, new in zip((crop_list, state_list, district_list), models.lists):
+        current[:] = new
+    RISK_BUNDLE = models.bundle
+    active = models
+
+
+def load_models():
+    install(read_risk_models(RISK_BUNDLE))
+
+
+def warm_up():
+    """One prediction through the encoders, scaler and forest"""
+    if crop_list and state_list:
+        score_crop_failure(crop_list[0], state_list[0], state_list[0], "Kharif", 28.0, 1000.0, 70.0, 0)
+
+
+# ============================================================================
+# FEATURE CONSTANTS (shared by the single and batch paths)
+# ============================================================================
+
+SEASON_MAP = {
+    'Kharif': 1, 'Rabi': 2, 'Summer': 3, 'Zaid': 3,
+    'Whole Year': 4, 'Autumn': 5, 'Winter': 6
+}
+DEFAULT_SEASON_CODE = 4
+
+SEASON_RAINFALL_AVG = {
+    'Kharif': 1200, 'Rabi': 60, 'Summer': 100, 'Whole Year': 800
+}
+DEFAULT_RAINFALL_AVG = 600
+
+SEASON_TEMP_AVG = {
+    'Kharif': 28, 'Rabi': 20, 'Summer': 35, 'Whole Year': 27
+}
+DEFAULT_TEMP_AVG = 27
+
+# Used when a district has no soil record
+DEFAULT_SOIL_QUALITY = 0.70
+DEFAULT_SOIL_TYPE = 'Alluvial'
+
+# The 11 model features in training order, with the wording used in explanations
+FEATURE_NAMES = [
+    'Crop_Encoded', 'State_Encoded', 'Season_Encoded', 'Avg_Temperature', 'Total_Rainfall', 'Avg_Humidity',
+    'Soil_Quality_Score', 'Rainfall_Deviation', 'Temperature_Deviation', 'Disaster_Occurred', 'Severity_Score'
+]
+FEATURE_LABELS = {
+    'Crop_Encoded': "Choice of crop",
+    'State_Encoded': "State",
+    'Season_Encoded': "Season",
+    'Avg_Temperature': "Temperature",
+    'Total_Rainfall': "Rainfall",
+    'Avg_Humidity': "Humidity",
+    'Soil_Quality_Score': "Soil quality",
+    'Rainfall_Deviation': "Rainfall deviation from the seasonal average",
+    'Temperature_Deviation': "Temperature deviation from the seasonal average",
+    'Disaster_Occurred': "Recent disaster event",
+    'Severity_Score': "Disaster severity"
+}
+
+
+def risk_level_for(risk_score):
+    """(risk level, colour) for a 0-100 risk score"""
+    if risk_score < 30:
+        return "Low", "green"
+    elif risk_score < 60:
+        return "Medium", "orange"
+    return "High", "red"
+
+
+def risk_points(probability):
+    """
+    Failure probability (scalar or array) as 0-100 risk score points, to 2 decimals
+
+    Every endpoint rounds through here so a row scores the same whether it
+    comes from /predict-risk, the batch, the surface or the risk matrix.
+    """
+    points = np.round(np.asarray(probability, dtype=np.float64) * 100, 2)
+    return float(points) if points.ndim == 0 else points
+
+
+# ============================================================================
+# RESULT CACHE
+# ============================================================================
+
+# Weather inputs are snapped to these steps in the cache key, so slider
+# positions that differ only past this precision share one cache entry
+# (0 = key on the exact value)
+CACHE_STEPS = {
+    'temperature': float(os.getenv("AGRISHIELD_RISK_CACHE_TEMP_STEP", "0.1")),
+    'rainfall': float(os.getenv("AGRISHIELD_RISK_CACHE_RAINFALL_STEP", "1")),
+    'humidity': float(os.getenv("AGRISHIELD_RISK_CACHE_HUMIDITY_STEP", "0.5"))
+}
+
+RISK_CACHE = os.getenv("AGRISHIELD_RISK_CACHE", "on")
+if RISK_CACHE not in ("on", "off"):
+    raise ValueError(f"Unknown AGRISHIELD_RISK_CACHE: {RISK_CACHE}")
+
+risk_cache = LRUCache(
+    max_entries=int(os.getenv("AGRISHIELD_RISK_CACHE_ENTRIES", "10000")),
+    max_bytes=int(float(os.getenv("AGRISHIELD_RISK_CACHE_MB", "16")) * 1024 * 1024),
+    ttl_seconds=float(os.getenv("AGRISHIELD_RISK_CACHE_TTL", "3600")),
+    sizer=lambda result: len(repr(result)),
+    name="predict-risk"
+)
+
+
+def quantize(value: float, step: float) -> float:
+    """value rounded to the nearest multiple of step (without float noise)"""
+    if step <= 0:
+        return float(value)
+    return round(round(value / step) * step, 6)
+
+
 # ============================================================================
 # PREDICTION FUNCTION
 # ============================================================================
@@ -62,6 +233,52 @@ def predict_crop_failure(
     rainfall: float,
     humidity: float,
     disaster_occurred: int = 0
+):
+    """
+    score_crop_failure on the exact inputs, memoized in risk_cache
+
+    Scoring always uses the values given, so with the cache off (or on a
+    miss) the result is identical to predict_crop_failure_batch. The cache
+    key snaps the weather inputs to CACHE_STEPS: every request in a bucket
+    is served the result of the first one scored in it, which differs from
+    its own exact score by at most the model's change within one step.
+    Cached results are shared between callers and must not be modified.
+    """
+    args = (crop, state, district, season, temperature, rainfall, humidity, int(disaster_occurred))
+    risk_models.get()
+    models = active
+
+    if RISK_CACHE == "off":
+        result = score_crop_failure(*args, models=models)
+    else:
+        # The generation keeps results of a replaced model from being served
+        # (or stored by a request that started before the swap)
+        key = (crop, state, district, season,
+               quantize(temperature, CACHE_STEPS['temperature']),
+               quantize(rainfall, CACHE_STEPS['rainfall']),
+               quantize(humidity, CACHE_STEPS['humidity']),
+               int(disaster_occurred), models.generation)
+        result = risk_cache.get(key)
+        if result is None:
+            result = score_crop_failure(*args, models=models)
+            # Unknown crops/states are cheap to reject and not worth an entry
+            if 'error' not in result:
+                risk_cache.put(key, result)
+
+    risk_slot.maybe_shadow(args, result)
+    return result
+
+
+def score_crop_failure(
+    crop: str,
+    state: str,
+    district: str,
+    season: str,
+    temperature: float,
+    rainfall: float,
+    humidity: float,
+    disaster_occurred: int = 0,
+    models: Optional[RiskModels] = None
 ):
     """
     Predict crop failure risk based on input parameters
@@ -75,14 +292,22 @@ def predict_crop_failure(
         rainfall (float): Total expected rainfall in mm
         humidity (float): Average humidity percentage
         disaster_occurred (int): 0 = No disaster, 1 = Disaster occurred
+        models (RiskModels): Scored with instead of the active models
     
     Returns:
         dict: Prediction results with risk score, level, explanation, and recommendations
     """
+    if models is None:
+        risk_models.get()
+        models = active
+    model, scaler, compiled_model, explainer = models.model, models.scaler, models.compiled_model, models.explainer
     
     try:
         # Encode crop
-        crop_encoded = crop_encoder.transform([crop])[0]
+        if compiled_model is not None:
+            crop_encoded = compiled_model.crop_codes[crop]
+        else:
+            crop_encoded = models.crop_encoder.transform([crop])[0]
     except:
         return {
             'error': f'Crop "{crop}" not found in training data',
@@ -91,7 +316,10 @@ def predict_crop_failure(
     
     try:
         # Encode state
-        state_encoded = state_encoder.transform([state])[0]
+        if compiled_model is not None:
+            state_encoded = compiled_model.state_codes[state]
+        else:
+            state_encoded = models.state_encoder.transform([state])[0]
     except:
         return {
             'error': f'State "{state}" not found in training data',
@@ -100,33 +328,24 @@ def predict_crop_failure(
     
     # Get district soil information
     district_key = f"{district}, {state}"
+    district_info = models.district_info
     if district_key in district_info:
         soil_quality = district_info[district_key]['soil_quality']
         soil_type = district_info[district_key]['soil_type']
     else:
         # Use default values if district not found
-        soil_quality = 0.70
-        soil_type = 'Alluvial'
+        soil_quality = DEFAULT_SOIL_QUALITY
+        soil_type = DEFAULT_SOIL_TYPE
     
     # Season encoding
-    season_map = {
-        'Kharif': 1, 'Rabi': 2, 'Summer': 3, 'Zaid': 3,
-        'Whole Year': 4, 'Autumn': 5, 'Winter': 6
-    }
-    season_encoded = season_map.get(season, 4)
+    season_encoded = SEASON_MAP.get(season, DEFAULT_SEASON_CODE)
     
     # Calculate rainfall deviation from seasonal average
-    season_rainfall_avg = {
-        'Kharif': 1200, 'Rabi': 60, 'Summer': 100, 'Whole Year': 800
-    }
-    avg_rainfall = season_rainfall_avg.get(season, 600)
+    avg_rainfall = SEASON_RAINFALL_AVG.get(season, DEFAULT_RAINFALL_AVG)
     rainfall_deviation = ((rainfall - avg_rainfall) / (avg_rainfall + 1)) * 100
     
     # Calculate temperature deviation from seasonal average
-    season_temp_avg = {
-        'Kharif': 28, 'Rabi': 20, 'Summer': 35, 'Whole Year': 27
-    }
-    avg_temp = season_temp_avg.get(season, 27)
+    avg_temp = SEASON_TEMP_AVG.get(season, DEFAULT_TEMP_AVG)
     temperature_deviation = ((temperature - avg_temp) / (avg_temp + 1)) * 100
     
     # Calculate severity score
@@ -147,29 +366,31 @@ def predict_crop_failure(
         severity_score          # Severity_Score
     ]])
     
-    # Scale features
-    features_scaled = scaler.transform(features)
-    
-    # Predict probability
-    failure_probability = model.predict_proba(features_scaled)[0][1]
-    risk_score = round(failure_probability * 100, 2)
+    if compiled_model is not None:
+        failure_probability = compiled_model.failure_probability(features[0])
+    else:
+        # Scale features
+        features_scaled = scaler.transform(features)
+        
+        # Predict probability
+        failure_probability = model.predict_proba(features_scaled)[0][1]
+    risk_score = risk_points(failure_probability)
     
     # Determine risk level
-    if risk_score < 30:
-        risk_level = "Low"
-        color = "green"
-    elif risk_score < 60:
-        risk_level = "Medium"
-        color = "orange"
+    risk_level, color = risk_level_for(risk_score)
+    
+    # Explain the score by what the model used for this input
+    if explainer is not None:
+        base_probability, contributions = explainer.path_contributions(features)
+        base_risk = risk_points(base_probability)
+        path_contributions = rank_contributions(features[0], contributions[0])
+        explanation = explain_contributions(path_contributions)
     else:
-        risk_level = "High"
-        color = "red"
-    
-    # Generate explanation
-    explanation = generate_explanation(
-        risk_score, rainfall_deviation, temperature_deviation,
-        soil_quality, disaster_occurred
-    )
+        base_risk, path_contributions = None, None
+        explanation = generate_explanation(
+            risk_score, rainfall_deviation, temperature_deviation,
+            soil_quality, disaster_occurred
+        )
     
     # Get recommendations
     recommendations = get_recommendations(risk_level, crop, season)
@@ -179,6 +400,8 @@ def predict_crop_failure(
         'risk_level': risk_level,
         'color': color,
         'explanation': explanation,
+        'base_risk': base_risk,
+        'path_contributions': path_contributions,
         'recommendations': recommendations,
         'district_info': {
             'soil_type': soil_type,
@@ -192,8 +415,43 @@ def predict_crop_failure(
 # HELPER FUNCTIONS
 # ============================================================================
 
+# Contributions (risk score points) below this are not called out in the explanation
+EXPLANATION_MIN_POINTS = 1.0
+EXPLANATION_MAX_FACTORS = 4
+
+
+def rank_contributions(feature_row, contributions):
+    """
+    [{feature, value, contribution}] for the 11 features, largest effect first
+
+    contribution is in risk score points: positive raises the risk, and the
+    contributions add up to risk_score - base_risk. They are decision-path
+    credits (fast_risk.py), not Shapley values, so a feature's share is
+    only approximate.
+    """
+    ranked = [
+        {'feature': name, 'value': float(value), 'contribution': float(contribution)}
+        for name, value, contribution in zip(FEATURE_NAMES, feature_row, risk_points(contributions))
+    ]
+    return sorted(ranked, key=lambda item: abs(item['contribution']), reverse=True)
+
+
+def explain_contributions(path_contributions):
+    """Human-readable explanation from the features that raised the model's risk estimate"""
+    factors = [
+        f"{FEATURE_LABELS[item['feature']]} raises the risk by {item['contribution']:.1f} points"
+        for item in path_contributions
+        if item['contribution'] >= EXPLANATION_MIN_POINTS
+    ][:EXPLANATION_MAX_FACTORS]
+    
+    if not factors:
+        return "✅ Weather and soil conditions appear favorable for crop growth in this region."
+    
+    return "Risk factors identified:\n• " + "\n• ".join(factors)
+
+
 def generate_explanation(risk_score, rainfall_dev, temp_dev, soil_quality, disaster):
-    """Generate human-readable explanation of risk factors"""
+    """Rule-based explanation, for models without an explainer (not a binary random forest)"""
     
     factors = []
     
@@ -264,6 +522,315 @@ def get_recommendations(risk_level, crop, season):
         ]
 
 
+# ============================================================================
+# BATCH PREDICTION
+# ============================================================================
+
+BATCH_COLUMNS = ['crop', 'state', 'district', 'season', 'temperature', 'rainfall', 'humidity', 'disaster_occurred']
+
+# Same bounds as RiskPredictionRequest in main.py
+NUMERIC_RANGES = {
+    'temperature': (-10, 50),
+    'rainfall': (0, 5000),
+    'humidity': (0, 100),
+    'disaster_occurred': (0, 1)
+}
+
+
+def encode_labels(encoder, values: pd.Series) -> np.ndarray:
+    """LabelEncoder.transform for a whole column; unseen labels become -1 instead of raising"""
+    return pd.Categorical(values, categories=encoder.classes_).codes.astype(np.int64)
+
+
+def assemble_features(crop_encoded, state_encoded, season_encoded, temperature, rainfall, humidity,
+                      soil_quality, avg_rainfall, avg_temp, disaster):
+    """
+    The (N, 11) float64 feature matrix in training order; any argument may
+    be a scalar or an (N,) array
+    """
+    columns = np.broadcast_arrays(*[np.asarray(c, dtype=np.float64) for c in (
+        crop_encoded,                                               # Crop_Encoded
+        state_encoded,                                              # State_Encoded
+        season_encoded,                                             # Season_Encoded
+        temperature,                                                # Avg_Temperature
+        rainfall,                                                   # Total_Rainfall
+        humidity,                                                   # Avg_Humidity
+        soil_quality,                                               # Soil_Quality_Score
+        ((rainfall - avg_rainfall) / (avg_rainfall + 1)) * 100,     # Rainfall_Deviation
+        ((temperature - avg_temp) / (avg_temp + 1)) * 100,          # Temperature_Deviation
+        disaster,                                                   # Disaster_Occurred
+        disaster * 2                                                # Severity_Score
+    )])
+    return np.column_stack([np.atleast_1d(c) for c in columns])
+
+
+def build_feature_matrix(rows: pd.DataFrame, models: Optional[RiskModels] = None):
+    """
+    The 11 model features for every row at once, in training order (encoded
+    with `models`, by default the active ones)
+
+    Returns:
+        tuple: (features (N, 11) float64, error per row or None, soil type per row)
+    """
+    # First problem per row wins, in the order the single endpoint checks them
+    errors = pd.Series(None, index=rows.index, dtype=object)
+
+    def flag(bad, message):
+        return errors.mask(bad & errors.isna(), message)
+
+    numeric = {}
+    for column, (low, high) in NUMERIC_RANGES.items():
+        if column in rows:
+            values = pd.to_numeric(rows[column], errors='coerce')
+        else:
+            values = pd.Series(np.nan, index=rows.index)
+        if column == 'disaster_occurred':
+            # Optional, as in the single endpoint; must be 0 or 1
+            values = values.fillna(0)
+            errors = flag(values % 1 != 0, "disaster_occurred must be 0 or 1")
+        errors = flag(values.isna() | (values < low) | (values > high),
+                      f"{column} must be a number between {low} and {high}")
+        numeric[column] = values.to_numpy(dtype=np.float64)
+
+    models = models or active
+    crop_encoded = encode_labels(models.crop_encoder, rows['crop'])
+    state_encoded = encode_labels(models.state_encoder, rows['state'])
+    errors = flag(crop_encoded < 0, 'Crop "' + rows['crop'].astype(str) + '" not found in training data')
+    errors = flag(state_encoded < 0, 'State "' + rows['state'].astype(str) + '" not found in training data')
+
+    district_keys = rows['district'].astype(str) + ", " + rows['state'].astype(str)
+    district_info = models.district_info
+    soil_quality = district_keys.map({k: v['soil_quality'] for k, v in district_info.items()})
+    soil_type = district_keys.map({k: v['soil_type'] for k, v in district_info.items()}).fillna(DEFAULT_SOIL_TYPE)
+    soil_quality = soil_quality.fillna(DEFAULT_SOIL_QUALITY).to_numpy(dtype=np.float64)
+
+    season = rows['season']
+    season_encoded = season.map(SEASON_MAP).fillna(DEFAULT_SEASON_CODE).to_numpy(dtype=np.float64)
+    avg_rainfall = season.map(SEASON_RAINFALL_AVG).fillna(DEFAULT_RAINFALL_AVG).to_numpy(dtype=np.float64)
+    avg_temp = season.map(SEASON_TEMP_AVG).fillna(DEFAULT_TEMP_AVG).to_numpy(dtype=np.float64)
+
+    features = assemble_features(crop_encoded, state_encoded, season_encoded, numeric['temperature'],
+                                 numeric['rainfall'], numeric['humidity'], soil_quality, avg_rainfall, avg_temp,
+                                 numeric['disaster_occurred'])
+
+    return features, np.where(errors.isna(), None, errors), soil_type.to_numpy()
+
+
+def predict_crop_failure_batch(rows, explain: bool = False) -> pd.DataFrame:
+    """
+    Score many scenarios with one scaler call and one predict_proba call
+
+    Args:
+        rows: DataFrame or list of dicts with the predict_crop_failure
+            arguments as columns (disaster_occurred optional)
+
+    Returns:
+        DataFrame: the input columns plus risk_score, risk_level, color,
+        soil_type, soil_quality and error (set, with no score, for rows that
+        the single endpoint would reject); with explain, also base_risk and
+        one path_contribution_<feature> column per model feature (risk points)
+    """
+    risk_models.get()
+    models = active
+
+    rows = pd.DataFrame(rows)
+    missing = [c for c in BATCH_COLUMNS if c not in rows and c != 'disaster_occurred']
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    rows = rows.reset_index(drop=True)
+
+    features, errors, soil_type = build_feature_matrix(rows, models)
+    valid = np.array([e is None for e in errors], dtype=bool)
+
+    risk_score = np.full(len(rows), np.nan)
+    if valid.any():
+        failure_probability = models.model.predict_proba(models.scaler.transform(features[valid]))[:, 1]
+        risk_score[valid] = risk_points(failure_probability)
+
+    level_color = [risk_level_for(score) if ok else (None, None) for score, ok in zip(risk_score, valid)]
+    result = rows[[c for c in BATCH_COLUMNS if c in rows]].copy()
+    result['risk_score'] = risk_score
+    result['risk_level'] = [level for level, _ in level_color]
+    result['color'] = [color for _, color in level_color]
+    result['soil_type'] = soil_type
+    result['soil_quality'] = features[:, 6]
+    result['error'] = errors
+
+    if explain and models.explainer is not None:
+        contributions = np.full((len(rows), len(FEATURE_NAMES)), np.nan)
+        base_risk = np.full(len(rows), np.nan)
+        if valid.any():
+            base_probability, contributions[valid] = models.explainer.path_contributions(features[valid])
+            base_risk[valid] = risk_points(base_probability)
+        result['base_risk'] = base_risk
+        for i, name in enumerate(FEATURE_NAMES):
+            result[f'path_contribution_{name}'] = risk_points(contributions[:, i])
+    return result
+
+
+# ============================================================================
+# RISK SURFACE
+# ============================================================================
+
+def predict_risk_surface(crop, state, district, season, temperatures, rainfalls, humidities, disaster_occurred=0):
+    """
+    Risk score over every (temperature, rainfall, humidity) combination for one
+    crop/district/season, in one scaler call and one predict_proba call
+
+    Args:
+        temperatures, rainfalls, humidities: 1-D grids of values
+
+    Returns:
+        dict: {'risk_score': (T, R, H) ndarray, 'district_info': {...}} or
+        {'error': ...} for an unknown crop or state, like predict_crop_failure
+    """
+    risk_models.get()
+    models = active
+
+    crop_encoded = encode_labels(models.crop_encoder, pd.Series([crop]))[0]
+    if crop_encoded < 0:
+        return {'error': f'Crop "{crop}" not found in training data', 'available_crops': crop_list[:20]}
+    state_encoded = encode_labels(models.state_encoder, pd.Series([state]))[0]
+    if state_encoded < 0:
+        return {'error': f'State "{state}" not found in training data', 'available_states': state_list}
+
+    soil = models.district_info.get(f"{district}, {state}",
+                             {'soil_quality': DEFAULT_SOIL_QUALITY, 'soil_type': DEFAULT_SOIL_TYPE})
+
+    # indexing="ij" keeps the (temperature, rainfall, humidity) axis order
+    temperature, rainfall, humidity = (grid.ravel() for grid in np.meshgrid(
+        np.asarray(temperatures, dtype=np.float64), np.asarray(rainfalls, dtype=np.float64),
+        np.asarray(humidities, dtype=np.float64), indexing="ij"))
+
+    features = assemble_features(
+        crop_encoded, state_encoded, SEASON_MAP.get(season, DEFAULT_SEASON_CODE), temperature, rainfall, humidity,
+        soil['soil_quality'], SEASON_RAINFALL_AVG.get(season, DEFAULT_RAINFALL_AVG),
+        SEASON_TEMP_AVG.get(season, DEFAULT_TEMP_AVG), disaster_occurred
+    )
+    failure_probability = models.model.predict_proba(models.scaler.transform(features))[:, 1]
+    shape = (len(temperatures), len(rainfalls), len(humidities))
+
+    return {
+        'risk_score': risk_points(failure_probability).reshape(shape),
+        'district_info': {
+            'soil_type': soil['soil_type'],
+            'soil_quality': soil['soil_quality'],
+            'state': state,
+            'district': district
+        }
+    }
+
+
+# ============================================================================
+# RISK DISTRIBUTION
+# ============================================================================
+
+# Standard deviations used when the request gives no spread; weather_data.csv
+# has rainfall only, so temperature and humidity spreads are not fitted
+DEFAULT_TEMPERATURE_SPREAD = float(os.getenv("AGRISHIELD_MC_TEMPERATURE_SPREAD", "1.5"))
+DEFAULT_HUMIDITY_SPREAD = float(os.getenv("AGRISHIELD_MC_HUMIDITY_SPREAD", "8"))
+
+DISTRIBUTION_QUANTILES = [5, 25, 50, 75, 95]
+
+
+def summarize(values):
+    return {
+        'mean': round(float(values.mean()), 2),
+        **{f'p{q}': round(float(v), 2) for q, v in zip(DISTRIBUTION_QUANTILES,
+                                                        np.percentile(values, DISTRIBUTION_QUANTILES))}
+    }
+
+
+def predict_risk_distribution(crop, state, district, season, temperature, rainfall, humidity, disaster_occurred=0,
+                              samples=10000, rainfall_spread=None, temperature_spread=None, humidity_spread=None,
+                              seed=None):
+    """
+    Risk under an uncertain season forecast: weather samples around the given
+    values, all scored in one scaler call and one predict_proba call
+
+    Rainfall is sampled month by month from the district's climatology
+    (weather.sample_rainfall) unless rainfall_spread is given; temperature and
+    humidity are normal around the given values. Samples are clipped to the
+    ranges the single endpoint accepts.
+
+    Args:
+        rainfall_spread, temperature_spread, humidity_spread: standard
+            deviations overriding the fitted/default spreads
+        seed: for reproducible samples
+
+    Returns:
+        dict: risk mean, std and quantiles, the probability of each risk level,
+        the sampled weather summaries and district_info, or {'error': ...}
+        for an unknown crop or state, like predict_crop_failure
+    """
+    risk_models.get()
+    models = active
+
+    crop_encoded = encode_labels(models.crop_encoder, pd.Series([crop]))[0]
+    if crop_encoded < 0:
+        return {'error': f'Crop "{crop}" not found in training data', 'available_crops': crop_list[:20]}
+    state_encoded = encode_labels(models.state_encoder, pd.Series([state]))[0]
+    if state_encoded < 0:
+        return {'error': f'State "{state}" not found in training data', 'available_states': state_list}
+
+    soil = models.district_info.get(f"{district}, {state}",
+                             {'soil_quality': DEFAULT_SOIL_QUALITY, 'soil_type': DEFAULT_SOIL_TYPE})
+
+    rng = np.random.default_rng(seed)
+    rainfalls, rainfall_source = sample_rainfall(rng, samples, rainfall, state, district, season, rainfall_spread)
+    rainfalls = np.clip(rainfalls, *NUMERIC_RANGES['rainfall'])
+    temperatures = np.clip(rng.normal(temperature, DEFAULT_TEMPERATURE_SPREAD if temperature_spread is None
+                                      else temperature_spread, samples), *NUMERIC_RANGES['temperature'])
+    humidities = np.clip(rng.normal(humidity, DEFAULT_HUMIDITY_SPREAD if humidity_spread is None
+                                    else humidity_spread, samples), *NUMERIC_RANGES['humidity'])
+
+    features = assemble_features(
+        crop_encoded, state_encoded, SEASON_MAP.get(season, DEFAULT_SEASON_CODE), temperatures, rainfalls,
+        humidities, soil['soil_quality'], SEASON_RAINFALL_AVG.get(season, DEFAULT_RAINFALL_AVG),
+        SEASON_TEMP_AVG.get(season, DEFAULT_TEMP_AVG), disaster_occurred
+    )
+    failure_probability = models.model.predict_proba(models.scaler.transform(features))[:, 1]
+    risk_score = failure_probability * 100
+
+    # Levels of the rounded scores, exactly as the single endpoint would report them
+    levels = pd.Series([risk_level_for(score)[0] for score in risk_points(failure_probability)])
+    return {
+        'samples': samples,
+        'risk_score': {**summarize(risk_score), 'std': round(float(risk_score.std()), 2)},
+        'probability': {level: round(float((levels == level).mean()), 4) for level in ('Low', 'Medium', 'High')},
+        'weather': {
+            'temperature': summarize(temperatures),
+            'rainfall': {**summarize(rainfalls), 'spread_source': rainfall_source},
+            'humidity': summarize(humidities)
+        },
+        'district_info': {
+            'soil_type': soil['soil_type'],
+            'soil_quality': soil['soil_quality'],
+            'state': state,
+            'district': district
+        }
+    }
+
+
+# Bound before registering: in eager mode register() runs warm_up(), which
+# goes through score_crop_failure() and so through risk_models
+risk_models = Subsystem("risk", load_models, warm_up)
+register(risk_models)
+
+# Hot reload (model_registry.py). A candidate is shadow-scored on the
+# inputs of live requests and agrees when the risk level matches.
+risk_slot = add_slot(ModelSlot(
+    "risk", risk_models,
+    read=read_risk_models,
+    install=install,
+    current_bundle=lambda: RISK_BUNDLE,
+    score=lambda models, args: score_crop_failure(*args, models=models),
+    agree=lambda live, shadow: (int(live.get('risk_level') == shadow.get('risk_level')), 1)
+))
+# Entries of the replaced model can no longer be hit; free their space
+risk_slot.on_swap(lambda models: risk_cache.invalidate())
+
+
 # ============================================================================
 # TEST FUNCTION (for direct script execution)
 # ============================================================================
@@ -0,0 +1,144 @@
+"""
+AgriShield - Image Preprocessing
+Reduced-resolution decode and a single resize pass that produces both model
+inputs (224x224 for the ImageNet filter, 160x160 for the disease classifier)
+"""
+
+import io
+import os
+from typing import BinaryIO, NamedTuple, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+FILTER_SIZE = (224, 224)
+CLASSIFIER_SIZE = (160, 160)
+
+# Images that would decode to more pixels than this are refused from their
+# header, before any pixel data is read (JPEGs count at their drafted size)
+MAX_IMAGE_PIXELS = int(float(os.getenv("AGRISHIELD_MAX_IMAGE_MP", "40")) * 1_000_000)
+
+
+class ImageTooLarge(ValueError):
+    """The image's pixel count is over MAX_IMAGE_PIXELS (HTTP 413)"""
+
+
+class PreparedImage(NamedTuple):
+    """Everything the disease pipeline needs from one image"""
+    filter_pixels: np.ndarray      # (224, 224, 3) uint8, ImageNet filter input before preprocess_input
+    classifier_pixels: np.ndarray  # (160, 160, 3) float32 in [0, 1], disease classifier input
+    green_ratio: float             # fraction of pixels where G > R and G > B
+    plant_colour_ratio: float      # fraction of saturated pixels with a yellow-to-green (or brown) hue
+    saturation: float              # mean HSV saturation in [0, 1]
+    texture: float                 # mean absolute neighbour difference of the gray image in [0, 1]
+
+
+# ============================================================================
+# DECODE
+# ============================================================================
+
+def open_image(data: Union[bytes, BinaryIO], min_size=FILTER_SIZE) -> Image.Image:
+    """
+    Open an upload, letting JPEG decode straight to a reduced size
+
+    `draft` asks libjpeg to apply DCT scaling (1/2, 1/4 or 1/8) so a 12 MP
+    phone photo is never fully materialised; the result is still at least
+    `min_size`, so no detail needed by the models is lost.
+
+    Only the header has been read when the pixel count is checked, so an
+    oversized image (or a decompression bomb) costs no decode memory.
+    """
+    try:
+        image = Image.open(io.BytesIO(data) if isinstance(data, bytes) else data)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    image.header_size = image.size
+    if image.format == "JPEG":
+        image.draft("RGB", min_size)
+
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageTooLarge(
+            f"Image is {width}x{height} ({width * height / 1e6:.0f} MP); the limit is {MAX_IMAGE_PIXELS / 1e6:.0f} MP"
+        )
+    return image
+
+
+def decode_image(data: Union[bytes, BinaryIO]) -> Image.Image:
+    return open_image(data).convert("RGB")
+
+
+def decode_upload(data: Union[bytes, BinaryIO]) -> Tuple[Image.Image, int, bool]:
+    """
+    decode_image, plus what it cost
+
+    Returns:
+        tuple: (RGB image, bytes of decoded pixels held at once, whether the
+        JPEG was downscaled by `draft` while decoding)
+    """
+    image = open_image(data)
+    width, height = image.size
+    decoded_bytes = width * height * len(image.getbands())
+    if image.mode != "RGB":
+        # The decoded image and its RGB copy are alive at the same time
+        decoded_bytes += width * height * 3
+    return image.convert("RGB"), decoded_bytes, image.size != image.header_size
+
+
+# ============================================================================
+# SINGLE-PASS PREPROCESSING
+# ============================================================================
+
+def green_ratio(pixels: np.ndarray) -> float:
+    """Fraction of pixels whose green channel beats both red and blue"""
+    red, green, blue = pixels[..., 0], pixels[..., 1], pixels[..., 2]
+    return float(np.count_nonzero((green > red) & (green > blue)) / (pixels.shape[0] * pixels.shape[1]))
+
+
+# PIL hue is 0-255; 14..128 covers brown/orange (~20 deg) through green to cyan (~180 deg)
+PLANT_HUE_RANGE = (14, 128)
+MIN_PLANT_SATURATION = 40
+MIN_PLANT_VALUE = 30
+
+
+def colour_texture_stats(image: Image.Image, pixels: np.ndarray):
+    """Cheap colour and texture statistics used to short-circuit the plant validator"""
+    hsv = np.asarray(image.convert("HSV"))
+    hue, sat, val = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    plant_colour = (
+        (hue >= PLANT_HUE_RANGE[0]) & (hue <= PLANT_HUE_RANGE[1])
+        & (sat >= MIN_PLANT_SATURATION) & (val >= MIN_PLANT_VALUE)
+    )
+
+    gray = pixels.astype(np.int16).sum(axis=2) // 3
+    texture = (np.abs(np.diff(gray, axis=0)).mean() + np.abs(np.diff(gray, axis=1)).mean()) / 2 / 255.0
+
+    return float(plant_colour.mean()), float(sat.mean() / 255.0), float(texture)
+
+
+def classifier_image(intermediate: Image.Image) -> np.ndarray:
+    """160x160 uint8 classifier pixels from the 224x224 intermediate (training shards store these)"""
+    return np.asarray(intermediate.resize(CLASSIFIER_SIZE))
+
+
+def prepare_image(image: Image.Image) -> PreparedImage:
+    """
+    Resize once to the filter size and derive everything else from it
+
+    The 160x160 classifier input, the green ratio and the colour/texture
+    statistics are all computed from the 224x224 intermediate instead of the
+    full-resolution image.
+    """
+    intermediate = image.convert("RGB").resize(FILTER_SIZE)
+    filter_pixels = np.asarray(intermediate)
+    classifier_pixels = classifier_image(intermediate).astype(np.float32) / 255.0
+    plant_colour_ratio, saturation, texture = colour_texture_stats(intermediate, filter_pixels)
+
+    return PreparedImage(
+        filter_pixels=filter_pixels,
+        classifier_pixels=classifier_pixels,
+        green_ratio=green_ratio(filter_pixels),
+        plant_colour_ratio=plant_colour_ratio,
+        saturation=saturation,
+        texture=texture
+    )
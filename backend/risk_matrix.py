@@ -0,0 +1,270 @@
+"""
+AgriShield - National Risk Matrix
+Crop failure risk for every crop x state x season under climatological
+weather, computed offline and served from a memory-mapped array
+
+Baseline weather per (state, season) follows data_preprocessing.ipynb:
+seasonal rainfall is the mean over the state's districts in
+data/raw/weather_data.csv (weather.py), temperature and humidity are the notebook's
+seasonal values, soil comes from district_info.pkl and no disaster is
+assumed. A rebuild only recomputes the slices whose inputs changed.
+
+Usage (from backend/):
+    python risk_matrix.py [--force]
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from weather import load_weather, season_months
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+MATRIX_PREFIX = os.path.join(PROJECT_ROOT, "models", "risk_matrix")
+
+
+# Seasons with a climatology in data_preprocessing.ipynb:
+# (temperature, humidity); rainfall sums the months in weather.SEASON_MONTHS
+SEASON_BASELINES = {
+    "Kharif": (28.0, 78.0),
+    "Rabi": (20.0, 65.0),
+    "Summer": (35.0, 60.0),
+    "Whole Year": (27.0, 70.0)
+}
+SEASONS = list(SEASON_BASELINES)
+
+
+def matrix_paths(prefix: str = MATRIX_PREFIX) -> dict:
+    return {"scores": prefix + ".npy", "meta": prefix + ".json"}
+
+
+def model_identities() -> dict:
+    """Identity of the risk model and scaler; any change to them rescores everything"""
+    import predict
+    return predict.RISK_BUNDLE.identity(["model", "scaler"])
+
+
+# ============================================================================
+# TABLE
+# ============================================================================
+
+class RiskMatrix:
+    """
+    (crops, states, seasons) float32 risk scores with name -> index maps
+
+    Args:
+        scores: memory-mapped (n_crops, n_states, n_seasons) array
+        meta: the build manifest (axis names, baselines, identities)
+    """
+
+    def __init__(self, scores: np.ndarray, meta: dict):
+        self.scores = scores
+        self.meta = meta
+        self.crop_index = {name: i for i, name in enumerate(meta["crops"])}
+        self.state_index = {name: i for i, name in enumerate(meta["states"])}
+        self.season_index = {name: i for i, name in enumerate(meta["seasons"])}
+        self.lookups = 0
+        # Set when the risk model it was scored with is replaced; it keeps
+        # serving until a rebuilt matrix takes its place
+        self.stale = False
+
+    @classmethod
+    def load(cls, prefix: str = MATRIX_PREFIX) -> "RiskMatrix":
+        paths = matrix_paths(prefix)
+        with open(paths["meta"], "r") as f:
+            meta = json.load(f)
+        return cls(np.load(paths["scores"], mmap_mode="r"), meta)
+
+    def baseline(self, state: str, season: str) -> dict:
+        return self.meta["baselines"][state][season]
+
+    def lookup(self, crop: str, state: str, season: str) -> Optional[float]:
+        """Risk score (0-100), or None for a combination outside the matrix"""
+        try:
+            i, j, k = self.crop_index[crop], self.state_index[state], self.season_index[season]
+        except KeyError:
+            return None
+        self.lookups += 1
+        return round(float(self.scores[i, j, k]), 2)
+
+    def state_map(self, crop: str, season: str) -> Optional[dict]:
+        """state -> risk score for one crop and season"""
+        if crop not in self.crop_index or season not in self.season_index:
+            return None
+        self.lookups += 1
+        column = self.scores[self.crop_index[crop], :, self.season_index[season]]
+        return {state: round(float(score), 2) for state, score in zip(self.meta["states"], column)}
+
+    def stats(self) -> dict:
+        return {
+            "shape": list(self.scores.shape),
+            "built_at": self.meta["built_at"],
+            "stale": self.stale,
+            "lookups": self.lookups
+        }
+
+
+def load_matrix(prefix: str = MATRIX_PREFIX) -> Optional[RiskMatrix]:
+    """The matrix, or None (with a warning) when it is missing or the model has changed since"""
+    paths = matrix_paths(prefix)
+    if not all(os.path.exists(p) for p in paths.values()):
+        print(f"⚠️ Risk matrix not built ({paths['meta']}); run python risk_matrix.py")
+        return None
+    matrix = RiskMatrix.load(prefix)
+    if matrix.meta["model"] != model_identities():
+        print("⚠️ Risk matrix is stale (the risk model changed); run python risk_matrix.py")
+        return None
+    print(f"✅ Risk matrix loaded: {' x '.join(str(n) for n in matrix.scores.shape)} (crops x states x seasons)")
+    return matrix
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def climatology(states: list) -> dict:
+    """state -> season -> baseline weather and soil, as plain floats"""
+    import predict
+
+    weather = load_weather()
+    national = {season: float(weather[season_months(season)].sum(axis=1).mean()) for season in SEASON_BASELINES}
+    by_state = {state: rows for state, rows in weather.groupby("State")}
+
+    baselines = {}
+    for state in states:
+        soil = predict.active.district_info.get(f"{state}, {state}", {"soil_quality": predict.DEFAULT_SOIL_QUALITY})
+        baselines[state] = {}
+        for season, (temperature, humidity) in SEASON_BASELINES.items():
+            rows = by_state.get(state)
+            rainfall = float(rows[season_months(season)].sum(axis=1).mean()) if rows is not None else national[season]
+            baselines[state][season] = {
+                "temperature": temperature,
+                "rainfall": round(rainfall, 2),
+                "humidity": humidity,
+                "soil_quality": float(soil["soil_quality"]),
+                "rainfall_source": "state" if rows is not None else "national"
+            }
+    return baselines
+
+
+def score_cells(crops: list, cells: list, baselines: dict) -> np.ndarray:
+    """(len(crops), len(cells)) risk scores in one scaler + predict_proba call; cells are (state, season)"""
+    import predict
+
+    crop_codes = predict.encode_labels(predict.active.crop_encoder, pd.Series(crops))
+    state_codes = predict.encode_labels(predict.active.state_encoder, pd.Series([state for state, _ in cells]))
+    cell_inputs = pd.DataFrame([baselines[state][season] for state, season in cells])
+    seasons = pd.Series([season for _, season in cells])
+
+    # Crops vary slowest: row r is crop r // len(cells), cell r % len(cells)
+    n = len(cells)
+    features = predict.assemble_features(
+        np.repeat(crop_codes, n),
+        np.tile(state_codes, len(crops)),
+        np.tile(seasons.map(predict.SEASON_MAP).fillna(predict.DEFAULT_SEASON_CODE).to_numpy(), len(crops)),
+        np.tile(cell_inputs["temperature"].to_numpy(), len(crops)),
+        np.tile(cell_inputs["rainfall"].to_numpy(), len(crops)),
+        np.tile(cell_inputs["humidity"].to_numpy(), len(crops)),
+        np.tile(cell_inputs["soil_quality"].to_numpy(), len(crops)),
+        np.tile(seasons.map(predict.SEASON_RAINFALL_AVG).fillna(predict.DEFAULT_RAINFALL_AVG).to_numpy(), len(crops)),
+        np.tile(seasons.map(predict.SEASON_TEMP_AVG).fillna(predict.DEFAULT_TEMP_AVG).to_numpy(), len(crops)),
+        0
+    )
+    failure_probability = predict.active.model.predict_proba(predict.active.scaler.transform(features))[:, 1]
+    return predict.risk_points(failure_probability).reshape(len(crops), n)
+
+
+def build(prefix: str = MATRIX_PREFIX, force: bool = False) -> dict:
+    """
+    (Re)build the matrix, reusing every slice whose inputs are unchanged
+
+    A crop slice depends on the crop's encoder code, a (state, season) slice
+    on the state's code and its baseline; the model and scaler affect all.
+    """
+    import predict
+    predict.risk_models.get()
+
+    crops, states = list(predict.crop_list), list(predict.state_list)
+    baselines = climatology(states)
+    models = predict.active
+    crop_codes = {c: int(code) for c, code in zip(crops, predict.encode_labels(models.crop_encoder, pd.Series(crops)))}
+    state_codes = {s: int(code) for s, code in zip(states, predict.encode_labels(models.state_encoder, pd.Series(states)))}
+
+    paths = matrix_paths(prefix)
+    previous = RiskMatrix.load(prefix) if all(os.path.exists(p) for p in paths.values()) else None
+    reuse = previous is not None and not force and previous.meta["model"] == model_identities()
+
+    scores = np.zeros((len(crops), len(states), len(SEASONS)), dtype=np.float32)
+    stale_crops, stale_cells = set(crops), {(s, season) for s in states for season in SEASONS}
+    if reuse:
+        old = previous.meta
+        stale_crops = {c for c in crops if old["crop_codes"].get(c) != crop_codes[c]}
+        stale_cells = {(s, season) for s, season in stale_cells
+                       if old["state_codes"].get(s) != state_codes[s]
+                       or old["baselines"].get(s, {}).get(season) != baselines[s][season]}
+        # Copy every still-valid score across, by name (axes may have changed)
+        for i, c in enumerate(crops):
+            if c in stale_crops:
+                continue
+            for j, s in enumerate(states):
+                for k, season in enumerate(SEASONS):
+                    if (s, season) not in stale_cells:
+                        scores[i, j, k] = previous.scores[previous.crop_index[c], previous.state_index[s],
+                                                          previous.season_index[season]]
+
+    start = time.perf_counter()
+    cells = [(s, season) for s in states for season in SEASONS]
+    # Stale crops need every cell; fresh crops only need the stale cells
+    jobs = [(sorted(stale_crops, key=crops.index), cells),
+            ([c for c in crops if c not in stale_crops], [cell for cell in cells if cell in stale_cells])]
+    recomputed = 0
+    for job_crops, job_cells in jobs:
+        if not job_crops or not job_cells:
+            continue
+        block = score_cells(job_crops, job_cells, baselines)
+        for a, c in enumerate(job_crops):
+            for b, (s, season) in enumerate(job_cells):
+                scores[crops.index(c), states.index(s), SEASONS.index(season)] = block[a, b]
+        recomputed += block.size
+    elapsed = time.perf_counter() - start
+
+    # Readers keep their mapping of the old file; the new one appears atomically
+    os.makedirs(os.path.dirname(paths["scores"]), exist_ok=True)
+    tmp_scores = paths["scores"] + ".tmp.npy"
+    np.save(tmp_scores, scores)
+    meta = {
+        "crops": crops,
+        "states": states,
+        "seasons": SEASONS,
+        "crop_codes": crop_codes,
+        "state_codes": state_codes,
+        "baselines": baselines,
+        "model": model_identities(),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "recomputed": recomputed
+    }
+    tmp_meta = paths["meta"] + ".tmp"
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_scores, paths["scores"])
+    os.replace(tmp_meta, paths["meta"])
+
+    print(f"✅ Risk matrix: {scores.size} cells, {recomputed} recomputed in {elapsed:.2f}s -> {paths['scores']}")
+    return {"cells": int(scores.size), "recomputed": recomputed, "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the crop x state x season risk matrix")
+    parser.add_argument("--force", action="store_true", help="Recompute every slice")
+    args = parser.parse_args()
+    build(force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+AgriShield - Similar-Case Retrieval
+Nearest labelled PlantVillage training leaves for a diagnosis, by cosine
+similarity of the disease classifier's pooled embeddings
+
+The index is a float16 matrix of L2-normalised (optionally PCA-reduced)
+train embeddings saved as .npy and opened with mmap_mode="r", so every
+uvicorn worker maps the same pages instead of holding its own copy.
+
+Usage (from backend/):
+    python similarity.py [--dim 128] [--output similarity_build.json]
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from cache import file_fingerprint
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+INDEX_PREFIX = os.path.join(PROJECT_ROOT, "models", "similar_cases")
+MODEL_PATH = os.path.join(PROJECT_ROOT, "models", "best_cpu_model.keras")
+
+# Rows converted from float16 per block; small enough to stay in cache
+SEARCH_BLOCK_ROWS = 4096
+
+
+def index_paths(prefix: str = INDEX_PREFIX) -> dict:
+    return {
+        "vectors": prefix + ".f16.npy",
+        "projection": prefix + ".projection.npz",
+        "meta": prefix + ".json"
+    }
+
+
+def model_identity(model_path: str) -> dict:
+    """Size and mtime of the model file; the path itself may be relative"""
+    _, size, mtime_ns = file_fingerprint([model_path])[0]
+    return {"size": size, "mtime_ns": mtime_ns}
+
+
+def l2_normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class SimilarityIndex:
+    """
+    Brute-force cosine top-k over a memory-mapped float16 matrix
+
+    Args:
+        vectors: (N, dim) float16, rows L2-normalised
+        labels: (N,) class index per row
+        images: (N,) image paths relative to the project root
+        class_names: class index -> name
+        mean, components: PCA projection from the raw embedding size to
+            `dim` (None when the index stores raw embeddings)
+    """
+
+    def __init__(self, vectors: np.ndarray, labels: np.ndarray, images: List[str], class_names: List[str],
+                 mean: Optional[np.ndarray] = None, components: Optional[np.ndarray] = None):
+        self.vectors = vectors
+        self.labels = labels
+        self.images = images
+        self.class_names = class_names
+        self.mean = mean
+        self.components = components
+        self.queries = 0
+        self.search_seconds = 0.0
+
+    @classmethod
+    def load(cls, prefix: str = INDEX_PREFIX) -> "SimilarityIndex":
+        paths = index_paths(prefix)
+        with open(paths["meta"], "r") as f:
+            meta = json.load(f)
+        mean = components = None
+        if os.path.exists(paths["projection"]):
+            projection = np.load(paths["projection"])
+            mean, components = projection["mean"], projection["components"]
+        return cls(
+            np.load(paths["vectors"], mmap_mode="r"),
+            np.asarray(meta["labels"], dtype=np.int16),
+            meta["images"],
+            meta["class_names"],
+            mean,
+            components
+        )
+
+    @property
+    def embedding_dim(self) -> int:
+        """Size of the raw embeddings queries are given in"""
+        return int(self.components.shape[1] if self.components is not None else self.vectors.shape[1])
+
+    def project(self, embeddings: np.ndarray) -> np.ndarray:
+        """Raw pooled embeddings -> normalised query vectors in index space"""
+        queries = l2_normalize(np.asarray(embeddings, dtype=np.float32))
+        if self.components is not None:
+            queries = l2_normalize((queries - self.mean) @ self.components.T)
+        return queries.astype(np.float32)
+
+    def search(self, embeddings: np.ndarray, k: int):
+        """
+        Top-k cosine neighbours for a batch of raw embeddings
+
+        Returns:
+            tuple: (indices (n, k), similarities (n, k)), best first
+        """
+        start = time.perf_counter()
+        queries = self.project(embeddings)
+        n, rows = len(queries), len(self.vectors)
+        k = min(k, rows)
+
+        # float16 has no BLAS path; convert one block at a time and matmul in float32
+        scores = np.empty((n, rows), dtype=np.float32)
+        block = np.empty((min(SEARCH_BLOCK_ROWS, rows), self.vectors.shape[1]), dtype=np.float32)
+        for lo in range(0, rows, SEARCH_BLOCK_ROWS):
+            hi = min(lo + SEARCH_BLOCK_ROWS, rows)
+            np.copyto(block[:hi - lo], self.vectors[lo:hi])
+            np.matmul(queries, block[:hi - lo].T, out=scores[:, lo:hi])
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        indices = np.take_along_axis(top, order, axis=1)
+        similarities = np.take_along_axis(top_scores, order, axis=1)
+
+        self.queries += n
+        self.search_seconds += time.perf_counter() - start
+        return indices, similarities
+
+    def cases(self, embeddings: np.ndarray, k: int) -> List[List[dict]]:
+        """search() shaped for the API: one list of labelled neighbours per query"""
+        indices, similarities = self.search(embeddings, k)
+        return [
+            [
+                {
+                    "class": self.class_names[int(self.labels[i])],
+                    "image": self.images[i],
+                    "similarity": round(min(float(s), 1.0), 4)
+                }
+                for i, s in zip(row_indices, row_scores)
+            ]
+            for row_indices, row_scores in zip(indices, similarities)
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "vectors": len(self.vectors),
+            "dim": int(self.vectors.shape[1]),
+            "bytes": int(self.vectors.nbytes),
+            "queries": self.queries,
+            "avg_query_ms": round(self.search_seconds * 1000 / self.queries, 3) if self.queries else 0.0
+        }
+
+
+def load_index(prefix: str = INDEX_PREFIX, model_path: str = MODEL_PATH) -> Optional[SimilarityIndex]:
+    """Load the index if it exists and was built from the current model file, else None"""
+    paths = index_paths(prefix)
+    if not os.path.exists(paths["meta"]):
+        print(f"⚠️ Similar-case index not found ({paths['meta']}); run similarity.py to build it")
+        return None
+    with open(paths["meta"], "r") as f:
+        built_from = json.load(f)["model"]
+    if built_from != model_identity(model_path):
+        print("⚠️ Similar-case index was built from a different model file; rebuild it with similarity.py")
+        return None
+    index = SimilarityIndex.load(prefix)
+    print(f"✅ Similar-case index loaded: {len(index.vectors)} x {index.vectors.shape[1]} float16")
+    return index
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def extract_train_embeddings(model_path: str, batch_size: int, workers: int):
+    """Pooled embeddings of every train image through the serving preprocessing path"""
+    from concurrent.futures import ThreadPoolExecutor
+    from PIL import Image
+
+    from embeddings import load_feature_model
+    from plantvillage import list_split
+    from preprocessing import prepare_image
+
+    feature_model = load_feature_model(model_path)
+    samples = list_split("train")
+
+    def load(path):
+        return prepare_image(Image.open(path)).classifier_pixels
+
+    features = np.empty((len(samples), feature_model.output_shape[-1]), dtype=np.float32)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for lo in range(0, len(samples), batch_size):
+            batch = np.stack(list(pool.map(load, [path for path, _ in samples[lo:lo + batch_size]])))
+            features[lo:lo + len(batch)] = feature_model.predict_on_batch(batch)
+    return samples, features
+
+
+def fit_projection(vectors: np.ndarray, dim: int):
+    """PCA (eigendecomposition of the covariance) down to `dim` components"""
+    mean = vectors.mean(axis=0)
+    centred = vectors - mean
+    eigenvalues, eigenvectors = np.linalg.eigh(centred.T @ centred / len(vectors))
+    order = np.argsort(eigenvalues)[::-1][:dim]
+    explained = float(eigenvalues[order].sum() / eigenvalues.sum())
+    return mean.astype(np.float32), eigenvectors[:, order].T.astype(np.float32), explained
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the similar-case index over train embeddings")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--prefix", default=INDEX_PREFIX)
+    parser.add_argument("--dim", type=int, default=128, help="PCA dimensions (0 keeps the raw embedding)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--eval-queries", type=int, default=500)
+    parser.add_argument("--output", default=None, help="Write the build report as JSON to this path")
+    args = parser.parse_args()
+
+    from numpy.lib.format import open_memmap
+    from plantvillage import load_class_indices
+
+    print("\n" + "="*80)
+    print(" "*25 + "SIMILAR-CASE INDEX BUILD")
+    print("="*80)
+
+    start = time.perf_counter()
+    samples, raw = extract_train_embeddings(args.model, args.batch_size, args.workers)
+    extract_seconds = time.perf_counter() - start
+    print(f"✅ Embedded {len(samples)} train images in {extract_seconds:.1f}s")
+
+    normalized = l2_normalize(raw)
+    paths = index_paths(args.prefix)
+    report = {"vectors": len(samples), "raw_dim": int(raw.shape[1]), "extract_seconds": extract_seconds}
+
+    if args.dim and args.dim < raw.shape[1]:
+        mean, components, explained = fit_projection(normalized, args.dim)
+        vectors = l2_normalize((normalized - mean) @ components.T)
+        np.savez(paths["projection"], mean=mean, components=components)
+        report["pca_explained_variance"] = explained
+    else:
+        vectors = normalized
+        if os.path.exists(paths["projection"]):
+            os.remove(paths["projection"])
+
+    stored = open_memmap(paths["vectors"], mode="w+", dtype=np.float16, shape=vectors.shape)
+    stored[:] = vectors
+    stored.flush()
+    del stored
+
+    class_indices = load_class_indices()
+    class_names = [name for name, _ in sorted(class_indices.items(), key=lambda item: item[1])]
+    with open(paths["meta"], "w") as f:
+        json.dump({
+            "model": model_identity(args.model),
+            "dim": int(vectors.shape[1]),
+            "class_names": class_names,
+            "labels": [class_indices[class_name] for _, class_name in samples],
+            "images": [os.path.relpath(path, PROJECT_ROOT) for path, _ in samples]
+        }, f)
+
+    # Quality: recall of the stored index against exact float32 search on raw embeddings
+    index = SimilarityIndex.load(args.prefix)
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(len(samples), size=min(args.eval_queries, len(samples)), replace=False)
+    exact_scores = normalized[query_rows] @ normalized.T
+    exact_scores[np.arange(len(query_rows)), query_rows] = -np.inf
+    exact = np.argsort(-exact_scores, axis=1)[:, :args.k]
+    found, _ = index.search(raw[query_rows], args.k + 1)
+    report["recall_at_k"] = float(np.mean([
+        len(set(e) & set([i for i in f if i != q][:args.k])) / args.k
+        for q, e, f in zip(query_rows, exact, found)
+    ]))
+
+    # Query cost at the API's batch sizes
+    for batch in (1, 16):
+        timings = []
+        for lo in range(0, min(len(query_rows), 50 * batch), batch):
+            t0 = time.perf_counter()
+            index.search(raw[query_rows[lo:lo + batch]], args.k)
+            timings.append((time.perf_counter() - t0) * 1000)
+        report[f"batch{batch}_p50_ms"] = float(np.percentile(timings, 50))
+        report[f"batch{batch}_p95_ms"] = float(np.percentile(timings, 95))
+
+    report["index_bytes"] = os.path.getsize(paths["vectors"])
+    report["dim"] = int(vectors.shape[1])
+
+    print(f"Vectors:        {report['vectors']} x {report['dim']} float16 ({report['index_bytes'] / 1e6:.1f} MB)")
+    if "pca_explained_variance" in report:
+        print(f"PCA variance:   {report['pca_explained_variance']:.4f}")
+    print(f"Recall@{args.k}:       {report['recall_at_k']:.4f} (vs exact float32 on raw embeddings)")
+    print(f"Query (1):      p50 {report['batch1_p50_ms']:.2f} ms, p95 {report['batch1_p95_ms']:.2f} ms")
+    print(f"Query (16):     p50 {report['batch16_p50_ms']:.2f} ms, p95 {report['batch16_p95_ms']:.2f} ms")
+    print("="*80 + "\n")
+    print(f"✅ Index saved: {paths['vectors']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+AgriShield - Subsystem Loading
+Deferred model loading with explicit warm-up, so the API can start serving
+(and report readiness) before TensorFlow and the sklearn pickles are loaded
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# "eager" loads each router's models when its module is imported (the
+# original behaviour); "background" starts loading everything in a thread
+# when the app starts; "lazy" loads each subsystem on its first request
+STARTUP_MODE = os.getenv("AGRISHIELD_STARTUP", "eager")
+if STARTUP_MODE not in ("eager", "background", "lazy"):
+    raise ValueError(f"Unknown AGRISHIELD_STARTUP: {STARTUP_MODE}")
+
+# Run one throwaway inference per model after loading, so graph tracing and
+# first-call allocations are not paid by the first real request
+WARMUP = os.getenv("AGRISHIELD_WARMUP", "on") == "on"
+
+# A failed load is retried by the first get() this many seconds after it
+# failed; requests in between fail fast with the recorded error
+LOAD_RETRY_SECONDS = float(os.getenv("AGRISHIELD_LOAD_RETRY_SECONDS", "30"))
+
+
+class Subsystem:
+    """
+    A group of models that load together, at most once, from any thread
+
+    Args:
+        name (str): Shown in /api/ready
+        loader (callable): Loads the models (typically into module globals)
+        warmup (callable): Optional dummy inference run right after loading
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any], warmup: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.state = "pending"
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.warmup_error = None
+        self.failed_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Load on first use; concurrent callers wait for the same load"""
+        # Models are usable during warm-up, which itself goes through get()
+        if self.state in ("ready", "warming"):
+            return
+        with self._lock:
+            if self.state in ("ready", "warming"):
+                return
+            if self.state == "failed" and time.monotonic() - self.failed_at < LOAD_RETRY_SECONDS:
+                raise RuntimeError(f"{self.name} failed to load: {self.error}")
+
+            self.state = "loading"
+            try:
+                start = time.perf_counter()
+                self.loader()
+                self.load_seconds = time.perf_counter() - start
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                self.failed_at = time.monotonic()
+                raise
+            self.error = None
+
+            if WARMUP and self.warmup is not None:
+                # The models are loaded; a failed warm-up only means the first
+                # requests pay the first-call costs
+                self.state = "warming"
+                start = time.perf_counter()
+                try:
+                    self.warmup()
+                    self.warmup_seconds = time.perf_counter() - start
+                except Exception as e:
+                    self.warmup_error = str(e)
+                    print(f"⚠️ {self.name} warm-up failed, serving without it: {e}")
+
+            self.state = "ready"
+            warmup = f", warm-up {self.warmup_seconds:.2f}s" if self.warmup_seconds is not None else ""
+            print(f"✅ {self.name} loaded in {self.load_seconds:.2f}s{warmup}")
+
+    async def get_async(self):
+        """get() for async endpoints: a first-use load runs off the event loop"""
+        if self.state not in ("ready", "warming"):
+            await asyncio.to_thread(self.get)
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_error": self.warmup_error,
+            "error": self.error
+        }
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+SUBSYSTEMS: Dict[str, Subsystem] = {}
+
+
+def load_quietly(subsystem: Subsystem):
+    """Load a subsystem; a failure is recorded for /api/ready instead of raised"""
+    try:
+        subsystem.get()
+    except Exception as e:
+        print(f"❌ {subsystem.name} failed to load: {e}")
+
+
+def register(subsystem: Subsystem) -> Subsystem:
+    """Track a subsystem for readiness; in eager mode load it right away"""
+    SUBSYSTEMS[subsystem.name] = subsystem
+    if STARTUP_MODE == "eager":
+        load_quietly(subsystem)
+    return subsystem
+
+
+def load_all():
+    """Load every pending subsystem, one after another"""
+    for subsystem in list(SUBSYSTEMS.values()):
+        load_quietly(subsystem)
+
+
+def start_background_loading() -> Optional[threading.Thread]:
+    """Called from the app's startup event; only does work in background mode"""
+    if STARTUP_MODE != "background":
+        return None
+    thread = threading.Thread(target=load_all, name="subsystem-loader", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness() -> dict:
+    """
+    Ready when every subsystem has loaded; in lazy mode subsystems that have
+    not been needed yet do not hold readiness back, but a failed one does
+    """
+    states = {name: s.status() for name, s in SUBSYSTEMS.items()}
+    if STARTUP_MODE == "lazy":
+        ready = all(s["state"] != "failed" for s in states.values())
+    else:
+        ready = all(s["state"] == "ready" for s in states.values())
+    return {"ready": ready, "mode": STARTUP_MODE, "warmup": WARMUP, "subsystems": states}
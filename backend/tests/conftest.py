@@ -0,0 +1,37 @@
+"""
+AgriShield - Test Setup
+The backend modules import each other by bare name, so backend/ goes on the
+path. Models load lazily (on first use) and the model watcher stays off.
+
+Usage (from backend/):
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("AGRISHIELD_STARTUP", "lazy")
+os.environ.setdefault("AGRISHIELD_MODEL_WATCH_SECONDS", "0")
+
+
+def models_installed(name: str) -> bool:
+    """A bundle is installed for `name`, or all of its loose files are in models/"""
+    from model_bundle import LOOSE_FILES, MODELS_DIR, pointer_path
+    if os.path.exists(pointer_path(name)):
+        return True
+    return all(os.path.exists(os.path.join(MODELS_DIR, f)) for f in LOOSE_FILES[name].values())
+
+
+@pytest.fixture(scope="session")
+def predict():
+    """The predict module with the risk models loaded (skips without them)"""
+    if not models_installed("risk"):
+        pytest.skip("risk model files are not in models/")
+    import predict
+    predict.risk_models.get()
+    return predict
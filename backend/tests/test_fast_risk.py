@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from fast_risk import CompiledRiskModel, compile_risk_model
+
+N_FEATURES = 11
+
+
+def fit_forest(n_classes: int = 2):
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(600, N_FEATURES)) * [1, 3, 0.5, 10, 2, 1, 0.2, 4, 1, 5, 1]
+    score = features[:, 1] - 0.3 * features[:, 3] + rng.normal(size=len(features))
+    labels = np.digitize(score, np.quantile(score, np.linspace(0, 1, n_classes + 1)[1:-1]))
+
+    scaler = StandardScaler().fit(features)
+    model = RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0)
+    model.fit(scaler.transform(features), labels)
+    crop_encoder = LabelEncoder().fit(["Rice", "Wheat", "Cotton"])
+    state_encoder = LabelEncoder().fit(["Punjab", "Kerala"])
+    return model, scaler, crop_encoder, state_encoder, features
+
+
+@pytest.fixture(scope="module")
+def forest():
+    return fit_forest()
+
+
+def probe_rows(features, n=300):
+    rng = np.random.default_rng(1)
+    return features.mean(axis=0) + rng.standard_normal((n, N_FEATURES)) * features.std(axis=0) * 2
+
+
+def test_compiled_scores_match_sklearn_bit_for_bit(forest):
+    model, scaler, crop_encoder, state_encoder, features = forest
+    compiled = compile_risk_model(model, scaler, crop_encoder, state_encoder)
+    assert isinstance(compiled, CompiledRiskModel)
+
+    rows = probe_rows(features)
+    expected = model.predict_proba(scaler.transform(rows))[:, 1]
+    actual = np.array([compiled.failure_probability(row) for row in rows])
+    assert np.array_equal(expected, actual)
+
+
+def test_arrays_round_trip(forest):
+    model, scaler, crop_encoder, state_encoder, features = forest
+    compiled = compile_risk_model(model, scaler, crop_encoder, state_encoder)
+    arrays, meta = compiled.to_arrays()
+    restored = CompiledRiskModel.from_arrays(arrays, meta, crop_encoder, state_encoder)
+
+    rows = probe_rows(features, 50)
+    assert [restored.failure_probability(r) for r in rows] == [compiled.failure_probability(r) for r in rows]
+    assert restored.crop_codes == compiled.crop_codes
+
+
+def test_path_contributions_add_up_to_the_probability(forest):
+    model, scaler, crop_encoder, state_encoder, features = forest
+    compiled = compile_risk_model(model, scaler, crop_encoder, state_encoder)
+
+    rows = probe_rows(features)
+    base, contributions = compiled.path_contributions(rows)
+    assert contributions.shape == rows.shape
+    expected = model.predict_proba(scaler.transform(rows))[:, 1]
+    np.testing.assert_allclose(base + contributions.sum(axis=1), expected, rtol=0, atol=1e-12)
+
+
+def test_only_binary_forests_are_compiled():
+    model, scaler, crop_encoder, state_encoder, _ = fit_forest(n_classes=3)
+    assert compile_risk_model(model, scaler, crop_encoder, state_encoder) is None
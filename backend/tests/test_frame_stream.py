@@ -0,0 +1,57 @@
+import io
+
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from frame_stream import FrameScanSession
+
+FAILING_COLOUR = (255, 0, 0)
+
+
+def frame(colour) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), colour).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def diagnose(image):
+    if image.getpixel((0, 0)) == FAILING_COLOUR:
+        raise RuntimeError("disease failed to load")
+    return {"disease": "Tomato___healthy", "confidence": "90.00%"}
+
+
+def make_client():
+    app = FastAPI()
+
+    @app.websocket("/stream")
+    async def stream(websocket: WebSocket):
+        await websocket.accept()
+        session = FrameScanSession(websocket, decode=lambda data: Image.open(io.BytesIO(data)).convert("RGB"),
+                                   diagnose=diagnose, queue_frames=8, batch_frames=4, dedup_bits=-1,
+                                   max_frame_bytes=1024 * 1024)
+        await session.run()
+
+    return TestClient(app)
+
+
+def test_diagnosis_failures_are_reported_per_frame():
+    with make_client().websocket_connect("/stream") as websocket:
+        websocket.send_bytes(frame(FAILING_COLOUR))
+        websocket.send_bytes(frame((40, 160, 40)))
+        websocket.send_bytes(b"not an image")
+        websocket.send_text("end")
+
+        messages = []
+        while not messages or messages[-1]["type"] != "summary":
+            messages.append(websocket.receive_json())
+
+    by_frame = {m["frame"]: m for m in messages if "frame" in m}
+    assert by_frame[0]["type"] == "error" and "failed to load" in by_frame[0]["error"]
+    assert by_frame[1]["type"] == "diagnosis" and by_frame[1]["disease"] == "Tomato___healthy"
+    assert by_frame[2]["type"] == "error"
+
+    summary = messages[-1]
+    assert summary["diagnosis"] == "Tomato___healthy"
+    assert summary["stats"]["analysed"] == 1
+    assert summary["stats"]["errors"] == 2
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import model_bundle
+from model_bundle import BundleError, activate_version, open_bundle, write_bundle
+
+NAME = "test-bundle"
+
+
+@pytest.fixture(autouse=True)
+def bundles_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_bundle, "BUNDLES_DIR", str(tmp_path))
+    return tmp_path
+
+
+def write(version="v1", activate=True):
+    entries = {
+        "weights": ("npy", np.arange(1000, dtype=np.float64)),
+        "config": ("json", {"threshold": 0.5}),
+        "encoder": ("joblib", {"Rice": 0, "Wheat": 1})
+    }
+    return write_bundle(NAME, version, entries, activate=activate)
+
+
+def corrupt(bundle, entry, append=False):
+    path = bundle.path(entry)
+    with open(path, "r+b") as f:
+        if append:
+            f.seek(0, 2)
+            f.write(b"x")
+        else:
+            # Same size, different content
+            f.seek(-1, 2)
+            last = f.read(1)
+            f.seek(-1, 2)
+            f.write(bytes([last[0] ^ 0xFF]))
+
+
+def test_entries_round_trip():
+    write()
+    bundle = open_bundle(NAME)
+    assert bundle.version == "v1"
+    weights = bundle.load("weights")
+    assert np.array_equal(weights, np.arange(1000, dtype=np.float64))
+    assert not weights.flags.writeable
+    assert bundle.load("config") == {"threshold": 0.5}
+    assert bundle.load("encoder") == {"Rice": 0, "Wheat": 1}
+
+
+def test_checksum_failure_is_refused():
+    corrupt(write(), "weights")
+    with pytest.raises(BundleError, match="fails its checksum"):
+        open_bundle(NAME).load("weights")
+
+
+def test_size_mismatch_is_refused():
+    corrupt(write(), "config", append=True)
+    with pytest.raises(BundleError, match="wrong size"):
+        open_bundle(NAME).load("config")
+
+
+def test_current_pointer_switches_versions():
+    write("v1")
+    write("v2", activate=False)
+    assert open_bundle(NAME).version == "v1"
+    activate_version(NAME, "v2")
+    assert open_bundle(NAME).version == "v2"
+    with pytest.raises(BundleError):
+        write("v2")
@@ -0,0 +1,42 @@
+import pytest
+
+import model_bundle
+import model_registry
+from model_bundle import open_bundle, write_bundle
+from model_registry import ModelSlot, call_with_models
+from subsystems import Subsystem
+
+NAME = "test-slot"
+
+
+@pytest.fixture
+def slot(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_bundle, "BUNDLES_DIR", str(tmp_path))
+    write_bundle(NAME, "v1", {"label": ("json", "one")})
+    write_bundle(NAME, "v2", {"label": ("json", "two")}, activate=False)
+
+    served = {}
+
+    def install(models):
+        served["models"] = models
+
+    subsystem = Subsystem(NAME, lambda: install(read(open_bundle(NAME))))
+
+    def read(bundle):
+        return {"bundle": bundle, "label": bundle.load("label")}
+
+    slot = ModelSlot(NAME, subsystem, read=read, install=install,
+                     current_bundle=lambda: served["models"]["bundle"])
+    monkeypatch.setitem(model_registry.SLOTS, NAME, slot)
+    return served
+
+
+def test_worker_catches_up_with_the_served_version(slot):
+    label = lambda: slot["models"]["label"]
+    assert call_with_models({NAME: ("v1", None)}, label) == "one"
+    assert call_with_models({NAME: ("v2", None)}, label) == "two"
+    assert call_with_models({NAME: ("v2", None)}, label) == "two"
+
+
+def test_slots_this_process_does_not_have_are_ignored(slot):
+    assert call_with_models({"not-imported": ("v9", None)}, lambda: "done") == "done"
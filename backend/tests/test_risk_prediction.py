@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+
+def scenarios(predict, n=200):
+    rng = random.Random(0)
+    return [dict(crop=rng.choice(predict.crop_list), state=rng.choice(predict.state_list),
+                 district=rng.choice(predict.district_list), season=rng.choice(["Kharif", "Rabi", "Summer"]),
+                 temperature=rng.uniform(-10, 50), rainfall=rng.uniform(0, 3000), humidity=rng.uniform(0, 100),
+                 disaster_occurred=rng.choice([0, 1])) for _ in range(n)]
+
+
+@pytest.fixture
+def fresh_cache(predict):
+    predict.risk_cache.clear()
+    yield predict.risk_cache
+    predict.risk_cache.clear()
+
+
+@pytest.mark.parametrize("cache_mode", ["off", "on"])
+def test_single_and_batch_scores_agree(predict, fresh_cache, monkeypatch, cache_mode):
+    monkeypatch.setattr(predict, "RISK_CACHE", cache_mode)
+    rows = scenarios(predict)
+    batch = predict.predict_crop_failure_batch(rows)
+
+    for row, (_, scored) in zip(rows, batch.iterrows()):
+        single = predict.predict_crop_failure(**row)
+        if "error" in single:
+            assert scored["error"] == single["error"]
+            continue
+        assert scored["error"] is None
+        assert (single["risk_score"], single["risk_level"], single["district_info"]["soil_type"]) == \
+            (scored["risk_score"], scored["risk_level"], scored["soil_type"])
+
+
+def test_inputs_in_one_bucket_share_an_entry(predict, fresh_cache, monkeypatch):
+    monkeypatch.setattr(predict, "RISK_CACHE", "on")
+    row = scenarios(predict, 1)[0]
+    step = predict.CACHE_STEPS["temperature"]
+    if step <= 0:
+        pytest.skip("temperature is not quantized")
+    base = round(row["temperature"] / step) * step
+
+    first = predict.predict_crop_failure(**dict(row, temperature=base))
+    hits = fresh_cache.stats()["hits"]
+    second = predict.predict_crop_failure(**dict(row, temperature=base + step / 4))
+    assert second is first
+    assert fresh_cache.stats()["hits"] == hits + 1
+
+
+def test_new_generation_misses_the_cache(predict, fresh_cache, monkeypatch):
+    monkeypatch.setattr(predict, "RISK_CACHE", "on")
+    row = scenarios(predict, 1)[0]
+    first = predict.predict_crop_failure(**row)
+    assert predict.predict_crop_failure(**row) is first
+
+    generation = predict.active.generation
+    predict.install(predict.active)
+    assert predict.active.generation == generation + 1
+    assert predict.predict_crop_failure(**row) is not first
+
+
+def test_swap_clears_the_cache(predict, fresh_cache, monkeypatch):
+    monkeypatch.setattr(predict, "RISK_CACHE", "on")
+    predict.predict_crop_failure(**scenarios(predict, 1)[0])
+    assert fresh_cache.stats()["entries"] == 1
+
+    invalidations = fresh_cache.stats()["invalidations"]
+
+    slot = predict.risk_slot
+    slot.candidate, slot.candidate_fingerprint = predict.active, predict.active.bundle.fingerprint
+    assert slot.promote()
+    assert fresh_cache.stats()["entries"] == 0
+    assert fresh_cache.stats()["invalidations"] == invalidations + 1
+
+
+def test_scalar_and_array_scores_round_the_same(predict):
+    # 0.025 points: Python's round() gives 0.03 here, np.round 0.02
+    probabilities = [0.00025, 0.0123456, 0.5, 0.99995]
+    assert [predict.risk_points(p) for p in probabilities] == predict.risk_points(probabilities).tolist()
+
+
+def test_single_and_batch_explanations_agree(predict, fresh_cache):
+    if predict.active.explainer is None:
+        pytest.skip("risk model has no path explainer")
+    rows = scenarios(predict, n=50)
+    batch = predict.predict_crop_failure_batch(rows, explain=True)
+
+    for row, (_, scored) in zip(rows, batch.iterrows()):
+        single = predict.predict_crop_failure(**row)
+        if "error" in single:
+            continue
+        assert single["base_risk"] == scored["base_risk"]
+        for item in single["path_contributions"]:
+            assert item["contribution"] == scored[f"path_contribution_{item['feature']}"]
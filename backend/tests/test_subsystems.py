@@ -0,0 +1,46 @@
+import pytest
+
+import subsystems
+from subsystems import Subsystem
+
+
+def failing(message):
+    def run():
+        raise OSError(message)
+    return run
+
+
+def test_failed_warm_up_still_serves(monkeypatch):
+    monkeypatch.setattr(subsystems, "WARMUP", True)
+    loads = []
+    subsystem = Subsystem("test", lambda: loads.append(1), failing("no network"))
+
+    subsystem.get()
+    assert subsystem.state == "ready"
+    assert subsystem.status()["warmup_error"] == "no network"
+    subsystem.get()
+    assert loads == [1]
+
+
+def test_failed_load_is_retried_after_the_backoff(monkeypatch):
+    monkeypatch.setattr(subsystems, "LOAD_RETRY_SECONDS", 60)
+    attempts = []
+
+    def loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("disk not mounted")
+
+    subsystem = Subsystem("test", loader)
+    with pytest.raises(OSError):
+        subsystem.get()
+    # Within the backoff the recorded error is raised without reloading
+    with pytest.raises(RuntimeError, match="disk not mounted"):
+        subsystem.get()
+    assert len(attempts) == 1
+
+    monkeypatch.setattr(subsystems, "LOAD_RETRY_SECONDS", 0)
+    subsystem.get()
+    assert subsystem.state == "ready"
+    assert subsystem.status()["error"] is None
+    assert len(attempts) == 2
@@ -0,0 +1,82 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.formparsers import MultiPartParser
+
+import uploads
+from uploads import RequestSizeLimitMiddleware, SpooledMultiPartParser, form_upload, read_upload_form
+
+MAX_BYTES = 1024
+
+
+def make_client():
+    app = FastAPI()
+    calls = []
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        calls.append(1)
+        return {"bytes": len(await request.body())}
+
+    app.add_middleware(RequestSizeLimitMiddleware, max_bytes=MAX_BYTES)
+    return TestClient(app), calls
+
+
+def test_body_under_the_cap_passes():
+    client, _ = make_client()
+    response = client.post("/echo", content=b"x" * MAX_BYTES)
+    assert response.status_code == 200
+    assert response.json() == {"bytes": MAX_BYTES}
+
+
+def test_declared_length_over_the_cap_is_refused_before_reading():
+    client, calls = make_client()
+    before = uploads.upload_metrics.rejected["request_bytes"]
+    response = client.post("/echo", content=b"x" * (MAX_BYTES + 1))
+    assert response.status_code == 413
+    assert "larger than" in response.json()["detail"]
+    assert calls == []
+    assert uploads.upload_metrics.rejected["request_bytes"] == before + 1
+
+
+def test_chunked_body_over_the_cap_is_cut_off():
+    client, _ = make_client()
+
+    def chunks():
+        for _ in range(8):
+            yield b"x" * 512
+
+    response = client.post("/echo", content=chunks())
+    assert response.status_code == 413
+    assert "larger than" in response.json()["detail"]
+
+
+def make_upload_client():
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        form = await read_upload_form(request)
+        try:
+            return {"rolled": form_upload(form, "file").file._rolled}
+        finally:
+            await form.close()
+
+    return TestClient(app)
+
+
+def test_uploads_spool_without_changing_starlettes_parser(monkeypatch):
+    monkeypatch.setattr(SpooledMultiPartParser, "spool_max_size", 16)
+    client = make_upload_client()
+
+    assert client.post("/upload", files={"file": ("a.bin", b"y" * 100)}).json() == {"rolled": True}
+    assert client.post("/upload", files={"file": ("a.bin", b"y" * 8)}).json() == {"rolled": False}
+    assert MultiPartParser.spool_max_size == 1024 * 1024
+
+
+def test_non_multipart_or_missing_field_is_a_400():
+    client = make_upload_client()
+
+    assert client.post("/upload", content=b"abc", headers={"content-type": "text/plain"}).status_code == 400
+    response = client.post("/upload", files={"other": ("a.bin", b"y")})
+    assert response.status_code == 400
+    assert "'file'" in response.json()["detail"]
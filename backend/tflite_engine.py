@@ -0,0 +1,177 @@
+"""
+AgriShield - TFLite Inference Engine
+Post-training quantized (float16 / int8) versions of the disease graph, served
+through tf.lite.Interpreter as a drop-in for keras Model.predict
+
+Usage (from backend/):
+    python tflite_engine.py --mode int8 --graph fused [--calibration-per-class 20]
+"""
+
+import argparse
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+import tensorflow as tf
+
+from plantvillage import list_split
+from preprocessing import prepare_image
+
+ENGINES = ("keras", "tflite-fp16", "tflite-int8")
+QUANT_MODES = ("fp16", "int8")
+
+# Images per class sampled from the train split to calibrate int8 ranges
+CALIBRATION_PER_CLASS = int(os.getenv("AGRISHIELD_TFLITE_CALIBRATION_PER_CLASS", "20"))
+
+
+# ============================================================================
+# CONVERSION
+# ============================================================================
+
+def calibration_dataset(per_class: int = CALIBRATION_PER_CLASS):
+    """Representative inputs for int8 calibration, drawn from the train split"""
+    from PIL import Image
+
+    samples = list_split("train", limit_per_class=per_class)
+
+    def generator():
+        for path, _ in samples:
+            pixels = prepare_image(Image.open(path)).classifier_pixels
+            yield [np.expand_dims(pixels, axis=0)]
+
+    return generator
+
+
+def convert_model(
+    keras_model: tf.keras.Model,
+    mode: str,
+    calibration_per_class: int = CALIBRATION_PER_CLASS
+) -> bytes:
+    """
+    Convert a Keras model with post-training quantization
+
+    fp16 stores weights as float16; int8 quantizes weights and activations
+    using ranges calibrated on the train split. Inputs and outputs stay
+    float32 so callers feed the same tensors as for the Keras model.
+    """
+    if mode not in QUANT_MODES:
+        raise ValueError(f"Unknown quantization mode: {mode}")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "fp16":
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        converter.representative_dataset = calibration_dataset(calibration_per_class)
+    return converter.convert()
+
+
+def tflite_path(keras_path: str, graph: str, mode: str) -> str:
+    """Converted file lives next to the Keras model, e.g. best_cpu_model.fused.int8.tflite"""
+    base, _ = os.path.splitext(keras_path)
+    return f"{base}.{graph}.{mode}.tflite"
+
+
+def is_stale(path: str, keras_path: str) -> bool:
+    """True if the converted file is missing or older than the Keras model"""
+    return not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(keras_path)
+
+
+def load_or_convert(
+    keras_model: tf.keras.Model,
+    keras_path: str,
+    graph: str,
+    mode: str,
+    output_dims: Optional[List[int]] = None
+) -> "TFLiteModel":
+    """Reuse a converted file if it is newer than the Keras model, otherwise convert and save it"""
+    path = tflite_path(keras_path, graph, mode)
+    if is_stale(path, keras_path):
+        print(f"⚙️  Converting {graph} graph to TFLite ({mode})...")
+        with open(path, "wb") as f:
+            f.write(convert_model(keras_model, mode))
+        print(f"✅ Saved: {path}")
+    return TFLiteModel(path, output_dims=output_dims)
+
+
+# ============================================================================
+# INTERPRETER WRAPPER
+# ============================================================================
+
+class TFLiteModel:
+    """
+    Minimal stand-in for keras Model.predict on top of tf.lite.Interpreter
+
+    Args:
+        path (str): .tflite file
+        output_dims (list): Expected last dimension of each output, in the
+            order the Keras model returns them. TFLite does not preserve output
+            order, so outputs are matched by size.
+        num_threads (int): Interpreter threads (default: TF's choice)
+    """
+
+    def __init__(self, path: str, output_dims: Optional[List[int]] = None, num_threads: Optional[int] = None):
+        self.path = path
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+
+        outputs = self.interpreter.get_output_details()
+        if output_dims is None:
+            self._outputs = outputs
+        else:
+            by_dim = {int(o["shape"][-1]): o for o in outputs}
+            self._outputs = [by_dim[dim] for dim in output_dims]
+
+        self._batch_size = int(self._input["shape"][0])
+        # Interpreters are not thread-safe; the inference pool may call in parallel
+        self._lock = threading.Lock()
+
+    def predict(self, batch: np.ndarray, verbose=0):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+
+            self.interpreter.set_tensor(self._input["index"], batch)
+            self.interpreter.invoke()
+            results = [self.interpreter.get_tensor(o["index"]).copy() for o in self._outputs]
+
+        return results[0] if len(results) == 1 else results
+
+    def size_bytes(self) -> int:
+        return os.path.getsize(self.path)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the disease graph to a quantized TFLite model")
+    parser.add_argument("--mode", choices=QUANT_MODES, required=True)
+    parser.add_argument("--graph", choices=["fused", "fused-embedding", "classifier"], default="fused")
+    parser.add_argument("--calibration-per-class", type=int, default=CALIBRATION_PER_CLASS)
+    args = parser.parse_args()
+
+    from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2
+    from fused_model import build_fused_model
+    from model_bundle import open_bundle
+
+    keras_path = open_bundle("disease").path("model")
+    model = tf.keras.models.load_model(keras_path)
+    if args.graph != "classifier":
+        model = build_fused_model(model, MobileNetV2(weights="imagenet"),
+                                  include_embedding=args.graph == "fused-embedding")
+
+    path = tflite_path(keras_path, args.graph, args.mode)
+    with open(path, "wb") as f:
+        f.write(convert_model(model, args.mode, args.calibration_per_class))
+    print(f"✅ Saved: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+AgriShield - TFLite vs Keras Report
+Accuracy, latency and memory of the quantized disease classifiers against the
+Keras model on the PlantVillage test split
+
+Each engine runs in its own child process so peak RSS is comparable.
+
+Usage (from backend/):
+    python tflite_report.py [--limit-per-class N] [--batch-size 32] [--output tflite_report.json]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from plantvillage import list_split, load_class_indices
+from model_bundle import open_bundle
+from tflite_engine import ENGINES, QUANT_MODES, TFLiteModel, is_stale, tflite_path
+
+# The Keras model the server uses, so converted files land where it looks
+MODEL_PATH = open_bundle("disease").path("model")
+
+
+# ============================================================================
+# CHILD PROCESS (one engine)
+# ============================================================================
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_engine(engine: str, split: str, limit_per_class, batch_size: int, latency_samples: int):
+    import tensorflow as tf
+    from PIL import Image
+    from preprocessing import prepare_image
+
+    baseline_rss = max_rss_mb()
+    start = time.perf_counter()
+    if engine == "keras":
+        model = tf.keras.models.load_model(MODEL_PATH)
+        size_bytes = os.path.getsize(MODEL_PATH)
+    else:
+        # Converted by the driver beforehand, so the Keras model is never loaded here
+        path = tflite_path(MODEL_PATH, "classifier", engine.split("-", 1)[1])
+        model = TFLiteModel(path)
+        size_bytes = os.path.getsize(path)
+    load_seconds = time.perf_counter() - start
+
+    samples = list_split(split, limit_per_class=limit_per_class)
+    pixels = np.stack([prepare_image(Image.open(path)).classifier_pixels for path, _ in samples])
+
+    # Warm-up so tracing / tensor allocation is not timed
+    model.predict(pixels[:1], verbose=0)
+    model.predict(pixels[:batch_size], verbose=0)
+
+    # Single-image latency
+    single = []
+    for i in range(min(latency_samples, len(pixels))):
+        t0 = time.perf_counter()
+        model.predict(pixels[i:i + 1], verbose=0)
+        single.append((time.perf_counter() - t0) * 1000)
+
+    # Batched throughput over the whole split
+    preds = []
+    t0 = time.perf_counter()
+    for i in range(0, len(pixels), batch_size):
+        preds.append(np.argmax(model.predict(pixels[i:i + batch_size], verbose=0), axis=1))
+    batched_seconds = time.perf_counter() - t0
+
+    return {
+        "engine": engine,
+        "model_bytes": size_bytes,
+        "load_seconds": load_seconds,
+        "single_p50_ms": float(np.percentile(single, 50)),
+        "single_p95_ms": float(np.percentile(single, 95)),
+        "batched_images_per_sec": len(pixels) / batched_seconds,
+        "peak_rss_delta_mb": max_rss_mb() - baseline_rss,
+        "predictions": np.concatenate(preds).tolist()
+    }
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Keras and quantized TFLite disease classifiers")
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--limit-per-class", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency-samples", type=int, default=100)
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    parser.add_argument("--child", choices=ENGINES, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_engine(args.child, args.split, args.limit_per_class, args.batch_size, args.latency_samples)
+        print(json.dumps(result))
+        return
+
+    class_indices = load_class_indices()
+    samples = list_split(args.split, limit_per_class=args.limit_per_class)
+    labels = np.array([class_indices[class_name] for _, class_name in samples])
+
+    for mode in QUANT_MODES:
+        if is_stale(tflite_path(MODEL_PATH, "classifier", mode), MODEL_PATH):
+            print(f"⚙️  Converting classifier to TFLite ({mode})...")
+            subprocess.run([sys.executable, "tflite_engine.py", "--mode", mode, "--graph", "classifier"],
+                           check=True, capture_output=True)
+
+    results = []
+    for engine in ENGINES:
+        print(f"⏱️  Running {engine}...")
+        cmd = [sys.executable, __file__, "--child", engine, "--split", args.split,
+               "--batch-size", str(args.batch_size), "--latency-samples", str(args.latency_samples)]
+        if args.limit_per_class is not None:
+            cmd += ["--limit-per-class", str(args.limit_per_class)]
+        output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    keras_preds = np.array(results[0]["predictions"])
+    for result in results:
+        preds = np.array(result.pop("predictions"))
+        result["accuracy"] = float(np.mean(preds == labels))
+        result["agreement_with_keras"] = float(np.mean(preds == keras_preds))
+
+    print("\n" + "="*100)
+    print(" "*35 + "TFLITE vs KERAS REPORT")
+    print("="*100)
+    print(f"{'engine':12s} {'accuracy':>9s} {'agree':>7s} {'size MB':>8s} {'p50 ms':>8s} {'p95 ms':>8s} "
+          f"{'img/s':>8s} {'RSS +MB':>8s} {'load s':>7s}")
+    print("-"*100)
+    for r in results:
+        print(f"{r['engine']:12s} {r['accuracy']:9.4f} {r['agreement_with_keras']:7.4f} "
+              f"{r['model_bytes'] / 1e6:8.1f} {r['single_p50_ms']:8.2f} {r['single_p95_ms']:8.2f} "
+              f"{r['batched_images_per_sec']:8.1f} {r['peak_rss_delta_mb']:8.1f} {r['load_seconds']:7.2f}")
+    print("="*100 + "\n")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"split": args.split, "images": len(samples), "engines": results}, f, indent=2)
+        print(f"💾 Report saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
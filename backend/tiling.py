@@ -0,0 +1,73 @@
+"""
+AgriShield - Tiled Image Inference
+Splits a high-resolution field photo into overlapping tiles so that each
+leaf is seen by the 160x160 disease classifier at close to its own scale
+"""
+
+import math
+import os
+from typing import BinaryIO, List, NamedTuple, Tuple, Union
+
+from PIL import Image
+
+from preprocessing import open_image
+
+# The photo is decoded (JPEG DCT-drafted) and scaled so its long side is at
+# most TILE_WORK_SIDE, then cut into TILE_SIZE squares overlapping by
+# TILE_OVERLAP; 2048 / 512 / 0.25 gives at most a 5x5 grid
+TILE_WORK_SIDE = int(os.getenv("AGRISHIELD_TILE_WORK_SIDE", "2048"))
+TILE_SIZE = int(os.getenv("AGRISHIELD_TILE_SIZE", "512"))
+TILE_OVERLAP = float(os.getenv("AGRISHIELD_TILE_OVERLAP", "0.25"))
+if not 0 <= TILE_OVERLAP < 1:
+    raise ValueError(f"AGRISHIELD_TILE_OVERLAP must be in [0, 1): {TILE_OVERLAP}")
+
+
+class Tile(NamedTuple):
+    row: int
+    col: int
+    box: Tuple[int, int, int, int]  # (left, top, right, bottom) in the scaled image
+
+
+# ============================================================================
+# GEOMETRY
+# ============================================================================
+
+def tile_starts(length: int, tile: int, stride: int) -> List[int]:
+    """Evenly spaced starts covering [0, length); the last tile ends flush with the edge"""
+    if length <= tile:
+        return [0]
+    count = math.ceil((length - tile) / stride) + 1
+    step = (length - tile) / (count - 1)
+    return [round(i * step) for i in range(count)]
+
+
+def tile_grid(width: int, height: int, tile: int = TILE_SIZE, overlap: float = TILE_OVERLAP) -> List[Tile]:
+    """Row-major overlapping tiles; images smaller than a tile become one tile"""
+    stride = max(1, int(tile * (1 - overlap)))
+    tiles = []
+    for row, top in enumerate(tile_starts(height, tile, stride)):
+        for col, left in enumerate(tile_starts(width, tile, stride)):
+            tiles.append(Tile(row, col, (left, top, min(left + tile, width), min(top + tile, height))))
+    return tiles
+
+
+# ============================================================================
+# DECODE + CROP
+# ============================================================================
+
+def decode_for_tiling(data: Union[bytes, BinaryIO]) -> Image.Image:
+    """
+    Decode at tiling resolution instead of the 224x224 the whole-image path needs
+
+    JPEG draft still skips resolution beyond what the tiles use.
+    """
+    half = TILE_WORK_SIDE // 2
+    image = open_image(data, min_size=(half, half)).convert("RGB")
+    if max(image.size) > TILE_WORK_SIDE:
+        image.thumbnail((TILE_WORK_SIDE, TILE_WORK_SIDE), Image.BILINEAR)
+    return image
+
+
+def crop_tiles(image: Image.Image) -> Tuple[List[Tile], List[Image.Image]]:
+    tiles = tile_grid(*image.size)
+    return tiles, [image.crop(tile.box) for tile in tiles]
@@ -0,0 +1,375 @@
+"""
+AgriShield - Disease Model Training (tf.data)
+Trains the MobileNetV2 disease classifier from DiseaseDetection.ipynb on a
+tf.data pipeline instead of ImageDataGenerator.flow_from_directory
+
+Images are decoded and resized to 160x160 once, using the same resize path
+as the API (preprocessing.prepare_image), and written to sharded TFRecord
+files. Every epoch then reads raw uint8 tensors, caches them, augments with a
+parallel map and prefetches, so no JPEG is decoded after the first run.
+
+Usage (from backend/):
+    python train_disease.py [--epochs 25] [--batch-size 32] [--model-path best_cpu_model.keras]
+    python train_disease.py --benchmark-epochs 1 [--output epoch_times.json]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+from plantvillage import CLASS_INDICES_PATH, DATASET_DIR, list_split, load_class_indices
+from preprocessing import CLASSIFIER_SIZE, FILTER_SIZE, classifier_image
+
+IMG_SIZE = CLASSIFIER_SIZE
+BATCH_SIZE = 32
+EPOCHS = 25
+
+SHARD_DIR = os.path.join(os.path.dirname(DATASET_DIR), f"shards_{IMG_SIZE[0]}")
+IMAGES_PER_SHARD = 1024
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+# ============================================================================
+# ONE-TIME SHARD CACHE
+# ============================================================================
+
+def source_fingerprint(samples) -> dict:
+    """Cheap identity of a split: file count, total bytes and newest mtime"""
+    stats = [os.stat(path) for path, _ in samples]
+    return {
+        "files": len(stats),
+        "bytes": int(sum(s.st_size for s in stats)),
+        "newest_mtime_ns": int(max((s.st_mtime_ns for s in stats), default=0))
+    }
+
+
+def manifest_path(split: str) -> str:
+    return os.path.join(SHARD_DIR, f"{split}.manifest.json")
+
+
+def load_pixels(path: str) -> bytes:
+    """Decode and resize exactly as the API does (224x224 intermediate, then 160x160)"""
+    with Image.open(path) as image:
+        image.draft("RGB", FILTER_SIZE)
+        intermediate = image.convert("RGB").resize(FILTER_SIZE)
+    return classifier_image(intermediate).tobytes()
+
+
+def write_shard(shard_path: str, samples, class_indices: dict):
+    with tf.io.TFRecordWriter(shard_path) as writer:
+        for path, class_name in samples:
+            example = tf.train.Example(features=tf.train.Features(feature={
+                "pixels": tf.train.Feature(bytes_list=tf.train.BytesList(value=[load_pixels(path)])),
+                "label": tf.train.Feature(int64_list=tf.train.Int64List(value=[class_indices[class_name]]))
+            }))
+            writer.write(example.SerializeToString())
+
+
+def build_shards(split: str, workers: int = None, force: bool = False) -> list:
+    """
+    Write (or reuse) the 160x160 uint8 shards of one split
+
+    Returns:
+        list: Shard file paths
+    """
+    samples = list_split(split)
+    class_indices = load_class_indices()
+    fingerprint = source_fingerprint(samples)
+
+    if not force and os.path.exists(manifest_path(split)):
+        with open(manifest_path(split), "r") as f:
+            manifest = json.load(f)
+        if manifest["source"] == fingerprint and manifest["image_size"] == list(IMG_SIZE):
+            return [os.path.join(SHARD_DIR, name) for name in manifest["shards"]]
+
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    num_shards = max(1, -(-len(samples) // IMAGES_PER_SHARD))
+    names = [f"{split}-{i:03d}-of-{num_shards:03d}.tfrecord" for i in range(num_shards)]
+
+    # Interleave classes across shards so any subset of shards is class-balanced
+    print(f"⚙️  Writing {len(samples)} {split} images to {num_shards} shards...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [
+            pool.submit(write_shard, os.path.join(SHARD_DIR, name), samples[i::num_shards], class_indices)
+            for i, name in enumerate(names)
+        ]
+        for future in futures:
+            future.result()
+    print(f"✅ Shards written in {time.perf_counter() - start:.1f}s")
+
+    with open(manifest_path(split), "w") as f:
+        json.dump({"split": split, "image_size": list(IMG_SIZE), "images": len(samples),
+                   "source": fingerprint, "shards": names}, f, indent=2)
+
+    return [os.path.join(SHARD_DIR, name) for name in names]
+
+
+# ============================================================================
+# tf.data PIPELINE
+# ============================================================================
+
+FEATURES = {
+    "pixels": tf.io.FixedLenFeature([], tf.string),
+    "label": tf.io.FixedLenFeature([], tf.int64)
+}
+
+
+def parse_example(record, num_classes: int):
+    example = tf.io.parse_single_example(record, FEATURES)
+    pixels = tf.reshape(tf.io.decode_raw(example["pixels"], tf.uint8), (*IMG_SIZE, 3))
+    return pixels, tf.one_hot(example["label"], num_classes)
+
+
+ROTATION_DEGREES = 12
+SHIFT_FRACTION = 0.1
+ZOOM_RANGE = 0.1
+
+
+def augment_batch(images: tf.Tensor) -> tf.Tensor:
+    """
+    Random flip, rotation, shift and zoom with the notebook's ImageDataGenerator ranges
+
+    All four are folded into one affine matrix per image, so the batch is
+    resampled once (nearest fill) instead of once per augmentation layer.
+    """
+    n = tf.shape(images)[0]
+    height = tf.cast(tf.shape(images)[1], tf.float32)
+    width = tf.cast(tf.shape(images)[2], tf.float32)
+
+    angle = tf.random.uniform([n], -ROTATION_DEGREES, ROTATION_DEGREES) * (np.pi / 180)
+    zoom_x = tf.random.uniform([n], 1 - ZOOM_RANGE, 1 + ZOOM_RANGE)
+    zoom_y = tf.random.uniform([n], 1 - ZOOM_RANGE, 1 + ZOOM_RANGE)
+    shift_x = tf.random.uniform([n], -SHIFT_FRACTION, SHIFT_FRACTION) * width
+    shift_y = tf.random.uniform([n], -SHIFT_FRACTION, SHIFT_FRACTION) * height
+    flip = tf.where(tf.random.uniform([n]) < 0.5, -1.0, 1.0)
+
+    # Output pixel -> input pixel: centre + zoom * rotate * flip * (p - centre) + shift
+    cos, sin = tf.cos(angle), tf.sin(angle)
+    m00, m01 = zoom_x * cos * flip, -zoom_x * sin
+    m10, m11 = zoom_y * sin * flip, zoom_y * cos
+    cx, cy = (width - 1) / 2, (height - 1) / 2
+    zeros = tf.zeros([n])
+    transforms = tf.stack([
+        m00, m01, cx + shift_x - m00 * cx - m01 * cy,
+        m10, m11, cy + shift_y - m10 * cx - m11 * cy,
+        zeros, zeros
+    ], axis=1)
+
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images, transforms=transforms, output_shape=tf.shape(images)[1:3],
+        fill_value=0.0, interpolation="BILINEAR", fill_mode="NEAREST"
+    )
+
+
+def make_dataset(split: str, batch_size: int = BATCH_SIZE, training: bool = False,
+                 cache: str = "memory", num_classes: int = None) -> tf.data.Dataset:
+    """
+    Shards -> parse -> cache (uint8) -> shuffle -> batch -> augment -> prefetch
+
+    Args:
+        cache (str): "memory", "none", or a file path prefix for tf.data's disk cache
+    """
+    num_classes = num_classes or len(load_class_indices())
+    files = build_shards(split)
+
+    dataset = tf.data.TFRecordDataset(files, num_parallel_reads=AUTOTUNE)
+    dataset = dataset.map(lambda r: parse_example(r, num_classes), num_parallel_calls=AUTOTUNE)
+    if cache == "memory":
+        dataset = dataset.cache()
+    elif cache != "none":
+        dataset = dataset.cache(cache)
+
+    if training:
+        dataset = dataset.shuffle(4096, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    dataset = dataset.map(lambda x, y: (tf.cast(x, tf.float32) / 255.0, y), num_parallel_calls=AUTOTUNE)
+
+    if training:
+        dataset = dataset.map(lambda x, y: (augment_batch(x), y), num_parallel_calls=AUTOTUNE)
+
+    return dataset.prefetch(AUTOTUNE)
+
+
+def make_generators(batch_size: int = BATCH_SIZE):
+    """The notebook's ImageDataGenerator pipeline, kept for the epoch-time comparison"""
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+    train_datagen = ImageDataGenerator(
+        rescale=1.0 / 255,
+        rotation_range=12,
+        width_shift_range=0.1,
+        height_shift_range=0.1,
+        zoom_range=0.1,
+        horizontal_flip=True,
+        fill_mode="nearest"
+    )
+    val_datagen = ImageDataGenerator(rescale=1.0 / 255)
+
+    train = train_datagen.flow_from_directory(os.path.join(DATASET_DIR, "train"), target_size=IMG_SIZE,
+                                              batch_size=batch_size, class_mode="categorical", shuffle=True)
+    val = val_datagen.flow_from_directory(os.path.join(DATASET_DIR, "val"), target_size=IMG_SIZE,
+                                          batch_size=batch_size, class_mode="categorical", shuffle=False)
+    return train, val
+
+
+# ============================================================================
+# MODEL
+# ============================================================================
+
+def build_model(num_classes: int) -> tf.keras.Model:
+    """MobileNetV2 (frozen) + GAP -> Dense256 -> Dropout -> Dense128 -> Dropout -> softmax"""
+    from tensorflow.keras.applications import MobileNetV2
+    from tensorflow.keras.layers import Dense, Dropout, GlobalAveragePooling2D
+
+    base_model = MobileNetV2(include_top=False, weights="imagenet", input_shape=(*IMG_SIZE, 3), alpha=1.0)
+    base_model.trainable = False
+
+    x = GlobalAveragePooling2D()(base_model.output)
+    x = Dense(256, activation="relu")(x)
+    x = Dropout(0.5)(x)
+    x = Dense(128, activation="relu")(x)
+    x = Dropout(0.3)(x)
+    outputs = Dense(num_classes, activation="softmax")(x)
+
+    model = tf.keras.Model(inputs=base_model.input, outputs=outputs)
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=1e-3),
+                  loss="categorical_crossentropy", metrics=["accuracy"])
+    return model
+
+
+class EpochTimer(tf.keras.callbacks.Callback):
+    def on_train_begin(self, logs=None):
+        self.epoch_seconds = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_seconds.append(time.perf_counter() - self._start)
+
+
+def check_class_indices(class_indices: dict):
+    """flow_from_directory sorts class folders; the saved mapping must agree"""
+    expected = {name: i for i, name in enumerate(sorted(class_indices))}
+    if class_indices != expected:
+        raise ValueError(f"{CLASS_INDICES_PATH} does not match the sorted class folders")
+
+
+# ============================================================================
+# ENTRY POINTS
+# ============================================================================
+
+def train(args):
+    class_indices = load_class_indices()
+    check_class_indices(class_indices)
+
+    train_ds = make_dataset("train", args.batch_size, training=True, cache=args.cache)
+    val_ds = make_dataset("val", args.batch_size, cache=args.cache)
+
+    model = build_model(len(class_indices))
+    timer = EpochTimer()
+    callbacks = [
+        tf.keras.callbacks.EarlyStopping(monitor="val_accuracy", patience=7, restore_best_weights=True, verbose=1),
+        tf.keras.callbacks.ModelCheckpoint(args.model_path, monitor="val_accuracy", save_best_only=True,
+                                           mode="max", verbose=1),
+        tf.keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=0.5, patience=3, min_lr=1e-7, verbose=1),
+        timer
+    ]
+
+    print("\n" + "="*80)
+    print(" "*25 + "TRAINING (tf.data, frozen base)")
+    print("="*80)
+    model.fit(train_ds, epochs=args.epochs, validation_data=val_ds, callbacks=callbacks, verbose=1)
+
+    test_loss, test_acc = model.evaluate(make_dataset("test", args.batch_size, cache="none"), verbose=1)
+    print(f"\nTest Accuracy: {test_acc * 100:.2f}%")
+    print(f"Test Loss:     {test_loss:.4f}")
+    print(f"Epoch time:    {np.mean(timer.epoch_seconds):.1f}s mean")
+    print(f"✅ Best model saved: {args.model_path}")
+
+
+def time_epochs(model, train_data, val_data, epochs: int, steps_per_epoch=None, validation_steps=None) -> list:
+    timer = EpochTimer()
+    model.fit(train_data, epochs=epochs, validation_data=val_data, steps_per_epoch=steps_per_epoch,
+              validation_steps=validation_steps, callbacks=[timer], verbose=2)
+    return timer.epoch_seconds
+
+
+def benchmark(args):
+    """Epoch time of the notebook's ImageDataGenerator pipeline vs the tf.data pipeline"""
+    num_classes = len(load_class_indices())
+    report = {"batch_size": args.batch_size, "epochs": args.benchmark_epochs}
+
+    # Build shards up front so the one-time cost is reported separately
+    start = time.perf_counter()
+    for split in ("train", "val"):
+        build_shards(split)
+    report["shard_build_seconds"] = time.perf_counter() - start
+
+    print("⏱️  ImageDataGenerator...")
+    train_gen, val_gen = make_generators(args.batch_size)
+    report["generator_epoch_seconds"] = time_epochs(
+        build_model(num_classes), train_gen, val_gen, args.benchmark_epochs,
+        steps_per_epoch=train_gen.samples // args.batch_size,
+        validation_steps=val_gen.samples // args.batch_size
+    )
+
+    print("⏱️  tf.data...")
+    report["tfdata_epoch_seconds"] = time_epochs(
+        build_model(num_classes),
+        make_dataset("train", args.batch_size, training=True, cache=args.cache),
+        make_dataset("val", args.batch_size, cache=args.cache),
+        args.benchmark_epochs
+    )
+
+    generator_mean = float(np.mean(report["generator_epoch_seconds"]))
+    tfdata_mean = float(np.mean(report["tfdata_epoch_seconds"]))
+    report["speedup"] = generator_mean / tfdata_mean
+
+    print("\n" + "="*80)
+    print(" "*28 + "EPOCH TIME COMPARISON")
+    print("="*80)
+    print(f"Shard build (one-time):  {report['shard_build_seconds']:.1f}s")
+    print(f"ImageDataGenerator:      {generator_mean:.1f}s / epoch")
+    print(f"tf.data:                 {tfdata_mean:.1f}s / epoch "
+          f"(first epoch fills the cache: {report['tfdata_epoch_seconds'][0]:.1f}s)")
+    print(f"Speedup:                 {report['speedup']:.2f}x")
+    print("="*80 + "\n")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved: {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the disease classifier on a cached tf.data pipeline")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--model-path", default="best_cpu_model.keras")
+    parser.add_argument("--cache", default="memory", help='"memory", "none" or a disk cache path prefix')
+    parser.add_argument("--rebuild-shards", action="store_true")
+    parser.add_argument("--benchmark-epochs", type=int, default=0,
+                        help="Only compare epoch times against ImageDataGenerator for this many epochs")
+    parser.add_argument("--output", default=None, help="Write the benchmark report as JSON to this path")
+    args = parser.parse_args()
+
+    if args.rebuild_shards:
+        for split in ("train", "val", "test"):
+            build_shards(split, force=True)
+
+    if args.benchmark_epochs:
+        benchmark(args)
+    else:
+        train(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+AgriShield - Upload Limits
+Byte caps on request bodies and uploaded files, streamed hashing of uploads
+without copying them into memory, and per-request memory estimates
+"""
+
+import hashlib
+import os
+import resource
+import threading
+from collections import Counter, deque
+from typing import BinaryIO, NamedTuple
+
+import numpy as np
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.datastructures import FormData
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+# A single uploaded image (or bulk entry) larger than this is rejected with 413
+MAX_UPLOAD_BYTES = int(float(os.getenv("AGRISHIELD_MAX_UPLOAD_MB", "20")) * 1024 * 1024)
+
+# Whole request bodies (bulk uploads included) larger than this are cut off
+# with 413 while they are still being received
+MAX_REQUEST_BYTES = int(float(os.getenv("AGRISHIELD_MAX_REQUEST_MB", "512")) * 1024 * 1024)
+
+# The multipart parser keeps each uploaded file in a SpooledTemporaryFile:
+# in memory up to this size, on disk beyond it (forms read by read_upload_form)
+UPLOAD_SPOOL_BYTES = int(float(os.getenv("AGRISHIELD_UPLOAD_SPOOL_MB", "1")) * 1024 * 1024)
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """An upload or request body is over its byte cap (HTTP 413)"""
+
+
+class SpooledUpload(NamedTuple):
+    file: BinaryIO     # the parser's spooled temp file, rewound to the start
+    size: int          # bytes
+    sha256: str        # hex digest, computed while streaming
+    in_memory: int     # bytes of the upload held in RAM (the rest is on disk)
+
+
+# ============================================================================
+# FORM PARSING
+# ============================================================================
+
+class SpooledMultiPartParser(MultiPartParser):
+    """Starlette's multipart parser with UPLOAD_SPOOL_BYTES as the spool size"""
+    spool_max_size = UPLOAD_SPOOL_BYTES
+
+
+async def read_upload_form(request: Request) -> FormData:
+    """
+    The request's multipart form, parsed by SpooledMultiPartParser
+
+    Upload endpoints take the Request and call this instead of declaring
+    File(...) parameters, which FastAPI parses with Starlette's default spool
+    size. The caller closes the form (await form.close()) when done with it.
+    """
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+    try:
+        return await SpooledMultiPartParser(request.headers, request.stream()).parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+
+def form_upload(form: FormData, field: str) -> UploadFile:
+    """The file in a form field, or 400"""
+    upload = form.get(field)
+    if upload is None or isinstance(upload, str):
+        raise HTTPException(status_code=400, detail=f"Upload the file as the multipart field '{field}'")
+    return upload
+
+
+def upload_openapi(field: str, many: bool = False) -> dict:
+    """openapi_extra documenting the multipart body read by read_upload_form"""
+    schema = {"type": "string", "format": "binary"}
+    if many:
+        schema = {"type": "array", "items": schema}
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "properties": {field: schema}, "required": [field]}}}}}
+
+
+# ============================================================================
+# READING UPLOADS
+# ============================================================================
+
+async def spool_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """
+    Stream an uploaded file in small chunks, hashing it and enforcing the cap
+
+    The bytes are never joined into one object: decoding later reads straight
+    from the spooled file.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    await file.seek(0)
+    while True:
+        chunk = await file.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            upload_metrics.reject("upload_bytes")
+            raise UploadTooLarge(f"{file.filename} is larger than {max_bytes // (1024 * 1024)} MB")
+        digest.update(chunk)
+    await file.seek(0)
+
+    rolled_to_disk = getattr(file.file, "_rolled", False)
+    return SpooledUpload(file.file, size, digest.hexdigest(), 0 if rolled_to_disk else size)
+
+
+def read_capped(f: BinaryIO, name: str, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """
+    Read a whole file object, but never more than max_bytes + 1 of it
+
+    Used for bulk entries, where a zip header's declared size cannot be trusted.
+    """
+    data = f.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        upload_metrics.reject("upload_bytes")
+        raise UploadTooLarge(f"{name} is larger than {max_bytes // (1024 * 1024)} MB")
+    return data
+
+
+# ============================================================================
+# REQUEST BODY CAP
+# ============================================================================
+
+def too_large_response(max_bytes: int) -> JSONResponse:
+    return JSONResponse(status_code=413,
+                        content={"detail": f"Request body is larger than {max_bytes // (1024 * 1024)} MB"})
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies over max_bytes with 413
+
+    A declared Content-Length over the cap is refused before anything is read;
+    chunked bodies are counted as they arrive and cut off at the cap.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            upload_metrics.reject("request_bytes")
+            await too_large_response(self.max_bytes)(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise UploadTooLarge(f"Request body is larger than {self.max_bytes} bytes")
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # Once the cap is hit, whatever error the app makes of the aborted
+            # body is replaced by the 413 below
+            if exceeded and not response_started:
+                return
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded or response_started:
+                raise
+
+        if exceeded and not response_started:
+            upload_metrics.reject("request_bytes")
+            await too_large_response(self.max_bytes)(scope, receive, send)
+
+
+# ============================================================================
+# MEMORY METRICS
+# ============================================================================
+
+class UploadMetrics:
+    """
+    Rejection counters and the estimated memory of recent requests
+
+    The per-request figure is computed, not measured: the bytes of the upload
+    held in RAM plus the decoded pixel buffer. The measured figure is the
+    process-wide max RSS.
+    """
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self.rejected = Counter()
+        self.downscaled = 0
+        self.estimates = deque(maxlen=window)
+
+    def reject(self, reason: str):
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def record(self, estimated_bytes: int, downscaled: bool = False):
+        with self._lock:
+            self.estimates.append(estimated_bytes)
+            self.downscaled += int(downscaled)
+
+    def stats(self) -> dict:
+        with self._lock:
+            estimates = np.array(self.estimates, dtype=np.float64)
+            rejected = dict(self.rejected)
+            downscaled = self.downscaled
+
+        def mb(value):
+            return round(float(value) / (1024 * 1024), 2)
+
+        return {
+            "max_upload_mb": mb(MAX_UPLOAD_BYTES),
+            "max_request_mb": mb(MAX_REQUEST_BYTES),
+            "spool_mb": mb(UPLOAD_SPOOL_BYTES),
+            "rejected": rejected,
+            "downscaled_on_decode": downscaled,
+            "request_estimated_mb": {
+                "count": int(estimates.size),
+                "p50": mb(np.percentile(estimates, 50)) if estimates.size else None,
+                "p99": mb(np.percentile(estimates, 99)) if estimates.size else None,
+                "max": mb(estimates.max()) if estimates.size else None
+            },
+            # Linux reports ru_maxrss in KiB
+            "process_max_rss_mb": mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+        }
+
+
+upload_metrics = UploadMetrics()
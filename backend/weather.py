@@ -0,0 +1,108 @@
+"""
+AgriShield - Rainfall Climatology
+District monthly rainfall normals from data/raw/weather_data.csv and the
+month-by-month spread used to sample seasonal rainfall around a forecast
+"""
+
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+WEATHER_PATH = os.path.join(PROJECT_ROOT, "data", "raw", "weather_data.csv")
+
+# Months summed for a season's rainfall (data_preprocessing.ipynb for the
+# first four; the others follow their SEASON_MAP neighbours in predict.py)
+SEASON_MONTHS = {
+    "Kharif": ["JUN", "JUL", "AUG", "SEP", "OCT"],
+    "Rabi": ["NOV", "DEC", "JAN", "FEB", "MAR"],
+    "Summer": ["APR", "MAY", "JUN"],
+    "Zaid": ["APR", "MAY", "JUN"],
+    "Whole Year": ["ANNUAL"],
+    "Autumn": ["SEP", "OCT", "NOV"],
+    "Winter": ["DEC", "JAN", "FEB"]
+}
+
+# Fewer districts than this and the state's spread falls back to the national one
+MIN_DISTRICTS_FOR_SPREAD = 3
+
+_weather = None
+_weather_lock = threading.Lock()
+
+
+def load_weather() -> pd.DataFrame:
+    """weather_data.csv with title-cased State and District columns, read once"""
+    global _weather
+    with _weather_lock:
+        if _weather is None:
+            weather = pd.read_csv(WEATHER_PATH)
+            weather.columns = weather.columns.str.strip()
+            weather["State"] = weather["STATE_UT_NAME"].str.strip().str.title()
+            weather["District"] = weather["DISTRICT"].str.strip().str.title()
+            _weather = weather
+        return _weather
+
+
+def season_months(season: str) -> list:
+    return SEASON_MONTHS.get(season, ["ANNUAL"])
+
+
+def monthly_rainfall(state: str, district: str, season: str) -> dict:
+    """
+    Rainfall normals and spread for each month of the season
+
+    The file holds one normal per district and month, so year-to-year
+    variability is not available; the spread of each month across the
+    state's districts (log scale) stands in for it.
+
+    Returns:
+        dict: {'months', 'normals' (mm, per month), 'log_sigma' (per month),
+        'source': 'district' | 'state' | 'national'}
+    """
+    weather = load_weather()
+    months = season_months(season)
+
+    in_state = weather[weather["State"] == state]
+    spread_rows = in_state if len(in_state) >= MIN_DISTRICTS_FOR_SPREAD else weather
+    log_sigma = np.log1p(spread_rows[months].to_numpy(dtype=np.float64)).std(axis=0)
+
+    row = in_state[in_state["District"] == district.strip().title()]
+    if len(row):
+        normals, source = row[months].to_numpy(dtype=np.float64)[0], "district"
+    elif len(in_state):
+        normals, source = in_state[months].to_numpy(dtype=np.float64).mean(axis=0), "state"
+    else:
+        normals, source = weather[months].to_numpy(dtype=np.float64).mean(axis=0), "national"
+
+    return {"months": months, "normals": normals, "log_sigma": log_sigma, "source": source}
+
+
+def sample_rainfall(rng: np.random.Generator, samples: int, rainfall: float, state: str, district: str,
+                    season: str, spread: Optional[float] = None):
+    """
+    Seasonal rainfall samples around the forecast `rainfall` (mm)
+
+    With `spread` the samples are normal with that standard deviation.
+    Otherwise each month is scaled by its own mean-one lognormal factor and
+    the season's total is rescaled so the samples average `rainfall`: a
+    season carried by a few erratic months comes out wider than one with
+    steady rain.
+
+    Returns:
+        tuple: (samples (n,) clipped at 0, source of the spread)
+    """
+    if spread is not None:
+        return np.maximum(rng.normal(rainfall, spread, samples), 0.0), "user"
+
+    climate = monthly_rainfall(state, district, season)
+    normals, sigma = climate["normals"], climate["log_sigma"]
+    if normals.sum() <= 0:
+        return np.full(samples, float(rainfall)), climate["source"]
+
+    factors = np.exp(rng.standard_normal((samples, len(normals))) * sigma - sigma ** 2 / 2)
+    totals = factors @ normals
+    return np.maximum(rainfall * totals / normals.sum(), 0.0), climate["source"]